@@ -1,93 +1,171 @@
 # backend/app.py - 完整修正版
+#   python app.py                 # 開發用伺服器，:5000
+#   flask --app app <指令>         # CLI 指令（Flask 會找到 create_app）
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-import os
+from flask_jwt_extended import JWTManager, jwt_required
 from dotenv import load_dotenv
-from utils.database import init_db
+from config import load_config, CORS_ORIGINS, CORS_ALLOW_HEADERS, CORS_EXPOSE_HEADERS, CORS_METHODS
+from utils.database import mongo, init_db, start_tombstone_compaction
+from utils.log import init_logging
+from utils.compression import init_compression
+from utils.metrics import init_metrics, registry as metrics_registry
+from utils.cache import task_cache, profile_cache
+from utils.hashing import password_hasher
+from utils.revocation import revocation_list
+from utils.ratelimit import rate_limiter, load_shedder
+from utils.realtime import task_events
+from models.task import Task
 from routes.auth import auth_bp
 from routes.tasks import tasks_bp
+from commands import register_commands
 from datetime import datetime
 
-# 載入環境變數
-load_dotenv()
-
-app = Flask(__name__)
-
-# 設定
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 604800  # 7天 (秒)
-app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/calendar_app')
-
-# 修正 CORS 設定
-CORS(app, 
-     supports_credentials=True,
-     origins=["http://localhost:5500", "http://127.0.0.1:5500", "http://localhost"],
-     allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
-
-# 處理 OPTIONS 請求
-@app.before_request
-def handle_options():
-    if request.method == 'OPTIONS':
-        response = jsonify({'status': 'ok'})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', '*')
-        response.headers.add('Access-Control-Allow-Methods', '*')
-        return response
-
-# 初始化擴展
-jwt = JWTManager(app)
-
-# 初始化資料庫
-init_db(app)
-
-# 註冊藍圖
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
-
-# 測試路由
-@app.route('/')
-def home():
-    return jsonify({
-        'message': '行事曆 API',
-        'version': '1.0.0',
-        'status': 'running',
-        'timestamp': datetime.utcnow().isoformat()
-    })
-
-@app.route('/api/test', methods=['GET'])
-def api_test():
-    return jsonify({
-        'success': True,
-        'message': 'API 連線測試成功',
-        'timestamp': datetime.utcnow().isoformat()
-    })
-
-@app.route('/health')
-def health():
-    return jsonify({'status': 'ok'})
-
-# 錯誤處理
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
-        'success': False,
-        'message': '路由不存在'
-    }), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({
-        'success': False,
-        'message': '伺服器內部錯誤',
-        'error': str(error) if app.debug else None
-    }), 500
+
+def create_app():
+    """建立 Flask app
+
+    不在模組層級建立：密碼雜湊的子程序（forkserver / spawn）會以 __mp_main__ 重新匯入 app.py，
+    模組層級的初始化會讓每個子程序各自連線資料庫並啟動背景執行緒。
+    """
+    # 載入環境變數
+    load_dotenv()
+
+    app = Flask(__name__)
+
+    # 設定
+    load_config(app.config)
+
+    # 初始化日誌（需早於資料庫等其他初始化）
+    init_logging(app)
+
+    # 修正 CORS 設定
+    CORS(app,
+         supports_credentials=True,
+         origins=CORS_ORIGINS,
+         allow_headers=CORS_ALLOW_HEADERS,
+         expose_headers=CORS_EXPOSE_HEADERS,
+         methods=CORS_METHODS)
+
+    # 處理 OPTIONS 請求
+    @app.before_request
+    def handle_options():
+        if request.method == 'OPTIONS':
+            response = jsonify({'status': 'ok'})
+            response.headers.add('Access-Control-Allow-Origin', '*')
+            response.headers.add('Access-Control-Allow-Headers', '*')
+            response.headers.add('Access-Control-Allow-Methods', '*')
+            return response
+
+    # 回應壓縮（gzip / brotli）
+    init_compression(app)
+
+    # 初始化擴展
+    jwt = JWTManager(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return revocation_list.is_revoked(jwt_payload)
+
+    # 請求與 Mongo 指令計時，/metrics 輸出（指令監聽需在建立 MongoClient 前註冊）
+    init_metrics(app)
+
+    # 初始化資料庫
+    init_db(app)
+
+    # 任務查詢使用數值欄位或日期字串
+    Task.init_app(app)
+
+    # 初始化任務列表快取
+    task_cache.init_app(app)
+    profile_cache.init_app(app)
+    # /metrics 不需登入，快取統計與 /api/cache/stats 相同，只在 CACHE_STATS_ENABLED 時輸出
+    if app.config['CACHE_STATS_ENABLED']:
+        metrics_registry.collectors.append(lambda: [
+            ('task_cache_hits_total', 'counter', '任務列表快取命中數', task_cache.hits),
+            ('task_cache_misses_total', 'counter', '任務列表快取未命中數', task_cache.misses),
+            ('task_cache_invalidations_total', 'counter', '任務列表快取失效次數', task_cache.invalidations)
+        ])
+
+    # 密碼雜湊程序池
+    password_hasher.init_app(app)
+
+    # 登入/註冊與任務寫入的限流、負載卸除
+    rate_limiter.init_app(app)
+    load_shedder.init_app(app)
+
+    # 定期壓縮增量同步的刪除墓碑
+    start_tombstone_compaction(app)
+
+    # 已撤銷 token 清單（記憶體 bloom filter，定期從資料庫同步其他程序的登出）
+    revocation_list.init_app(app)
+    app.extensions['revocation_sync'] = revocation_list.start_sync_thread(lambda: mongo.db)
+
+    # 任務即時事件（/api/tasks/stream）：每個程序一個共用的 change stream 監看器
+    task_events.init_app(app)
+    app.extensions['task_events_watcher'] = task_events.start_thread(lambda: mongo.db)
+
+    # 註冊藍圖
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
+
+    # 註冊 CLI 指令
+    register_commands(app)
+
+    # 測試路由
+    @app.route('/')
+    def home():
+        return jsonify({
+            'message': '行事曆 API',
+            'version': '1.0.0',
+            'status': 'running',
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    @app.route('/api/test', methods=['GET'])
+    def api_test():
+        return jsonify({
+            'success': True,
+            'message': 'API 連線測試成功',
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    @app.route('/health')
+    def health():
+        return jsonify({'status': 'ok'})
+
+    # 快取統計（CACHE_STATS_ENABLED 時才註冊，且需登入）
+    if app.config['CACHE_STATS_ENABLED']:
+        @app.route('/api/cache/stats')
+        @jwt_required()
+        def cache_stats():
+            return jsonify({
+                'success': True,
+                'task_cache': task_cache.stats()
+            })
+
+    # 錯誤處理
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({
+            'success': False,
+            'message': '路由不存在'
+        }), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        return jsonify({
+            'success': False,
+            'message': '伺服器內部錯誤',
+            'error': str(error) if app.debug else None
+        }), 500
+
+    return app
+
 
 if __name__ == '__main__':
     # 關閉自動重載，避免 Windows 通訊端問題
     print("🚀 啟動行事曆 API 伺服器...")
     print("📡 伺服器網址: http://127.0.0.1:5000")
     print("📡 前端網址: http://localhost:5500")
-    app.run(debug=True, host='127.0.0.1', port=5000, use_reloader=False)
\ No newline at end of file
+    create_app().run(debug=True, host='127.0.0.1', port=5000, use_reloader=False)
@@ -0,0 +1,174 @@
+# backend/async_app.py - 非同步（ASGI）模式：Quart + Motor
+#
+# 啟動方式（與同步模式並行比較時可使用不同埠）：
+#   hypercorn "async_app:create_app()" --bind 127.0.0.1:5001
+#
+# HTTP 介面與 app.py 相同；批次寫入、匯入、匯出與 CLI 指令仍由同步 app 提供。
+import asyncio
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from quart import Quart, Response, g, jsonify, request
+from pymongo import monitoring
+from config import load_config, CORS_ORIGINS, CORS_ALLOW_HEADERS, CORS_EXPOSE_HEADERS, CORS_METHODS
+from utils.async_database import amongo, init_async_db
+from utils.async_jwt import jwt_required
+from utils.compression import init_async_compression
+from utils.cache import task_cache, profile_cache
+from utils.hashing import password_hasher
+from utils.ratelimit import rate_limiter, load_shedder
+from models.task import Task
+from utils.revocation import revocation_list
+from utils.realtime import task_events
+from utils.log import configure_logging, bind_request_id, current_request_id
+from utils.metrics import (registry as metrics_registry, http_request_duration, http_requests_total,
+                           MongoCommandListener)
+
+def _init_cors(app):
+    """與 app.py 的 Flask-CORS 設定相同的來源與標頭"""
+
+    @app.before_request
+    async def handle_options():
+        if request.method == 'OPTIONS':
+            return Response('', status=204)
+
+    @app.after_request
+    async def add_cors_headers(response):
+        origin = request.headers.get('Origin')
+        if origin in CORS_ORIGINS:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.headers['Access-Control-Allow-Headers'] = ', '.join(CORS_ALLOW_HEADERS)
+            response.headers['Access-Control-Expose-Headers'] = ', '.join(CORS_EXPOSE_HEADERS)
+            response.headers['Access-Control-Allow-Methods'] = ', '.join(CORS_METHODS)
+            response.vary.add('Origin')
+        return response
+
+def _init_request_hooks(app):
+    """請求 ID 與 /metrics（與同步模式共用同一組指標名稱）"""
+    metrics_enabled = app.config.get('METRICS_ENABLED', True)
+    if metrics_enabled:
+        monitoring.register(MongoCommandListener())
+
+    @app.before_request
+    async def start_request():
+        bind_request_id(request.headers.get('X-Request-ID'))
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    async def finish_request(response):
+        start = g.pop('_metrics_start', None)
+        if metrics_enabled and start is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, request.method, endpoint)
+            http_requests_total.inc(request.method, endpoint, str(response.status_code))
+        response.headers['X-Request-ID'] = current_request_id()
+        return response
+
+    if metrics_enabled:
+        @app.route('/metrics')
+        async def metrics():
+            return Response(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _init_revocation(app):
+    """在事件迴圈內定期同步撤銷清單（需在 init_async_db 之後註冊，連線才已建立）"""
+    revocation_list.init_app(app)
+
+    @app.before_serving
+    async def start_revocation_sync():
+        app.revocation_sync = asyncio.create_task(revocation_list.run_async_sync(lambda: amongo.db))
+
+    @app.after_serving
+    async def stop_revocation_sync():
+        app.revocation_sync.cancel()
+
+def _init_task_events(app):
+    """在事件迴圈內執行共用的任務變更監看器（/api/tasks/stream）"""
+    task_events.init_app(app)
+
+    @app.before_serving
+    async def start_task_events():
+        app.task_events_watcher = asyncio.create_task(task_events.run_async(lambda: amongo.db))
+
+    @app.after_serving
+    async def stop_task_events():
+        app.task_events_watcher.cancel()
+
+def create_app():
+    """建立非同步 app"""
+    load_dotenv()
+
+    app = Quart(__name__)
+    load_config(app.config)
+    configure_logging(app.config)
+
+    _init_cors(app)
+    _init_request_hooks(app)
+    init_async_compression(app)
+
+    # Mongo 指令監聽需在建立 Motor 用戶端之前註冊（_init_request_hooks 已處理）
+    init_async_db(app)
+    Task.init_app(app)
+    task_cache.init_app(app)
+    profile_cache.init_app(app)
+    password_hasher.init_app(app)
+    rate_limiter.init_app(app)
+    load_shedder.init_app(app)
+    _init_revocation(app)
+    _init_task_events(app)
+
+    from routes.async_auth import auth_bp
+    from routes.async_tasks import tasks_bp
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
+
+    @app.route('/')
+    async def home():
+        return jsonify({
+            'message': '行事曆 API',
+            'version': '1.0.0',
+            'mode': 'async',
+            'status': 'running',
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    @app.route('/api/test', methods=['GET'])
+    async def api_test():
+        return jsonify({
+            'success': True,
+            'message': 'API 連線測試成功',
+            'timestamp': datetime.utcnow().isoformat()
+        })
+
+    @app.route('/health')
+    async def health():
+        return jsonify({'status': 'ok'})
+
+    if app.config['CACHE_STATS_ENABLED']:
+        @app.route('/api/cache/stats')
+        @jwt_required()
+        async def cache_stats():
+            return jsonify({
+                'success': True,
+                'task_cache': task_cache.stats()
+            })
+
+    @app.errorhandler(404)
+    async def not_found(error):
+        return jsonify({
+            'success': False,
+            'message': '路由不存在'
+        }), 404
+
+    @app.errorhandler(500)
+    async def internal_error(error):
+        return jsonify({
+            'success': False,
+            'message': '伺服器內部錯誤',
+            'error': None
+        }), 500
+
+    return app
+
+if __name__ == '__main__':
+    create_app().run(host='127.0.0.1', port=5001)
@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_buckets.py - 每任務一份文件 vs 每月分桶：月曆讀取與單筆寫入
+#
+# 需要 MongoDB（會清空 --uri 指定資料庫中的 tasks 與 task_buckets）；mongomock:// 只能確認流程，數字沒有參考價值：
+#   python benchmarks/bench_buckets.py --uri mongodb://localhost:27017/calendar_bench --per-month 60 --months 12
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from models.indexes import sync_indexes
+from models.task import Task
+from models.task_bucket import TaskBuckets
+
+
+def connect(uri):
+    if uri.startswith('mongomock://'):
+        import mongomock
+        return mongomock.MongoClient()['calendar_bench']
+    from pymongo import MongoClient
+    return MongoClient(uri).get_default_database('calendar_bench')
+
+
+def seed(db, user_id, months, per_month):
+    """建立 months 個月、每月 per_month 筆任務，並重建分桶"""
+    db.tasks.delete_many({})
+    db.task_buckets.delete_many({})
+    docs = []
+    for m in range(months):
+        first = date(2030, 1, 1).replace(month=m % 12 + 1, year=2030 + m // 12)
+        for i in range(per_month):
+            day = first + timedelta(days=i % 28)
+            slot = i // 28
+            docs.append(Task(user_id, f'任務 {m}-{i}', day.isoformat(), f'{8 + slot:02d}:00', f'{8 + slot:02d}:30',
+                             desc='每週例行會議' if i % 3 == 0 else '').to_document())
+    db.tasks.insert_many(docs)
+    return TaskBuckets.rebuild(db, user_id)
+
+
+def month_window(months):
+    month = (months // 2) % 12 + 1
+    year = 2030 + (months // 2) // 12
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+    return f'{year}-{month:02d}-01', f'{year}-{month:02d}-{last:02d}'
+
+
+def read_documents(db, user_id, date_from, date_to):
+    query, sort = Task.build_user_query(user_id, date_from=date_from, date_to=date_to)
+    return list(db.tasks.find(query).sort(sort))
+
+
+def read_buckets(db, user_id, date_from, date_to):
+    return TaskBuckets.find_docs(db, user_id, date_from=date_from, date_to=date_to)
+
+
+def measure(fn, rounds):
+    fn()  # 暖身
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='任務儲存方式（documents / buckets）基準')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/calendar_bench')
+    parser.add_argument('--months', type=int, default=12, help='建立的月份數')
+    parser.add_argument('--per-month', type=int, default=60, help='每月的任務數')
+    parser.add_argument('--bucket-size', type=int, default=TaskBuckets.MAX_TASKS, help='每個分桶最多的任務數')
+    parser.add_argument('--rounds', type=int, default=200, help='重複次數（取中位數）')
+    args = parser.parse_args()
+
+    TaskBuckets.MAX_TASKS = args.bucket_size
+    db = connect(args.uri)
+    sync_indexes(db, drop_stale=False)
+    user_id = str(ObjectId())
+    buckets = seed(db, user_id, args.months, args.per_month)
+    date_from, date_to = month_window(args.months)
+
+    documents = read_documents(db, user_id, date_from, date_to)
+    assert documents == read_buckets(db, user_id, date_from, date_to), '兩種儲存方式的結果不一致'
+
+    def write_documents():
+        task = Task(user_id, 'bench', date_from, '23:00', '23:30')
+        task.id = db.tasks.insert_one(task.to_document()).inserted_id
+        db.tasks.delete_one({'_id': task.id})
+
+    def write_buckets():
+        task = Task(user_id, 'bench', date_from, '23:00', '23:30')
+        doc = task.to_document()
+        task.id = db.tasks.insert_one(doc).inserted_id
+        TaskBuckets.put(db, {'_id': task.id, **doc})
+        db.tasks.delete_one({'_id': task.id})
+        TaskBuckets.remove(db, user_id, task.id, date_from)
+
+    results = [
+        ('月曆讀取 documents', measure(lambda: read_documents(db, user_id, date_from, date_to), args.rounds)),
+        ('月曆讀取 buckets', measure(lambda: read_buckets(db, user_id, date_from, date_to), args.rounds)),
+        ('新增+刪除 documents', measure(write_documents, args.rounds)),
+        ('新增+刪除 buckets', measure(write_buckets, args.rounds)),
+    ]
+
+    print(f'{args.months} 個月 x {args.per_month} 筆任務（{buckets} 個分桶，每桶最多 {args.bucket_size} 筆），'
+          f'讀取 {date_from} ~ {date_to} 的 {len(documents)} 筆，{args.rounds} 次取中位數')
+    for name, seconds in results:
+        print(f'  {name:<20} {seconds * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_http.py - 同步/非同步模式的 HTTP 壓測（只用標準函式庫）
+#
+# 分別啟動兩種模式後，以相同參數對兩個網址執行：
+#   python app.py                                          # 同步，:5000
+#   hypercorn "async_app:create_app()" --bind 127.0.0.1:5001 --workers 1
+#   python benchmarks/bench_http.py --url http://127.0.0.1:5000 --concurrency 100
+#   python benchmarks/bench_http.py --url http://127.0.0.1:5001 --concurrency 100
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+def call(url, method='GET', body=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def setup(base_url, tasks):
+    """註冊一個測試用戶並建立 tasks 筆任務，回傳 token"""
+    name = f'bench-{uuid.uuid4().hex[:8]}'
+    status, body = call(f'{base_url}/api/auth/register', 'POST',
+                        {'username': name, 'email': f'{name}@example.com', 'password': 'benchmark'})
+    if status != 201:
+        raise SystemExit(f'註冊失敗: {status} {body[:200]}')
+    token = json.loads(body)['token']
+
+    for i in range(tasks):
+        day, slot = divmod(i, 24)
+        call(f'{base_url}/api/tasks/', 'POST', {
+            'title': f'bench {i}',
+            'date': f'2030-01-{day % 28 + 1:02d}',
+            'start_time': f'{slot:02d}:00',
+            'end_time': f'{slot:02d}:30'
+        }, token)
+    return token
+
+
+def run(base_url, path, token, total, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        status, _ = call(f'{base_url}{path}', token=token)
+        return status, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status >= 400)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f'{path}: {total} 次請求, 並行 {concurrency}, 耗時 {elapsed:.2f}s, '
+          f'{total / elapsed:.1f} req/s, 錯誤 {errors}')
+    print(f'  延遲 (ms): 平均 {statistics.mean(latencies) * 1000:.1f}, '
+          f'p50 {pct(0.5):.1f}, p95 {pct(0.95):.1f}, p99 {pct(0.99):.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='同步/非同步模式 HTTP 壓測')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=200, help='預先建立的任務數')
+    args = parser.parse_args()
+
+    token = setup(args.url, args.tasks)
+    for path in ('/api/tasks/?from=2030-01-01&to=2030-01-31', '/api/tasks/busy?from=2030-01-01&to=2030-01-14',
+                 '/api/auth/me'):
+        run(args.url, path, token, args.requests, args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_serialize.py - 任務列表序列化的微基準（不需資料庫）
+#
+# 比較 GET /api/tasks 的兩種序列化路徑：
+#   model：Task.from_dict -> to_dict -> jsonify（TASK_FAST_SERIALIZER=false）
+#   fast ：原始文件 -> task_to_json -> dumps（orjson 或標準 json）
+#   python benchmarks/bench_serialize.py --tasks 10000 --rounds 20
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from flask import Flask, jsonify
+from models.task import Task
+from utils import serializer
+
+
+def make_docs(count):
+    """產生與 tasks 集合相同形狀的文件"""
+    start = datetime(2026, 1, 1)
+    return [{
+        '_id': ObjectId(),
+        'user_id': '6650f0c2a1b2c3d4e5f60718',
+        'title': f'任務 {i}',
+        'date': (start + timedelta(days=i % 365)).strftime('%Y-%m-%d'),
+        'start_time': f'{9 + i % 8:02d}:00',
+        'end_time': f'{10 + i % 8:02d}:00',
+        'desc': '每週例行會議，討論進度與待辦事項' if i % 3 == 0 else '',
+        'created_at': start + timedelta(seconds=i * 37)
+    } for i in range(count)]
+
+
+def model_path(docs):
+    return jsonify({
+        'success': True,
+        'tasks': [Task.from_dict(doc).to_dict() for doc in docs],
+        'next_cursor': None
+    }).get_data()
+
+
+def fast_path(docs):
+    return serializer.dumps({
+        'success': True,
+        'tasks': [serializer.task_to_json(doc) for doc in docs],
+        'next_cursor': None
+    })
+
+
+def measure(fn, docs, rounds):
+    fn(docs)  # 暖身
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(docs)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='任務列表序列化微基準')
+    parser.add_argument('--tasks', type=int, default=10000, help='每次序列化的任務數')
+    parser.add_argument('--rounds', type=int, default=20, help='重複次數（取中位數）')
+    args = parser.parse_args()
+
+    docs = make_docs(args.tasks)
+    app = Flask(__name__)
+
+    with app.app_context():
+        results = [('model (from_dict/to_dict/jsonify)', measure(model_path, docs, args.rounds))]
+
+        orjson = serializer.orjson
+        serializer.orjson = None
+        results.append(('fast + 標準 json', measure(fast_path, docs, args.rounds)))
+        serializer.orjson = orjson
+        if orjson is not None:
+            results.append(('fast + orjson', measure(fast_path, docs, args.rounds)))
+
+    baseline = results[0][1]
+    print(f'{args.tasks} 筆任務，{args.rounds} 次取中位數')
+    for name, seconds in results:
+        print(f'  {name:<36} {seconds * 1000:8.1f} ms   x{baseline / seconds:.1f}')
+
+
+if __name__ == '__main__':
+    main()
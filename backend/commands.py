@@ -0,0 +1,108 @@
+# backend/commands.py - Flask CLI 指令（flask --app app <指令>）
+import sys
+import click
+from utils.database import mongo
+
+def register_commands(app):
+    """註冊維運用的 CLI 指令"""
+
+    @app.cli.command('sync-indexes')
+    @click.option('--keep-stale', is_flag=True, help='不刪除註冊表以外的索引')
+    def sync_indexes_command(keep_stale):
+        """依模型的索引註冊表建立/刪除索引"""
+        from models.indexes import sync_indexes
+        report = sync_indexes(mongo.db, drop_stale=not keep_stale)
+        click.echo(f"建立: {', '.join(report['created']) or '無'}")
+        click.echo(f"刪除: {', '.join(report['dropped']) or '無'}")
+
+    @app.cli.command('check-indexes')
+    def check_indexes_command():
+        """對每個模型查詢執行 explain()，出現 COLLSCAN 時以非零代碼結束"""
+        from models.indexes import sync_indexes, audit_queries
+        sync_indexes(mongo.db, drop_stale=False)
+        ok, results = audit_queries(mongo.db)
+        for result in results:
+            mark = '✅' if result['ok'] else '❌'
+            click.echo(f"{mark} [{result['mode']}] {result['collection']}: {result['name']} -> "
+                       f"{' > '.join(result['stages'])}")
+        if not ok:
+            click.echo('❌ 有查詢使用 COLLSCAN，請檢查索引註冊表')
+            sys.exit(1)
+        click.echo('✅ 所有查詢皆有使用索引')
+
+    @app.cli.command('import-tasks')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--email', required=True, help='匯入目標用戶的電子郵件')
+    @click.option('--format', 'fmt', type=click.Choice(['ics', 'csv']), help='預設依副檔名判斷')
+    @click.option('--chunk-size', default=1000, show_default=True, help='每次批次寫入的筆數')
+    @click.option('--allow-conflicts', is_flag=True, help='不檢查時段衝突')
+    def import_tasks_command(path, email, fmt, chunk_size, allow_conflicts):
+        """從 iCalendar 或 CSV 檔案匯入任務"""
+        from models.user import User
+        from utils.importer import detect_format, import_tasks
+
+        user = User.find_by_email(mongo.db, email)
+        if not user:
+            click.echo(f'❌ 找不到用戶: {email}')
+            sys.exit(1)
+
+        fmt = detect_format(path, fmt)
+        if not fmt:
+            click.echo('❌ 無法判斷檔案格式，請使用 --format')
+            sys.exit(1)
+
+        def progress(report):
+            click.echo(f'… 已處理 {report.processed} 筆，匯入 {report.imported} 筆，失敗 {report.failed} 筆')
+
+        with open(path, encoding='utf-8-sig', newline='') as text_stream:
+            report = import_tasks(mongo.db, str(user.id), text_stream, fmt, chunk_size,
+                                  check_conflicts=not allow_conflicts, progress=progress)
+
+        for error in report.errors:
+            click.echo(f"  第 {error['row']} 行: {'; '.join(error['errors'])}")
+        if report.to_dict()['errors_truncated']:
+            click.echo(f'  …（僅列出前 {len(report.errors)} 筆錯誤）')
+        click.echo(f'✅ 匯入完成: {report.imported} 筆成功，{report.failed} 筆失敗')
+
+    @app.cli.command('compact-tombstones')
+    @click.option('--retention-days', type=int, help='預設使用 TASK_TOMBSTONE_RETENTION_DAYS')
+    def compact_tombstones_command(retention_days):
+        """刪除超過保留期限的任務刪除墓碑"""
+        from models.task_change import TaskChange
+        if retention_days is None:
+            retention_days = app.config.get('TASK_TOMBSTONE_RETENTION_DAYS', 30)
+        removed = TaskChange.compact(mongo.db, retention_days)
+        click.echo(f'✅ 已刪除 {removed} 筆超過 {retention_days} 天的墓碑')
+
+    @app.cli.command('rebuild-task-stats')
+    @click.option('--user-id', help='只重建此用戶（預設為全部）')
+    def rebuild_task_stats_command(user_id):
+        """從 tasks 集合重建每日工作量彙總（task_daily_stats）"""
+        from models.task_stats import TaskDailyStats
+        written = TaskDailyStats.rebuild(mongo.db, user_id)
+        click.echo(f'✅ 已重建 {written} 筆每日彙總')
+
+    @app.cli.command('rebuild-task-buckets')
+    @click.option('--user-id', help='只重建此用戶（預設為全部）')
+    def rebuild_task_buckets_command(user_id):
+        """從 tasks 集合重建每月分桶（task_buckets），TASK_STORAGE=buckets 前需先執行"""
+        from models.task_bucket import TaskBuckets
+        written = TaskBuckets.rebuild(mongo.db, user_id)
+        click.echo(f'✅ 已重建 {written} 個任務分桶')
+
+    @app.cli.command('migrate-task-times')
+    @click.option('--batch-size', default=1000, show_default=True, help='每批處理的任務數')
+    @click.option('--pause', default=0.0, show_default=True, help='每批之間暫停的秒數')
+    @click.option('--restart', is_flag=True, help='忽略先前的進度，從頭開始')
+    def migrate_task_times_command(batch_size, pause, restart):
+        """為既有任務補上 day / start_min / end_min 數值欄位（可中斷後續跑）"""
+        from utils.migrations import migrate_task_time_fields
+
+        def progress(state):
+            click.echo(f"… 已處理至 {state['last_id']}：更新 {state['processed']} 筆，略過 {state['skipped']} 筆")
+
+        state = migrate_task_time_fields(mongo.db, batch_size, pause, restart, progress)
+        click.echo(f"✅ 遷移完成（{state['completed_at']:%Y-%m-%d %H:%M:%S} UTC）: "
+                   f"更新 {state['processed']} 筆，略過 {state['skipped']} 筆格式錯誤的任務")
+        if not app.config.get('TASK_NUMERIC_QUERIES', False):
+            click.echo('可設定 TASK_NUMERIC_QUERIES=true 改以數值欄位查詢')
@@ -0,0 +1,61 @@
+# backend/config.py - 同步（app.py）與非同步（async_app.py）共用的設定
+import os
+
+# CORS 設定
+CORS_ORIGINS = ["http://localhost:5500", "http://127.0.0.1:5500", "http://localhost"]
+CORS_ALLOW_HEADERS = ["Content-Type", "Authorization", "X-Requested-With", "If-None-Match", "X-Request-ID"]
+CORS_EXPOSE_HEADERS = ["ETag", "X-Request-ID", "Retry-After"]
+CORS_METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS"]
+
+def load_config(config):
+    """從環境變數載入設定到 app.config"""
+    config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
+    config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
+    config['JWT_ACCESS_TOKEN_EXPIRES'] = 604800  # 7天 (秒)
+    config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/calendar_app')
+    config['INDEX_DROP_STALE'] = os.getenv('INDEX_DROP_STALE', 'false').lower() == 'true'  # 啟動時刪除註冊表以外的索引；平常以 flask sync-indexes 處理
+    config['REDIS_URL'] = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    config['TASK_CACHE'] = os.getenv('TASK_CACHE', 'memory')  # memory / redis / none
+    config['TASK_CACHE_TTL'] = int(os.getenv('TASK_CACHE_TTL', 30))
+    config['TASK_CACHE_SIZE'] = int(os.getenv('TASK_CACHE_SIZE', 1024))
+    config['CACHE_STATS_ENABLED'] = os.getenv('CACHE_STATS_ENABLED', 'false').lower() == 'true'  # 註冊 /api/cache/stats（需登入）並在 /metrics 輸出快取命中數
+    config['TASK_NUMERIC_QUERIES'] = os.getenv('TASK_NUMERIC_QUERIES', 'false').lower() == 'true'  # 以 day/start_min 查詢；須先執行 flask migrate-task-times，否則舊任務查不到
+    config['TASK_STORAGE'] = os.getenv('TASK_STORAGE', 'documents')  # documents / buckets；改為 buckets 前先執行 flask rebuild-task-buckets
+    config['TASK_BUCKET_SIZE'] = int(os.getenv('TASK_BUCKET_SIZE', 200))  # 每個分桶最多內嵌的任務數，超過時建立新分桶
+    config['TASK_FAST_SERIALIZER'] = os.getenv('TASK_FAST_SERIALIZER', 'true').lower() == 'true'  # 列表直接由原始文件序列化
+    config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # 小於此位元組數不壓縮
+    config['COMPRESS_GZIP_LEVEL'] = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))  # 1-9
+    config['COMPRESS_BROTLI_LEVEL'] = int(os.getenv('COMPRESS_BROTLI_LEVEL', 4))  # 0-11，越高越慢
+    config['TASK_TOMBSTONE_RETENTION_DAYS'] = int(os.getenv('TASK_TOMBSTONE_RETENTION_DAYS', 30))
+    config['TASK_COMPACTION_INTERVAL'] = int(os.getenv('TASK_COMPACTION_INTERVAL', 3600))  # 秒，0 為停用
+    config['LOG_LEVEL'] = os.getenv('LOG_LEVEL', 'INFO')  # 開發時設為 DEBUG 可看到逐請求的診斷訊息
+    config['LOG_FORMAT'] = os.getenv('LOG_FORMAT', 'json')  # json / text
+    config['LOG_DEBUG_SAMPLE_RATE'] = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+    config['METRICS_ENABLED'] = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # 變更後舊雜湊於登入時升級
+    config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', config['PASSWORD_HASH_WORKERS'] * 4))
+    config['PASSWORD_HASH_TIMEOUT'] = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))  # 秒
+    config['PASSWORD_HASH_RETRY_AFTER'] = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 1))  # 503 回應的 Retry-After（秒）
+    config['PROFILE_CACHE_SIZE'] = int(os.getenv('PROFILE_CACHE_SIZE', 1024))  # 0 為停用
+    config['PROFILE_CACHE_TTL'] = int(os.getenv('PROFILE_CACHE_TTL', 300))
+    config['REVOCATION_SYNC_INTERVAL'] = float(os.getenv('REVOCATION_SYNC_INTERVAL', 10))  # 其他程序的登出最多延遲此秒數生效
+    config['REVOCATION_BLOOM_CAPACITY'] = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 100000))
+    config['REVOCATION_BLOOM_ERROR_RATE'] = float(os.getenv('REVOCATION_BLOOM_ERROR_RATE', 0.001))
+    config['RATE_LIMIT_BACKEND'] = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # memory / redis / none
+    config['RATE_LIMITS'] = {  # 端點 -> {鍵種類: 次數/單位}；設為空字串可停用該鍵
+        'register': {'ip': os.getenv('RATE_LIMIT_REGISTER_IP', '5/minute')},
+        'login': {'ip': os.getenv('RATE_LIMIT_LOGIN_IP', '20/minute'),
+                  'account': os.getenv('RATE_LIMIT_LOGIN_ACCOUNT', '5/minute')},
+        'task_write': {'user': os.getenv('RATE_LIMIT_TASK_WRITE_USER', '120/minute')}
+    }
+    config['LOAD_SHED_MAX_INFLIGHT'] = {  # 每個程序同時處理中的請求上限，0 為不限
+        'task_write': int(os.getenv('TASK_WRITE_MAX_INFLIGHT', 32))
+    }
+    config['REALTIME_MODE'] = os.getenv('REALTIME_MODE', 'auto')  # auto / change_stream / poll；auto 在不支援 change stream 時改為輪詢
+    config['REALTIME_POLL_INTERVAL'] = float(os.getenv('REALTIME_POLL_INTERVAL', 1.0))  # 秒
+    config['REALTIME_QUEUE_SIZE'] = int(os.getenv('REALTIME_QUEUE_SIZE', 100))  # 每條連線暫存的事件數，滿了改送 reset
+    config['REALTIME_HEARTBEAT'] = int(os.getenv('REALTIME_HEARTBEAT', 15))  # 閒置時送心跳的間隔（秒）
+    config['REALTIME_MAX_SUBSCRIBERS'] = int(os.getenv('REALTIME_MAX_SUBSCRIBERS', 1000))  # 每個程序的連線上限
+    config['LOAD_SHED_RETRY_AFTER'] = int(os.getenv('LOAD_SHED_RETRY_AFTER', 1))
@@ -0,0 +1,175 @@
+# backend/models/indexes.py - 宣告式索引註冊表、同步與 explain 稽核
+from datetime import datetime
+from bson import ObjectId
+from models.task import Task
+from models.user import User
+from models.task_change import TaskChange
+from models.revoked_token import RevokedToken
+from models.task_stats import TaskDailyStats
+from models.task_series import TaskSeries
+from models.task_bucket import TaskBuckets
+from utils.conflicts import ConflictDetector
+from utils.occupancy import occupancy_query
+
+# 集合名稱 -> 該集合的模型（索引宣告寫在模型的 INDEXES 上）
+MODELS = {
+    'users': User,
+    'tasks': Task,
+    'task_changes': TaskChange,
+    'task_daily_stats': TaskDailyStats,
+    'task_series': TaskSeries,
+    'task_buckets': TaskBuckets,
+    'revoked_tokens': RevokedToken
+}
+
+# 比對既有索引時會檢查的選項
+INDEX_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+
+
+def registered_indexes():
+    """回傳 {集合名稱: [索引宣告]}"""
+    return {name: list(model.INDEXES) for name, model in MODELS.items()}
+
+
+def _same_index(spec, info):
+    """比對索引宣告與 index_information() 的結果是否一致"""
+    if [tuple(k) for k in info.get('key', [])] != [tuple(k) for k in spec['keys']]:
+        return False
+    for option in INDEX_OPTIONS:
+        if spec.get(option) != info.get(option):
+            # unique/sparse 未設定時，資料庫可能回傳 False 或不回傳
+            if not spec.get(option) and not info.get(option):
+                continue
+            return False
+    return True
+
+
+def sync_indexes(db, drop_stale=False):
+    """依註冊表同步索引：建立缺少的、重建定義不同的、刪除多餘的
+
+    回傳 {'created': [...], 'dropped': [...]}，元素為 "集合.索引名稱"。
+    """
+    report = {'created': [], 'dropped': []}
+
+    for collection_name, specs in registered_indexes().items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        wanted = {spec['name']: spec for spec in specs}
+
+        # 刪除不在註冊表內或定義已變更的索引（_id_ 永遠保留）
+        for name, info in existing.items():
+            if name == '_id_':
+                continue
+            if name not in wanted or not _same_index(wanted[name], info):
+                if name in wanted or drop_stale:
+                    collection.drop_index(name)
+                    report['dropped'].append(f'{collection_name}.{name}')
+
+        current = collection.index_information()
+        for name, spec in wanted.items():
+            if name in current:
+                continue
+            options = {k: spec[k] for k in INDEX_OPTIONS if k in spec}
+            collection.create_index(spec['keys'], name=name, background=True, **options)
+            report['created'].append(f'{collection_name}.{name}')
+
+    return report
+
+
+def query_shapes():
+    """列出模型實際使用的查詢形狀：(名稱, 集合, 查詢條件, 排序)
+
+    查詢條件盡量直接取自模型程式碼，避免稽核與實作脫節。
+    """
+    user_id = str(ObjectId())
+    task_id = ObjectId()
+
+    listing, listing_sort = Task.build_user_query(user_id)
+    by_range, range_sort = Task.build_user_query(user_id, date_from='2024-01-01', date_to='2024-01-31')
+    by_page, page_sort = Task.build_user_query(user_id, date_from='2024-01-01', date_to='2024-01-31',
+                                               after=('2024-01-10', '09:00', task_id))
+
+    return [
+        ('Task.find_by_user', 'tasks', listing, listing_sort),
+        ('Task.find_by_user(範圍)', 'tasks', by_range, range_sort),
+        ('Task.find_by_user(分頁)', 'tasks', by_page, page_sort),
+        ('build_occupancy', 'tasks', occupancy_query(user_id, '2024-01-01', '2024-01-14')[0], None),
+        ('Task.find_by_id', 'tasks', {'_id': task_id, 'user_id': user_id}, None),
+        ('ConflictDetector.load', 'tasks', ConflictDetector.build_query(user_id, ['2024-01-10']), None),
+        ('ConflictDetector.load(多日)', 'tasks',
+         ConflictDetector.build_query(user_id, ['2024-01-10', '2024-01-11']), None),
+        ('TaskSeries.expand', 'task_series', TaskSeries.window_query(user_id, '2024-01-01', '2024-01-31'), None),
+        ('TaskSeries.find_by_user', 'task_series', {'user_id': user_id}, [('start_day', 1)]),
+        ('TaskBuckets.find_docs', 'task_buckets', TaskBuckets.window_query(user_id, None, '2024-01-01', '2024-01-31'),
+         None),
+        ('TaskBuckets.put', 'task_buckets', TaskBuckets._pull_op(user_id, task_id, '2024-01-10')[0], None),
+        ('TaskBuckets.refresh', 'tasks', TaskBuckets._refresh_query(user_id, '2024-01'), None),
+        ('TaskChange.since', 'task_changes', {'user_id': user_id, 'seq': {'$gt': 3}},
+         [('seq', 1), ('_id', 1)]),
+        ('TaskEventHub._poll', 'task_changes',
+         {'$or': [{'user_id': user_id, 'seq': {'$gt': 3}}, {'user_id': str(ObjectId()), 'seq': {'$gt': 7}}]},
+         [('seq', 1), ('_id', 1)]),
+        ('TaskChange.compact', 'task_changes', {'op': 'delete', 'changed_at': {'$lt': datetime.utcnow()}}, None),
+        ('TaskDailyStats.find_range', 'task_daily_stats',
+         TaskDailyStats.range_query(user_id, '2024-01-01', '2024-01-31')[0], None),
+        ('TaskDailyStats.recompute', 'tasks', TaskDailyStats._recompute_query(user_id, ['2024-01-10'])[0], None),
+        ('User.find_by_email', 'users', {'email': 'audit@example.com'}, None),
+        ('User.find_by_username', 'users', {'username': 'audit'}, None)
+    ]
+
+
+def _plan_stages(plan):
+    """遞迴取出 explain 計畫中的所有 stage 名稱"""
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan['stage']] if 'stage' in plan else []
+    for key in ('inputStage', 'queryPlan'):
+        stages.extend(_plan_stages(plan.get(key)))
+    for child in plan.get('inputStages', []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def _uses_index_statically(query, specs):
+    """無法 explain 時（例如 mongomock）的靜態判斷：查詢是否命中某個索引的第一個欄位"""
+    fields = set(query) - {'$or'}
+    if not fields and query.get('$or'):
+        # 只有 $or 時每個分支都必須命中索引
+        return all(_uses_index_statically(branch, specs) for branch in query['$or'])
+    first_fields = {spec['keys'][0][0] for spec in specs} | {'_id'}
+    return bool(fields & first_fields)
+
+
+def audit_queries(db):
+    """對每個查詢形狀執行 explain()，回傳 (是否全部通過, 結果列表)
+
+    結果元素為 {'name', 'collection', 'stages', 'mode', 'ok'}；mode 為
+    'explain' 或 'static'（資料庫不支援 explain 時改用靜態判斷）。
+    """
+    specs_by_collection = registered_indexes()
+    results = []
+
+    for name, collection_name, query, sort in query_shapes():
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        if hasattr(cursor, 'explain'):
+            plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+            stages = _plan_stages(plan)
+            ok = 'COLLSCAN' not in stages
+            mode = 'explain'
+        else:
+            ok = _uses_index_statically(query, specs_by_collection.get(collection_name, []))
+            stages = ['IXSCAN'] if ok else ['COLLSCAN']
+            mode = 'static'
+
+        results.append({
+            'name': name,
+            'collection': collection_name,
+            'stages': stages,
+            'mode': mode,
+            'ok': ok
+        })
+
+    return all(result['ok'] for result in results), results
@@ -0,0 +1,63 @@
+# backend/models/revoked_token.py - 已撤銷的 token（登出與「登出所有裝置」）
+from datetime import datetime
+
+class RevokedToken:
+    """revoked_tokens 集合有兩種文件：
+
+        {_id: jti, kind: 'jti', user_id, expires_at, created_at}
+        {_id: 'user:<user_id>', kind: 'user', user_id, revoked_before, expires_at, created_at}
+
+    後者表示該用戶在 revoked_before 之前簽發的 token 全部失效。expires_at 之後
+    token 本身已過期，由 TTL 索引自動刪除。
+    """
+
+    INDEXES = [
+        {'name': 'expires_at_ttl', 'keys': [('expires_at', 1)], 'expireAfterSeconds': 0},
+        {'name': 'created_at', 'keys': [('created_at', 1)]}
+    ]
+
+    @staticmethod
+    def _jti_update(jti, user_id, expires_at):
+        return ({'_id': jti},
+                {'$set': {'kind': 'jti', 'user_id': str(user_id), 'expires_at': expires_at,
+                          'created_at': datetime.utcnow()}})
+
+    @staticmethod
+    def _user_update(user_id, revoked_before, expires_at):
+        return ({'_id': f'user:{user_id}'},
+                {'$set': {'kind': 'user', 'user_id': str(user_id), 'expires_at': expires_at,
+                          'created_at': datetime.utcnow()},
+                 '$max': {'revoked_before': revoked_before}})
+
+    @staticmethod
+    def revoke_jti(db, jti, user_id, expires_at):
+        """撤銷單一 token"""
+        db.revoked_tokens.update_one(*RevokedToken._jti_update(jti, user_id, expires_at), upsert=True)
+
+    @staticmethod
+    def revoke_user(db, user_id, revoked_before, expires_at):
+        """撤銷用戶在 revoked_before（UNIX 秒）之前簽發的所有 token"""
+        db.revoked_tokens.update_one(*RevokedToken._user_update(user_id, revoked_before, expires_at), upsert=True)
+
+    @staticmethod
+    async def revoke_jti_async(adb, jti, user_id, expires_at):
+        """revoke_jti 的 Motor 版本"""
+        await adb.revoked_tokens.update_one(*RevokedToken._jti_update(jti, user_id, expires_at), upsert=True)
+
+    @staticmethod
+    async def revoke_user_async(adb, user_id, revoked_before, expires_at):
+        """revoke_user 的 Motor 版本"""
+        await adb.revoked_tokens.update_one(*RevokedToken._user_update(user_id, revoked_before, expires_at),
+                                            upsert=True)
+
+    @staticmethod
+    def changed_since(db, since=None):
+        """取出 since 之後新增的撤銷紀錄（since 為 None 時取出全部仍有效者）"""
+        query = {'created_at': {'$gt': since}} if since else {'expires_at': {'$gt': datetime.utcnow()}}
+        return list(db.revoked_tokens.find(query).sort('created_at', 1))
+
+    @staticmethod
+    async def changed_since_async(adb, since=None):
+        """changed_since 的 Motor 版本"""
+        query = {'created_at': {'$gt': since}} if since else {'expires_at': {'$gt': datetime.utcnow()}}
+        return await adb.revoked_tokens.find(query).sort('created_at', 1).to_list(None)
@@ -1,10 +1,31 @@
 # backend/models/task.py - 確保用戶ID處理正確
 from datetime import datetime
 from bson import ObjectId
+from utils.cache import task_cache
+from utils.versions import bump_user_version, bump_user_version_async
+from models.task_change import TaskChange
+from models.task_stats import TaskDailyStats
+from models.task_series import TaskSeries
+from models.task_bucket import TaskBuckets
+from utils.timeutils import date_to_day, duration_minutes, time_fields, time_to_minutes
 
 class Task:
+    __slots__ = ('id', 'user_id', 'title', 'date', 'start_time', 'end_time', 'desc', 'created_at',
+                 'series_id', '_stored_date', '_stored_minutes')
+
+    # 索引宣告：對應 find_by_user 的 (user_id, day 範圍, start_min, _id) 排序，
+    # 以及衝突檢查、佔用查詢的 (user_id, day) 前綴。
+    # user_date_start 供每日彙總重算（依日期字串）與 TASK_NUMERIC_QUERIES=false 時使用
+    INDEXES = [
+        {'name': 'user_day_start', 'keys': [('user_id', 1), ('day', 1), ('start_min', 1), ('_id', 1)]},
+        {'name': 'user_date_start', 'keys': [('user_id', 1), ('date', 1), ('start_time', 1), ('_id', 1)]}
+    ]
+
+    # 範圍與排序是否使用數值欄位（day / start_min）；舊資料執行 flask migrate-task-times 前必須為 False
+    NUMERIC_QUERIES = False
+
     def __init__(self, user_id, title, date, start_time, end_time, desc='', 
-                 _id=None, created_at=None):
+                 _id=None, created_at=None, series_id=None):
         self.id = _id
         self.user_id = str(user_id) if user_id else None  # 確保是字符串
         self.title = title
@@ -13,7 +34,15 @@ class Task:
         self.end_time = end_time      # 格式: HH:MM
         self.desc = desc
         self.created_at = created_at or datetime.utcnow()
+        self.series_id = series_id  # 由重複系列展開的發生才有，不寫入 tasks 集合
+        self._stored_date = date if _id else None  # 資料庫中的日期，用於更新時讓舊日期失效
+        self._stored_minutes = duration_minutes(start_time, end_time) if _id else None  # 用於更新每日彙總
     
+    @staticmethod
+    def init_app(app):
+        Task.NUMERIC_QUERIES = app.config.get('TASK_NUMERIC_QUERIES', False)
+        TaskBuckets.init_app(app)
+
     @staticmethod
     def from_dict(data):
         """從字典創建任務實例"""
@@ -25,7 +54,8 @@ class Task:
             end_time=data.get('end_time'),
             desc=data.get('desc', ''),
             _id=data.get('_id'),
-            created_at=data.get('created_at')
+            created_at=data.get('created_at'),
+            series_id=data.get('series_id')
         )
     
     def to_dict(self):
@@ -38,56 +68,314 @@ class Task:
             'start_time': self.start_time,
             'end_time': self.end_time,
             'desc': self.desc,
-            'created_at': self.created_at
+            'created_at': self.created_at,
+            'series_id': self.series_id
         }
     
+    def to_document(self):
+        """轉換為資料庫文件（不含 _id）"""
+        return {
+            'user_id': self.user_id,
+            'title': self.title,
+            'date': self.date,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'desc': self.desc,
+            'created_at': self.created_at,
+            **time_fields(self.date, self.start_time, self.end_time)
+        }
+
     def save(self, db):
         """保存任務到資料庫"""
-        task_dict = self.to_dict()
-        
-        # 移除None值的id
-        if task_dict['id'] is None:
-            task_dict.pop('id', None)
-        
+        task_dict = self.to_document()
+
         if self.id:
             # 更新 - 確保使用 ObjectId
-            db.tasks.update_one(
+            result = db.tasks.update_one(
                 {'_id': ObjectId(self.id), 'user_id': self.user_id},
                 {'$set': task_dict}
             )
+            matched = result.matched_count
         else:
             # 插入
             result = db.tasks.insert_one(task_dict)
             self.id = result.inserted_id
-        
+            matched = True
+
+        if TaskBuckets.ENABLED and matched:
+            TaskBuckets.put(db, {'_id': ObjectId(self.id), **task_dict}, self._stored_date)
+        Task.notify_changed(db, self.user_id, {self._stored_date, self.date} - {None},
+                            upserted=[self.id], stats=self._stats_delta() if matched else None)
+        self._mark_stored()
         return self
     
     def delete(self, db):
         """從資料庫刪除任務"""
-        return db.tasks.delete_one(
+        result = db.tasks.delete_one(
             {'_id': ObjectId(self.id), 'user_id': self.user_id}
         )
+        if result.deleted_count:
+            if TaskBuckets.ENABLED:
+                TaskBuckets.remove(db, self.user_id, ObjectId(self.id), self._stored_date or self.date)
+            Task.notify_changed(db, self.user_id, {self._stored_date or self.date},
+                                deleted=[self.id], stats=self._stats_delta(removed=True))
+        return result
+
+    def _stats_delta(self, removed=False):
+        """本次寫入對每日彙總的差值：移除資料庫中的舊值，加上新值"""
+        deltas = {}
+        if self._stored_date:
+            TaskDailyStats.add(deltas, self._stored_date, -1, -self._stored_minutes)
+        elif removed:
+            TaskDailyStats.add(deltas, self.date, -1, -duration_minutes(self.start_time, self.end_time))
+        if not removed:
+            TaskDailyStats.add(deltas, self.date, 1, duration_minutes(self.start_time, self.end_time))
+        return deltas
+
+    def _mark_stored(self):
+        self._stored_date = self.date
+        self._stored_minutes = duration_minutes(self.start_time, self.end_time)
+
+    @staticmethod
+    def notify_changed(db, user_id, dates, upserted=(), deleted=(), stats=None):
+        """任務寫入後的通知點
+
+        遞增用戶版本（ETag 與同步序號）、記錄被新增/修改與刪除的任務 ID、
+        更新每日彙總，並讓涵蓋這些日期的快取失效。Task.save/delete 會自動呼叫
+        （並以 stats 傳入 $inc 差值，分桶也已由它們更新）；批次寫入、匯入等直接操作集合的路徑
+        也必須呼叫，未傳 stats 時重算這些日期的彙總與分桶。
+        """
+        seq = bump_user_version(db, user_id)
+        TaskChange.record(db, user_id, seq, upserted, deleted)
+        if stats is None:
+            TaskDailyStats.recompute(db, user_id, dates)
+            if TaskBuckets.ENABLED:
+                TaskBuckets.refresh(db, user_id, dates)
+        else:
+            TaskDailyStats.apply(db, user_id, stats)
+        task_cache.invalidate(user_id, sorted(dates))
     
     @staticmethod
-    def find_by_user(db, user_id, date=None):
-        """查找用戶的任務"""
+    def date_filter(date=None, date_from=None, date_to=None):
+        """單日或日期範圍（包含兩端）的查詢條件；NUMERIC_QUERIES 時以 day 比較"""
+        field, convert = ('day', date_to_day) if Task.NUMERIC_QUERIES else ('date', str)
+        if date:
+            return {field: convert(date)}
+        if not (date_from or date_to):
+            return {}
+        condition = {}
+        if date_from:
+            condition['$gte'] = convert(date_from)
+        if date_to:
+            condition['$lte'] = convert(date_to)
+        return {field: condition}
+
+    @staticmethod
+    def dates_filter(dates):
+        """多個日期的查詢條件（單一日期時不使用 $in）"""
+        dates = list(dates)
+        if len(dates) == 1:
+            return Task.date_filter(dates[0])
+        if Task.NUMERIC_QUERIES:
+            return {'day': {'$in': [date_to_day(date) for date in dates]}}
+        return {'date': {'$in': dates}}
+
+    @staticmethod
+    def sort_keys():
+        """列表排序：日期、開始時間、_id"""
+        if Task.NUMERIC_QUERIES:
+            return [('day', 1), ('start_min', 1), ('_id', 1)]
+        return [('date', 1), ('start_time', 1), ('_id', 1)]
+
+    @staticmethod
+    def build_user_query(user_id, date=None, date_from=None, date_to=None, after=None):
+        """組出 find_by_user 使用的查詢條件與排序（索引稽核也會用到）"""
         query = {'user_id': str(user_id)}  # 確保user_id是字符串
+        query.update(Task.date_filter(date, date_from, date_to))
+        sort = Task.sort_keys()
+
+        if after:
+            after_date, after_start, after_id = after
+            if isinstance(after_id, str):
+                # 上一頁停在重複系列的發生：系列 ID 與任務 ID 的先後即為排序結果
+                after_id = ObjectId(after_id.split(':', 1)[0])
+            if Task.NUMERIC_QUERIES:
+                after_date, after_start = date_to_day(after_date), time_to_minutes(after_start)
+            day_field, start_field = sort[0][0], sort[1][0]
+            query['$or'] = [
+                {day_field: {'$gt': after_date}},
+                {day_field: after_date, start_field: {'$gt': after_start}},
+                {day_field: after_date, start_field: after_start, '_id': {'$gt': after_id}}
+            ]
+
+        return query, sort
+
+    @staticmethod
+    def series_window(date=None, date_from=None, date_to=None):
+        """需要展開重複系列的範圍；沒有明確的起訖日期時不展開，回傳 None"""
         if date:
-            query['date'] = date
-        
-        tasks_cursor = db.tasks.find(query).sort([('date', 1), ('start_time', 1)])
-        return [Task.from_dict(task) for task in tasks_cursor]
+            return date, date
+        if date_from and date_to:
+            return date_from, date_to
+        return None
+
+    @staticmethod
+    def find_by_user(db, user_id, date=None, date_from=None, date_to=None,
+                     after=None, limit=None):
+        """查找用戶的任務
+
+        date_from/date_to 為包含端點的日期範圍；after 為上一頁最後一筆的
+        (date, start_time, _id)，依此做 keyset 分頁。指定 date 或 from/to 時，
+        範圍內重複系列的發生會依相同排序併入（_id 為 '<系列ID>:<日期>'）。
+        TASK_STORAGE=buckets 時改由 task_buckets 讀取（一個月一份文件）。
+        """
+        return [Task.from_dict(task) for task in
+                Task.find_docs_by_user(db, user_id, date, date_from, date_to, after, limit)]
+
+    @staticmethod
+    def find_docs_by_user(db, user_id, date=None, date_from=None, date_to=None,
+                          after=None, limit=None, projection=None, version=None):
+        """find_by_user 的原始文件版本（列表直接序列化時使用；回傳的文件可能來自快取，不可修改）
+
+        projection 為 Mongo projection，只取回需要的欄位（快取鍵也會區分）。
+        version 為回應 ETag 使用的用戶版本，加入快取鍵，避免其他程序的舊快取配上新的 ETag。
+        """
+        query, sort = Task.build_user_query(user_id, date, date_from, date_to, after)
+
+        window = Task.series_window(date, date_from, date_to)
+
+        def load():
+            if TaskBuckets.ENABLED:
+                docs = TaskBuckets.find_docs(db, user_id, date, date_from, date_to, after, limit, projection)
+            else:
+                tasks_cursor = db.tasks.find(query, projection).sort(sort)
+                if limit:
+                    tasks_cursor = tasks_cursor.limit(limit)
+                docs = list(tasks_cursor)
+            if window:
+                docs = TaskSeries.merge(docs, TaskSeries.expand(db, user_id, *window, version=version), after, limit)
+            return docs
+
+        key = task_cache.make_key(user_id, date, date_from, date_to,
+                                  extra=(after and '/'.join(map(str, after)), limit,
+                                         projection and ','.join(sorted(projection))),
+                                  version=version)
+        return task_cache.get_or_load(key, load)
     
     @staticmethod
     def find_by_id(db, task_id, user_id):
         """通過ID查找任務"""
+        task_data = Task.find_doc_by_id(db, task_id, user_id)
+        return Task.from_dict(task_data) if task_data else None
+
+    @staticmethod
+    def find_doc_by_id(db, task_id, user_id, projection=None):
+        """find_by_id 的原始文件版本；ID 格式不正確時回傳 None"""
         try:
-            task_data = db.tasks.find_one({
+            return db.tasks.find_one({
                 '_id': ObjectId(task_id), 
                 'user_id': str(user_id)  # 確保user_id是字符串
-            })
-            if task_data:
-                return Task.from_dict(task_data)
+            }, projection)
         except:
-            pass
-        return None
\ No newline at end of file
+            return None
+
+    # ---- 非同步版本（Motor，供 async_app 使用；查詢條件與同步版本共用）----
+
+    async def save_async(self, adb):
+        """save 的 Motor 版本"""
+        task_dict = self.to_document()
+
+        if self.id:
+            result = await adb.tasks.update_one(
+                {'_id': ObjectId(self.id), 'user_id': self.user_id},
+                {'$set': task_dict}
+            )
+            matched = result.matched_count
+        else:
+            result = await adb.tasks.insert_one(task_dict)
+            self.id = result.inserted_id
+            matched = True
+
+        if TaskBuckets.ENABLED and matched:
+            await TaskBuckets.put_async(adb, {'_id': ObjectId(self.id), **task_dict}, self._stored_date)
+        await Task.notify_changed_async(adb, self.user_id, {self._stored_date, self.date} - {None},
+                                        upserted=[self.id], stats=self._stats_delta() if matched else None)
+        self._mark_stored()
+        return self
+
+    async def delete_async(self, adb):
+        """delete 的 Motor 版本"""
+        result = await adb.tasks.delete_one(
+            {'_id': ObjectId(self.id), 'user_id': self.user_id}
+        )
+        if result.deleted_count:
+            if TaskBuckets.ENABLED:
+                await TaskBuckets.remove_async(adb, self.user_id, ObjectId(self.id), self._stored_date or self.date)
+            await Task.notify_changed_async(adb, self.user_id, {self._stored_date or self.date},
+                                            deleted=[self.id], stats=self._stats_delta(removed=True))
+        return result
+
+    @staticmethod
+    async def notify_changed_async(adb, user_id, dates, upserted=(), deleted=(), stats=None):
+        """notify_changed 的 Motor 版本"""
+        seq = await bump_user_version_async(adb, user_id)
+        await TaskChange.record_async(adb, user_id, seq, upserted, deleted)
+        if stats is None:
+            await TaskDailyStats.recompute_async(adb, user_id, dates)
+            if TaskBuckets.ENABLED:
+                await TaskBuckets.refresh_async(adb, user_id, dates)
+        else:
+            await TaskDailyStats.apply_async(adb, user_id, stats)
+        task_cache.invalidate(user_id, sorted(dates))
+
+    @staticmethod
+    async def find_by_user_async(adb, user_id, date=None, date_from=None, date_to=None,
+                                 after=None, limit=None):
+        """find_by_user 的 Motor 版本（共用同一份快取）"""
+        return [Task.from_dict(task) for task in
+                await Task.find_docs_by_user_async(adb, user_id, date, date_from, date_to, after, limit)]
+
+    @staticmethod
+    async def find_docs_by_user_async(adb, user_id, date=None, date_from=None, date_to=None,
+                                      after=None, limit=None, projection=None, version=None):
+        """find_docs_by_user 的 Motor 版本"""
+        query, sort = Task.build_user_query(user_id, date, date_from, date_to, after)
+
+        window = Task.series_window(date, date_from, date_to)
+
+        async def load():
+            if TaskBuckets.ENABLED:
+                docs = await TaskBuckets.find_docs_async(adb, user_id, date, date_from, date_to, after, limit,
+                                                         projection)
+            else:
+                tasks_cursor = adb.tasks.find(query, projection).sort(sort)
+                if limit:
+                    tasks_cursor = tasks_cursor.limit(limit)
+                docs = await tasks_cursor.to_list(None)
+            if window:
+                docs = TaskSeries.merge(docs, await TaskSeries.expand_async(adb, user_id, *window, version=version),
+                                        after, limit)
+            return docs
+
+        key = task_cache.make_key(user_id, date, date_from, date_to,
+                                  extra=(after and '/'.join(map(str, after)), limit,
+                                         projection and ','.join(sorted(projection))),
+                                  version=version)
+        return await task_cache.get_or_load_async(key, load)
+
+    @staticmethod
+    async def find_by_id_async(adb, task_id, user_id):
+        """find_by_id 的 Motor 版本"""
+        task_data = await Task.find_doc_by_id_async(adb, task_id, user_id)
+        return Task.from_dict(task_data) if task_data else None
+
+    @staticmethod
+    async def find_doc_by_id_async(adb, task_id, user_id, projection=None):
+        """find_doc_by_id 的 Motor 版本"""
+        try:
+            return await adb.tasks.find_one({
+                '_id': ObjectId(task_id),
+                'user_id': str(user_id)
+            }, projection)
+        except Exception:
+            return None
@@ -0,0 +1,205 @@
+# backend/models/task_bucket.py - 任務的分桶儲存：每位用戶每月一份（或數份）文件，內嵌該月的任務
+from pymongo import DeleteMany, InsertOne
+from models.task_series import sort_key
+
+# rebuild 時每批寫入的分桶數
+REBUILD_BATCH_SIZE = 100
+
+
+def month_of(date):
+    """YYYY-MM-DD -> 分桶的月份 YYYY-MM"""
+    return date[:7]
+
+
+def month_bounds(month):
+    """月份內日期字串的查詢範圍（包含兩端；日期已驗證為補零的 YYYY-MM-DD）"""
+    return f'{month}-01', f'{month}-31'
+
+
+class TaskBuckets:
+    """task_buckets 集合：
+
+        {_id, user_id, month: 'YYYY-MM', count, tasks: [與 tasks 集合相同形狀的任務文件（含 _id）]}
+
+    tasks 集合仍是主要資料（衝突檢查、批次寫入、匯入匯出與每日彙總都直接查詢它）；
+    TASK_STORAGE=buckets 時 Task.save/delete 以 $push / $pull / 位置 $set 同步更新分桶，
+    任務列表改由分桶讀取，一個月的月曆只需讀一份文件。
+    一個分桶最多 MAX_TASKS 筆，滿了之後 $push 會建立同月份的新分桶（分割）。
+    批次寫入等只知道日期的路徑改以 refresh 從 tasks 集合重建那幾個月份。
+    """
+
+    INDEXES = [
+        {'name': 'user_month', 'keys': [('user_id', 1), ('month', 1)]}
+    ]
+
+    ENABLED = False
+    MAX_TASKS = 200
+
+    @staticmethod
+    def init_app(app):
+        TaskBuckets.ENABLED = app.config.get('TASK_STORAGE', 'documents') == 'buckets'
+        TaskBuckets.MAX_TASKS = app.config.get('TASK_BUCKET_SIZE', 200)
+
+    # ---- 單筆寫入（Task.save/delete）----
+
+    @staticmethod
+    def _replace_op(doc):
+        """同月份內更新：以位置運算子原地替換，不需先 $pull 再 $push"""
+        return ({'user_id': doc['user_id'], 'month': month_of(doc['date']), 'tasks._id': doc['_id']},
+                {'$set': {'tasks.$': doc}})
+
+    @staticmethod
+    def _pull_op(user_id, task_id, date):
+        return ({'user_id': str(user_id), 'month': month_of(date), 'tasks._id': task_id},
+                {'$pull': {'tasks': {'_id': task_id}}, '$inc': {'count': -1}})
+
+    @staticmethod
+    def _push_op(doc):
+        """放入該月份未滿的分桶；都滿了（或還沒有分桶）時 upsert 建立新的分桶"""
+        return ({'user_id': doc['user_id'], 'month': month_of(doc['date']),
+                 'count': {'$lt': TaskBuckets.MAX_TASKS}},
+                {'$push': {'tasks': doc}, '$inc': {'count': 1}})
+
+    @staticmethod
+    def _emptied_query(user_id, date):
+        return {'user_id': str(user_id), 'month': month_of(date), 'count': {'$lte': 0}}
+
+    @staticmethod
+    def put(db, doc, stored_date=None):
+        """新增或更新一筆任務（doc 含 _id）；stored_date 為資料庫中原本的日期"""
+        if stored_date and month_of(stored_date) == month_of(doc['date']):
+            if db.task_buckets.update_one(*TaskBuckets._replace_op(doc)).matched_count:
+                return
+        elif stored_date:
+            TaskBuckets.remove(db, doc['user_id'], doc['_id'], stored_date)
+        db.task_buckets.update_one(*TaskBuckets._push_op(doc), upsert=True)
+
+    @staticmethod
+    def remove(db, user_id, task_id, date):
+        if db.task_buckets.update_one(*TaskBuckets._pull_op(user_id, task_id, date)).modified_count:
+            db.task_buckets.delete_many(TaskBuckets._emptied_query(user_id, date))
+
+    # ---- 重建 ----
+
+    @staticmethod
+    def _chunk(user_id, month, docs):
+        """把同一個月的任務依排序切成多個分桶"""
+        docs = sorted(docs, key=sort_key)
+        size = TaskBuckets.MAX_TASKS
+        return [{'user_id': user_id, 'month': month, 'count': len(docs[i:i + size]), 'tasks': docs[i:i + size]}
+                for i in range(0, len(docs), size)]
+
+    @staticmethod
+    def _refresh_query(user_id, month):
+        date_from, date_to = month_bounds(month)
+        return {'user_id': str(user_id), 'date': {'$gte': date_from, '$lte': date_to}}
+
+    @staticmethod
+    def _refresh_requests(user_id, month, docs):
+        user_id = str(user_id)
+        return ([DeleteMany({'user_id': user_id, 'month': month})] +
+                [InsertOne(bucket) for bucket in TaskBuckets._chunk(user_id, month, docs)])
+
+    @staticmethod
+    def refresh(db, user_id, dates):
+        """從 tasks 集合重建這些日期所在月份的分桶（批次寫入、匯入後使用）"""
+        for month in sorted({month_of(date) for date in dates}):
+            docs = db.tasks.find(TaskBuckets._refresh_query(user_id, month))
+            db.task_buckets.bulk_write(TaskBuckets._refresh_requests(user_id, month, docs), ordered=True)
+
+    @staticmethod
+    def rebuild(db, user_id=None):
+        """清除並從 tasks 集合重建分桶（user_id 為 None 時重建所有用戶），回傳寫入的分桶數"""
+        query = {'user_id': str(user_id)} if user_id else {}
+        db.task_buckets.delete_many(query)
+
+        cursor = db.tasks.find(query).sort([('user_id', 1), ('date', 1)])
+        written = 0
+        batch = []
+        current, docs = None, []
+        for doc in cursor:
+            key = (doc['user_id'], month_of(doc['date']))
+            if key != current:
+                if docs:
+                    batch.extend(TaskBuckets._chunk(*current, docs))
+                current, docs = key, []
+            docs.append(doc)
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                db.task_buckets.insert_many(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if docs:
+            batch.extend(TaskBuckets._chunk(*current, docs))
+        if batch:
+            db.task_buckets.insert_many(batch, ordered=False)
+            written += len(batch)
+        return written
+
+    # ---- 查詢 ----
+
+    @staticmethod
+    def window_query(user_id, date=None, date_from=None, date_to=None):
+        """涵蓋查詢範圍的分桶"""
+        query = {'user_id': str(user_id)}
+        if date:
+            query['month'] = month_of(date)
+        elif date_from or date_to:
+            query['month'] = {}
+            if date_from:
+                query['month']['$gte'] = month_of(date_from)
+            if date_to:
+                query['month']['$lte'] = month_of(date_to)
+        return query
+
+    @staticmethod
+    def select(buckets, date=None, date_from=None, date_to=None, after=None, limit=None, projection=None):
+        """從分桶取出範圍內的任務，依 Task.build_user_query 的順序排序並分頁"""
+        low, high = (date, date) if date else (date_from, date_to)
+        docs = [doc for bucket in buckets for doc in bucket['tasks']
+                if (not low or doc['date'] >= low) and (not high or doc['date'] <= high)]
+        if after:
+            after_key = sort_key({'date': after[0], 'start_time': after[1], '_id': after[2]})
+            docs = [doc for doc in docs if sort_key(doc) > after_key]
+        docs.sort(key=sort_key)
+        if limit:
+            docs = docs[:limit]
+        if projection:
+            fields = set(projection) | {'_id'}
+            docs = [{name: value for name, value in doc.items() if name in fields} for doc in docs]
+        return docs
+
+    @staticmethod
+    def find_docs(db, user_id, date=None, date_from=None, date_to=None, after=None, limit=None,
+                  projection=None):
+        """Task.find_docs_by_user 的分桶版本"""
+        buckets = db.task_buckets.find(TaskBuckets.window_query(user_id, date, date_from, date_to), {'tasks': 1})
+        return TaskBuckets.select(buckets, date, date_from, date_to, after, limit, projection)
+
+    # ---- 非同步版本（Motor，供 async_app 使用）----
+
+    @staticmethod
+    async def put_async(adb, doc, stored_date=None):
+        if stored_date and month_of(stored_date) == month_of(doc['date']):
+            if (await adb.task_buckets.update_one(*TaskBuckets._replace_op(doc))).matched_count:
+                return
+        elif stored_date:
+            await TaskBuckets.remove_async(adb, doc['user_id'], doc['_id'], stored_date)
+        await adb.task_buckets.update_one(*TaskBuckets._push_op(doc), upsert=True)
+
+    @staticmethod
+    async def remove_async(adb, user_id, task_id, date):
+        if (await adb.task_buckets.update_one(*TaskBuckets._pull_op(user_id, task_id, date))).modified_count:
+            await adb.task_buckets.delete_many(TaskBuckets._emptied_query(user_id, date))
+
+    @staticmethod
+    async def refresh_async(adb, user_id, dates):
+        for month in sorted({month_of(date) for date in dates}):
+            docs = await adb.tasks.find(TaskBuckets._refresh_query(user_id, month)).to_list(None)
+            await adb.task_buckets.bulk_write(TaskBuckets._refresh_requests(user_id, month, docs), ordered=True)
+
+    @staticmethod
+    async def find_docs_async(adb, user_id, date=None, date_from=None, date_to=None, after=None, limit=None,
+                              projection=None):
+        buckets = await adb.task_buckets.find(TaskBuckets.window_query(user_id, date, date_from, date_to),
+                                              {'tasks': 1}).to_list(None)
+        return TaskBuckets.select(buckets, date, date_from, date_to, after, limit, projection)
@@ -0,0 +1,129 @@
+# backend/models/task_change.py - 任務變更紀錄（增量同步與刪除墓碑）
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+
+class TaskChange:
+    """每個任務保留一筆最新的變更紀錄：
+
+        {_id: 任務ID, user_id, seq, op: 'upsert' | 'delete', changed_at}
+        {_id: 系列ID, user_id, seq, op: 'series', changed_at}
+
+    seq 取自用戶的任務版本計數器（單調遞增），op 為 delete 的紀錄即為墓碑。
+    重複系列的發生在查詢時才展開，系列新增、修改或刪除時只記錄 op 為 series 的紀錄，
+    用戶端收到後應重新載入列表。
+    """
+
+    INDEXES = [
+        {'name': 'user_seq', 'keys': [('user_id', 1), ('seq', 1), ('_id', 1)]},
+        {'name': 'op_changed_at', 'keys': [('op', 1), ('changed_at', 1)]}
+    ]
+
+    @staticmethod
+    def _record_requests(user_id, seq, upserted, deleted, series=()):
+        now = datetime.utcnow()
+        return [
+            UpdateOne(
+                {'_id': ObjectId(task_id)},
+                {'$set': {'user_id': str(user_id), 'seq': seq, 'op': op, 'changed_at': now}},
+                upsert=True
+            )
+            for op, task_ids in (('upsert', upserted), ('delete', deleted), ('series', series))
+            for task_id in task_ids
+        ]
+
+    @staticmethod
+    def record(db, user_id, seq, upserted=(), deleted=(), series=()):
+        """以單次 bulk_write 記錄一批任務（或系列）的變更"""
+        requests = TaskChange._record_requests(user_id, seq, upserted, deleted, series)
+        if requests:
+            db.task_changes.bulk_write(requests, ordered=False)
+
+    @staticmethod
+    async def record_async(adb, user_id, seq, upserted=(), deleted=(), series=()):
+        """record 的 Motor 版本"""
+        requests = TaskChange._record_requests(user_id, seq, upserted, deleted, series)
+        if requests:
+            await adb.task_changes.bulk_write(requests, ordered=False)
+
+    @staticmethod
+    def encode_token(seq, last_id=None):
+        return f'{seq}-{last_id}' if last_id else str(seq)
+
+    @staticmethod
+    def decode_token(token):
+        """解析同步 token，回傳 (seq, last_id)；格式錯誤時拋出 ValueError"""
+        if not token:
+            return 0, None
+        seq, _, last_id = str(token).partition('-')
+        try:
+            return int(seq), ObjectId(last_id) if last_id else None
+        except Exception:
+            raise ValueError('同步 token 格式不正確')
+
+    @staticmethod
+    def _since_query(user_id, seq, last_id):
+        query = {'user_id': str(user_id)}
+        if last_id:
+            query['$or'] = [
+                {'seq': {'$gt': seq}},
+                {'seq': seq, '_id': {'$gt': last_id}}
+            ]
+        else:
+            query['seq'] = {'$gt': seq}
+        return query
+
+    @staticmethod
+    def since(db, user_id, seq, last_id=None, limit=500):
+        """依 (seq, _id) 順序取出 token 之後的變更紀錄，最多 limit + 1 筆
+
+        注意：序號在寫入任務之後才遞增並記錄，同一用戶跨程序同時寫入時，
+        較小序號的紀錄可能晚一步出現；用戶端下次同步時，該任務若再被修改
+        仍會以新序號補上。
+        """
+        cursor = (db.task_changes.find(TaskChange._since_query(user_id, seq, last_id))
+                  .sort([('seq', 1), ('_id', 1)])
+                  .limit(limit + 1))
+        return list(cursor)
+
+    @staticmethod
+    async def since_async(adb, user_id, seq, last_id=None, limit=500):
+        """since 的 Motor 版本"""
+        cursor = (adb.task_changes.find(TaskChange._since_query(user_id, seq, last_id))
+                  .sort([('seq', 1), ('_id', 1)])
+                  .limit(limit + 1))
+        return await cursor.to_list(None)
+
+    @staticmethod
+    def compacted_seq(db, user_id):
+        """已被壓縮的最大序號；比它舊的 token 必須重新完整同步"""
+        doc = db.task_versions.find_one({'_id': str(user_id)}, {'compacted_seq': 1})
+        return (doc or {}).get('compacted_seq', 0)
+
+    @staticmethod
+    async def compacted_seq_async(adb, user_id):
+        """compacted_seq 的 Motor 版本"""
+        doc = await adb.task_versions.find_one({'_id': str(user_id)}, {'compacted_seq': 1})
+        return (doc or {}).get('compacted_seq', 0)
+
+    @staticmethod
+    def compact(db, retention_days=30):
+        """刪除超過保留期限的墓碑，並記錄每個用戶被壓縮到的序號
+
+        回傳刪除的墓碑數量。
+        """
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        query = {'op': 'delete', 'changed_at': {'$lt': cutoff}}
+
+        pipeline = [
+            {'$match': query},
+            {'$group': {'_id': '$user_id', 'max_seq': {'$max': '$seq'}}}
+        ]
+        for group in db.task_changes.aggregate(pipeline):
+            db.task_versions.update_one(
+                {'_id': group['_id']},
+                {'$max': {'compacted_seq': group['max_seq']}},
+                upsert=True
+            )
+
+        return db.task_changes.delete_many(query).deleted_count
@@ -0,0 +1,299 @@
+# backend/models/task_series.py - 重複任務系列：只儲存一份規則，查詢時才依範圍展開
+from datetime import datetime
+from itertools import islice
+from bson import ObjectId
+from models.task_change import TaskChange
+from utils.cache import task_cache
+from utils.recurrence import format_rule, iter_dates, last_date
+from utils.timeutils import date_to_day, parse_date, time_fields, time_to_minutes
+from utils.versions import bump_user_version, bump_user_version_async
+
+# 單一查詢範圍內最多展開的發生次數（每個系列），避免極大範圍的查詢
+MAX_WINDOW_OCCURRENCES = 10000
+
+
+def occurrence_id(series_id, date):
+    """展開後的任務 ID：'<系列ID>:<YYYY-MM-DD>'"""
+    return f'{series_id}:{date}'
+
+
+def split_occurrence_id(value):
+    """occurrence_id 的反向；不是發生 ID 時回傳 None，格式錯誤時拋出 ValueError"""
+    if not isinstance(value, str) or ':' not in value:
+        return None
+    series_id, date = value.split(':', 1)
+    parse_date(date)
+    return ObjectId(series_id), date
+
+
+def sort_key(doc):
+    """任務與發生的共同排序：(日序號, 開始分鐘, ID 字串)，與 Task.build_user_query 的排序一致
+
+    ObjectId 的十六進位字串順序與 ObjectId 本身相同，發生 ID 以系列 ID 開頭，因此可以混合排序。
+    """
+    try:
+        return date_to_day(doc['date']), time_to_minutes(doc['start_time']), str(doc['_id'])
+    except (KeyError, ValueError, AttributeError):
+        return -1, -1, str(doc.get('_id'))
+
+
+class TaskSeries:
+    """task_series 集合：
+
+        {_id, user_id, title, desc, date（第一次的日期）, start_time, end_time, start_min, end_min,
+         rule: {freq, interval, byday, until, count}, exdates: [YYYY-MM-DD], start_day, end_day, created_at}
+
+    start_day / end_day 為第一次與最後一次發生的日序號（沒有結束條件時 end_day 為 None），
+    用來找出與查詢範圍重疊的系列。發生不寫入 tasks 集合，由 expand 依範圍產生。
+    """
+
+    __slots__ = ('id', 'user_id', 'title', 'date', 'start_time', 'end_time', 'desc', 'rule', 'exdates',
+                 'created_at')
+
+    INDEXES = [
+        {'name': 'user_start_day', 'keys': [('user_id', 1), ('start_day', 1)]}
+    ]
+
+    def __init__(self, user_id, title, date, start_time, end_time, rule, desc='', exdates=(),
+                 _id=None, created_at=None):
+        self.id = _id
+        self.user_id = str(user_id) if user_id else None
+        self.title = title
+        self.date = date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.desc = desc
+        self.rule = rule
+        self.exdates = sorted(set(exdates))
+        self.created_at = created_at or datetime.utcnow()
+
+    @staticmethod
+    def from_dict(data):
+        return TaskSeries(
+            user_id=data.get('user_id'),
+            title=data.get('title'),
+            date=data.get('date'),
+            start_time=data.get('start_time'),
+            end_time=data.get('end_time'),
+            rule=data.get('rule'),
+            desc=data.get('desc', ''),
+            exdates=data.get('exdates', ()),
+            _id=data.get('_id'),
+            created_at=data.get('created_at')
+        )
+
+    @staticmethod
+    def from_validated(user_id, data, _id=None, created_at=None):
+        """由 validate_series_data 驗證過的請求資料建立（更新時帶入原本的 _id 與 created_at）"""
+        return TaskSeries(
+            user_id=str(user_id),
+            title=data['title'],
+            date=data['date'],
+            start_time=data['startTime'],
+            end_time=data['endTime'],
+            rule=data['rule'],
+            desc=data.get('desc', ''),
+            exdates=data.get('exdates', ()),
+            _id=_id,
+            created_at=created_at
+        )
+
+    def to_dict(self):
+        return {
+            'id': str(self.id) if self.id else None,
+            'user_id': self.user_id,
+            'title': self.title,
+            'date': self.date,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'desc': self.desc,
+            'rule': self.rule,
+            'rrule': format_rule(self.rule),
+            'exdates': self.exdates,
+            'created_at': self.created_at
+        }
+
+    def to_document(self):
+        last = last_date(parse_date(self.date), self.rule)
+        fields = time_fields(self.date, self.start_time, self.end_time)
+        return {
+            'user_id': self.user_id,
+            'title': self.title,
+            'date': self.date,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'start_min': fields['start_min'],
+            'end_min': fields['end_min'],
+            'desc': self.desc,
+            'rule': self.rule,
+            'exdates': self.exdates,
+            'start_day': fields['day'],
+            'end_day': date_to_day(last.isoformat()) if last else None,
+            'created_at': self.created_at
+        }
+
+    def iter_occurrence_dates(self, date_from, date_to):
+        """依序產生範圍內（含兩端）的發生日期字串"""
+        for day in iter_dates(parse_date(self.date), self.rule, parse_date(date_from), parse_date(date_to),
+                              self.exdates):
+            yield day.isoformat()
+
+    def occurrence_dates(self, date_from, date_to):
+        """範圍內（含兩端）的發生日期字串"""
+        return list(self.iter_occurrence_dates(date_from, date_to))
+
+    # ---- 寫入 ----
+
+    def save(self, db):
+        document = self.to_document()
+        if self.id:
+            db.task_series.update_one({'_id': ObjectId(self.id), 'user_id': self.user_id}, {'$set': document})
+        else:
+            self.id = db.task_series.insert_one(document).inserted_id
+        TaskSeries.notify_changed(db, self.user_id, self.id)
+        return self
+
+    def delete(self, db):
+        result = db.task_series.delete_one({'_id': ObjectId(self.id), 'user_id': self.user_id})
+        if result.deleted_count:
+            TaskSeries.notify_changed(db, self.user_id, self.id)
+        return result
+
+    def exclude(self, db, date):
+        """排除單一發生（例如只刪除某一天的課）"""
+        db.task_series.update_one({'_id': ObjectId(self.id), 'user_id': self.user_id},
+                                  {'$addToSet': {'exdates': date}})
+        self.exdates = sorted(set(self.exdates) | {date})
+        TaskSeries.notify_changed(db, self.user_id, self.id)
+
+    @staticmethod
+    def notify_changed(db, user_id, series_id):
+        """系列寫入後遞增用戶版本（ETag）並讓該用戶所有列表與展開快取失效
+
+        系列可能涵蓋任意多天，因此不依日期精準失效；/changes 與即時事件只記錄一筆 op 為 series 的變更。
+        """
+        seq = bump_user_version(db, user_id)
+        TaskChange.record(db, user_id, seq, series=[series_id])
+        task_cache.invalidate(user_id)
+
+    # ---- 查詢與展開 ----
+
+    @staticmethod
+    def window_query(user_id, date_from, date_to):
+        """與 [date_from, date_to] 重疊的系列"""
+        return {
+            'user_id': str(user_id),
+            'start_day': {'$lte': date_to_day(date_to)},
+            '$or': [{'end_day': None}, {'end_day': {'$gte': date_to_day(date_from)}}]
+        }
+
+    @staticmethod
+    def find_by_user(db, user_id):
+        return [TaskSeries.from_dict(doc) for doc in
+                db.task_series.find({'user_id': str(user_id)}).sort('start_day', 1)]
+
+    @staticmethod
+    def find_by_id(db, series_id, user_id):
+        try:
+            doc = db.task_series.find_one({'_id': ObjectId(series_id), 'user_id': str(user_id)})
+        except Exception:
+            return None
+        return TaskSeries.from_dict(doc) if doc else None
+
+    @staticmethod
+    def expand_docs(series_docs, date_from, date_to):
+        """把系列文件展開為範圍內的發生文件（形狀與 tasks 集合的文件相同，另帶 series_id）"""
+        occurrences = []
+        for doc in series_docs:
+            series = TaskSeries.from_dict(doc)
+            series_id = str(series.id)
+            for date in islice(series.iter_occurrence_dates(date_from, date_to), MAX_WINDOW_OCCURRENCES):
+                occurrences.append({
+                    '_id': occurrence_id(series_id, date),
+                    'series_id': series_id,
+                    'user_id': series.user_id,
+                    'title': series.title,
+                    'date': date,
+                    'start_time': series.start_time,
+                    'end_time': series.end_time,
+                    'desc': series.desc,
+                    'created_at': series.created_at,
+                    'day': date_to_day(date),
+                    'start_min': doc['start_min'],
+                    'end_min': doc['end_min']
+                })
+        occurrences.sort(key=sort_key)
+        return occurrences
+
+    @staticmethod
+    def expand(db, user_id, date_from, date_to, version=None):
+        """範圍內所有系列的發生（依 sort_key 排序），以範圍（與用戶版本）為鍵快取"""
+        def load():
+            return TaskSeries.expand_docs(
+                db.task_series.find(TaskSeries.window_query(user_id, date_from, date_to)), date_from, date_to)
+
+        key = task_cache.make_key(user_id, None, date_from, date_to, extra=('series',), version=version)
+        return task_cache.get_or_load(key, load)
+
+    @staticmethod
+    def merge(docs, occurrences, after=None, limit=None):
+        """把發生併入已排序的任務文件；after 為分頁游標 (date, start_time, id)"""
+        if after:
+            after_key = sort_key({'date': after[0], 'start_time': after[1], '_id': after[2]})
+            occurrences = [doc for doc in occurrences if sort_key(doc) > after_key]
+        if not occurrences:
+            return docs
+        merged = sorted(list(docs) + occurrences, key=sort_key)
+        return merged[:limit] if limit else merged
+
+    # ---- 非同步版本（Motor，供 async_app 使用）----
+
+    async def save_async(self, adb):
+        document = self.to_document()
+        if self.id:
+            await adb.task_series.update_one({'_id': ObjectId(self.id), 'user_id': self.user_id},
+                                             {'$set': document})
+        else:
+            self.id = (await adb.task_series.insert_one(document)).inserted_id
+        await TaskSeries.notify_changed_async(adb, self.user_id, self.id)
+        return self
+
+    async def delete_async(self, adb):
+        result = await adb.task_series.delete_one({'_id': ObjectId(self.id), 'user_id': self.user_id})
+        if result.deleted_count:
+            await TaskSeries.notify_changed_async(adb, self.user_id, self.id)
+        return result
+
+    async def exclude_async(self, adb, date):
+        await adb.task_series.update_one({'_id': ObjectId(self.id), 'user_id': self.user_id},
+                                         {'$addToSet': {'exdates': date}})
+        self.exdates = sorted(set(self.exdates) | {date})
+        await TaskSeries.notify_changed_async(adb, self.user_id, self.id)
+
+    @staticmethod
+    async def notify_changed_async(adb, user_id, series_id):
+        seq = await bump_user_version_async(adb, user_id)
+        await TaskChange.record_async(adb, user_id, seq, series=[series_id])
+        task_cache.invalidate(user_id)
+
+    @staticmethod
+    async def find_by_user_async(adb, user_id):
+        docs = await adb.task_series.find({'user_id': str(user_id)}).sort('start_day', 1).to_list(None)
+        return [TaskSeries.from_dict(doc) for doc in docs]
+
+    @staticmethod
+    async def find_by_id_async(adb, series_id, user_id):
+        try:
+            doc = await adb.task_series.find_one({'_id': ObjectId(series_id), 'user_id': str(user_id)})
+        except Exception:
+            return None
+        return TaskSeries.from_dict(doc) if doc else None
+
+    @staticmethod
+    async def expand_async(adb, user_id, date_from, date_to, version=None):
+        async def load():
+            docs = await adb.task_series.find(TaskSeries.window_query(user_id, date_from, date_to)).to_list(None)
+            return TaskSeries.expand_docs(docs, date_from, date_to)
+
+        key = task_cache.make_key(user_id, None, date_from, date_to, extra=('series',), version=version)
+        return await task_cache.get_or_load_async(key, load)
@@ -0,0 +1,176 @@
+# backend/models/task_stats.py - 每位用戶每日的任務數與忙碌時數（增量維護的彙總）
+from pymongo import DeleteOne, UpdateOne, ReplaceOne
+from utils.timeutils import duration_minutes
+
+# rebuild 時每批寫入的文件數
+REBUILD_BATCH_SIZE = 1000
+
+
+class TaskDailyStats:
+    """task_daily_stats 集合：
+
+        {_id: '<user_id>:<date>', user_id, date, count, minutes}
+
+    Task.save/delete 以 $inc 套用差值；批次寫入、匯入等路徑只知道受影響的日期，
+    改以 recompute 重算那幾天。並行更新同一任務時差值可能短暫失準，
+    可用 flask rebuild-task-stats 從 tasks 集合完整重建。
+    """
+
+    INDEXES = [
+        {'name': 'user_date', 'keys': [('user_id', 1), ('date', 1)]}
+    ]
+
+    @staticmethod
+    def _id(user_id, date):
+        return f'{user_id}:{date}'
+
+    @staticmethod
+    def add(deltas, date, count, minutes):
+        """累加到 {date: [count, minutes]} 形式的差值"""
+        entry = deltas.setdefault(date, [0, 0])
+        entry[0] += count
+        entry[1] += minutes
+        return deltas
+
+    @staticmethod
+    def _inc_requests(user_id, deltas):
+        user_id = str(user_id)
+        return [
+            UpdateOne(
+                {'_id': TaskDailyStats._id(user_id, date)},
+                {'$inc': {'count': count, 'minutes': minutes},
+                 '$setOnInsert': {'user_id': user_id, 'date': date}},
+                upsert=True
+            )
+            for date, (count, minutes) in deltas.items() if count or minutes
+        ]
+
+    @staticmethod
+    def _emptied_query(user_id, deltas):
+        """減少後可能歸零的日期；歸零的彙總文件刪除，不留在集合中"""
+        dates = [date for date, (count, _) in deltas.items() if count < 0]
+        if not dates:
+            return None
+        return {'_id': {'$in': [TaskDailyStats._id(user_id, date) for date in dates]}, 'count': {'$lte': 0}}
+
+    @staticmethod
+    def apply(db, user_id, deltas):
+        """以 $inc 套用差值"""
+        requests = TaskDailyStats._inc_requests(user_id, deltas)
+        if requests:
+            db.task_daily_stats.bulk_write(requests, ordered=False)
+            emptied = TaskDailyStats._emptied_query(user_id, deltas)
+            if emptied:
+                db.task_daily_stats.delete_many(emptied)
+
+    @staticmethod
+    def _totals(docs):
+        """由任務文件算出 {(user_id, date): [count, minutes]}"""
+        totals = {}
+        for doc in docs:
+            entry = totals.setdefault((doc['user_id'], doc['date']), [0, 0])
+            entry[0] += 1
+            entry[1] += duration_minutes(doc.get('start_time'), doc.get('end_time'))
+        return totals
+
+    @staticmethod
+    def _replace_requests(user_id, dates, totals):
+        """把指定日期的彙總改為 totals 的值；沒有任務的日期刪除"""
+        user_id = str(user_id)
+        requests = []
+        for date in dates:
+            _id = TaskDailyStats._id(user_id, date)
+            total = totals.get((user_id, date))
+            if total:
+                requests.append(ReplaceOne(
+                    {'_id': _id},
+                    {'user_id': user_id, 'date': date, 'count': total[0], 'minutes': total[1]},
+                    upsert=True
+                ))
+            else:
+                requests.append(DeleteOne({'_id': _id}))
+        return requests
+
+    @staticmethod
+    def _recompute_query(user_id, dates):
+        return ({'user_id': str(user_id), 'date': {'$in': sorted(dates)}},
+                {'_id': 0, 'user_id': 1, 'date': 1, 'start_time': 1, 'end_time': 1})
+
+    @staticmethod
+    def recompute(db, user_id, dates):
+        """從 tasks 集合重算指定日期的彙總"""
+        if not dates:
+            return
+        totals = TaskDailyStats._totals(db.tasks.find(*TaskDailyStats._recompute_query(user_id, dates)))
+        db.task_daily_stats.bulk_write(TaskDailyStats._replace_requests(user_id, dates, totals), ordered=False)
+
+    @staticmethod
+    def rebuild(db, user_id=None):
+        """清除並從 tasks 集合重建彙總（user_id 為 None 時重建所有用戶），回傳寫入的文件數"""
+        query = {'user_id': str(user_id)} if user_id else {}
+        db.task_daily_stats.delete_many(query)
+
+        cursor = (db.tasks.find(query, {'_id': 0, 'user_id': 1, 'date': 1, 'start_time': 1, 'end_time': 1})
+                  .sort([('user_id', 1), ('date', 1)])
+                  .batch_size(REBUILD_BATCH_SIZE))
+        written = 0
+        batch = []
+        current = None
+        for doc in cursor:
+            key = (doc['user_id'], doc['date'])
+            if current is None or current['_key'] != key:
+                if current is not None:
+                    batch.append(current)
+                current = {'_key': key, 'count': 0, 'minutes': 0}
+            current['count'] += 1
+            current['minutes'] += duration_minutes(doc.get('start_time'), doc.get('end_time'))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                written += TaskDailyStats._insert(db, batch)
+                batch = []
+        if current is not None:
+            batch.append(current)
+        if batch:
+            written += TaskDailyStats._insert(db, batch)
+        return written
+
+    @staticmethod
+    def _insert(db, batch):
+        db.task_daily_stats.insert_many([
+            {'_id': TaskDailyStats._id(*entry['_key']), 'user_id': entry['_key'][0], 'date': entry['_key'][1],
+             'count': entry['count'], 'minutes': entry['minutes']}
+            for entry in batch
+        ], ordered=False)
+        return len(batch)
+
+    @staticmethod
+    def range_query(user_id, date_from, date_to):
+        return ({'user_id': str(user_id), 'date': {'$gte': date_from, '$lte': date_to}},
+                {'_id': 0, 'date': 1, 'count': 1, 'minutes': 1})
+
+    @staticmethod
+    def find_range(db, user_id, date_from, date_to):
+        """取出日期範圍內（含兩端）有任務的每日彙總"""
+        return list(db.task_daily_stats.find(*TaskDailyStats.range_query(user_id, date_from, date_to)))
+
+    # ---- 非同步版本（Motor，供 async_app 使用）----
+
+    @staticmethod
+    async def apply_async(adb, user_id, deltas):
+        requests = TaskDailyStats._inc_requests(user_id, deltas)
+        if requests:
+            await adb.task_daily_stats.bulk_write(requests, ordered=False)
+            emptied = TaskDailyStats._emptied_query(user_id, deltas)
+            if emptied:
+                await adb.task_daily_stats.delete_many(emptied)
+
+    @staticmethod
+    async def recompute_async(adb, user_id, dates):
+        if not dates:
+            return
+        docs = await adb.tasks.find(*TaskDailyStats._recompute_query(user_id, dates)).to_list(None)
+        await adb.task_daily_stats.bulk_write(
+            TaskDailyStats._replace_requests(user_id, dates, TaskDailyStats._totals(docs)), ordered=False)
+
+    @staticmethod
+    async def find_range_async(adb, user_id, date_from, date_to):
+        return await adb.task_daily_stats.find(*TaskDailyStats.range_query(user_id, date_from, date_to)).to_list(None)
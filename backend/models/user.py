@@ -2,8 +2,17 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from bson import ObjectId
+from utils.cache import profile_cache
 
 class User:
+    __slots__ = ('id', 'username', 'email', 'password_hash', 'created_at')
+
+    # 索引宣告：登入/註冊以 email、username 查找並要求唯一
+    INDEXES = [
+        {'name': 'email_1', 'keys': [('email', 1)], 'unique': True},
+        {'name': 'username_1', 'keys': [('username', 1)], 'unique': True}
+    ]
+
     def __init__(self, username, email, password, _id=None, created_at=None):
         self.id = _id
         self.username = username
@@ -49,12 +58,36 @@ class User:
             'created_at': self.created_at
         }
     
+    def profile(self):
+        """回應中使用的公開用戶資料"""
+        return {
+            'id': str(self.id),
+            'username': self.username,
+            'email': self.email
+        }
+
+    def token_claims(self):
+        """簽發 token 時附加的 claims，讓 /me 不需查詢資料庫"""
+        return {'username': self.username, 'email': self.email}
+
+    @staticmethod
+    def profile_from_claims(user_id, claims):
+        """由 token claims 組出用戶資料；舊 token 沒有這些 claims 時回傳 None"""
+        if not claims.get('username') or not claims.get('email'):
+            return None
+        return {'id': str(user_id), 'username': claims['username'], 'email': claims['email']}
+
     def check_password(self, password):
         """檢查密碼 - 修正版本"""
         if not self.password_hash:
             return False
         return check_password_hash(self.password_hash, password)
     
+    def update_password_hash(self, db, password_hash):
+        """只更新密碼雜湊（登入時升級舊雜湊）"""
+        self.password_hash = password_hash
+        db.users.update_one({'_id': ObjectId(self.id)}, {'$set': {'password_hash': password_hash}})
+
     @staticmethod
     def find_by_email(db, email):
         """通過郵箱查找用戶"""
@@ -63,6 +96,15 @@ class User:
             return User.from_dict(user_data)
         return None
     
+    @staticmethod
+    def find_by_id(db, user_id):
+        """通過ID查找用戶"""
+        try:
+            user_data = db.users.find_one({'_id': ObjectId(user_id)})
+        except Exception:
+            return None
+        return User.from_dict(user_data) if user_data else None
+
     @staticmethod
     def find_by_username(db, username):
         """通過用戶名查找用戶"""
@@ -75,9 +117,8 @@ class User:
         """保存用戶到資料庫"""
         user_dict = self.to_dict()
         
-        # 移除None值的_id
-        if user_dict['_id'] is None:
-            user_dict.pop('_id', None)
+        # _id 不可放進 $set（to_dict 中是字串），插入時由資料庫產生
+        user_dict.pop('_id', None)
         
         if self.id:
             # 更新
@@ -85,9 +126,48 @@ class User:
                 {'_id': ObjectId(self.id)},
                 {'$set': user_dict}
             )
+            profile_cache.invalidate(self.id)
         else:
             # 插入
             result = db.users.insert_one(user_dict)
             self.id = result.inserted_id
         
-        return self
\ No newline at end of file
+        return self
+
+    # ---- 非同步版本（Motor，供 async_app 使用）----
+
+    @staticmethod
+    async def find_by_email_async(adb, email):
+        user_data = await adb.users.find_one({'email': email})
+        return User.from_dict(user_data) if user_data else None
+
+    @staticmethod
+    async def find_by_username_async(adb, username):
+        user_data = await adb.users.find_one({'username': username})
+        return User.from_dict(user_data) if user_data else None
+
+    @staticmethod
+    async def find_by_id_async(adb, user_id):
+        try:
+            user_data = await adb.users.find_one({'_id': ObjectId(user_id)})
+        except Exception:
+            return None
+        return User.from_dict(user_data) if user_data else None
+
+    async def update_password_hash_async(self, adb, password_hash):
+        self.password_hash = password_hash
+        await adb.users.update_one({'_id': ObjectId(self.id)}, {'$set': {'password_hash': password_hash}})
+
+    async def save_async(self, adb):
+        """save 的 Motor 版本"""
+        user_dict = self.to_dict()
+        user_dict.pop('_id', None)
+
+        if self.id:
+            await adb.users.update_one({'_id': ObjectId(self.id)}, {'$set': user_dict})
+            profile_cache.invalidate(self.id)
+        else:
+            result = await adb.users.insert_one(user_dict)
+            self.id = result.inserted_id
+
+        return self
@@ -0,0 +1,207 @@
+# backend/routes/async_auth.py - routes/auth.py 的非同步版本（Quart + Motor）
+from datetime import timedelta
+from quart import Blueprint, current_app, request, jsonify
+from models.user import User
+from utils.async_database import amongo
+from utils.async_jwt import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from utils.cache import profile_cache
+from utils.hashing import password_hasher, HashingOverloaded
+from utils.log import get_logger
+from utils.revocation import revocation_list
+from utils.ratelimit import rate_limit
+
+auth_bp = Blueprint('auth', __name__)
+logger = get_logger('async_auth')
+
+def overloaded_response(error):
+    """雜湊程序池滿載時快速回傳 503，讓用戶端稍後重試"""
+    return jsonify({
+        'success': False,
+        'message': '目前登入人數過多，請稍後再試'
+    }), 503, {'Retry-After': str(error.retry_after)}
+
+@auth_bp.route('/register', methods=['POST'])
+@rate_limit('register')
+async def register():
+    try:
+        data = await request.get_json()
+        username = data.get('username', '').strip()
+        email = data.get('email', '').strip()
+        password = data.get('password', '').strip()
+
+        # 驗證輸入
+        if not all([username, email, password]):
+            return jsonify({
+                'success': False,
+                'message': '請填寫所有欄位'
+            }), 400
+
+        # 檢查用戶是否已存在
+        if await User.find_by_email_async(amongo.db, email):
+            return jsonify({
+                'success': False,
+                'message': '電子郵件已存在'
+            }), 400
+
+        if await User.find_by_username_async(amongo.db, username):
+            return jsonify({
+                'success': False,
+                'message': '用戶名已存在'
+            }), 400
+
+        # 檢查密碼長度
+        if len(password) < 6:
+            return jsonify({
+                'success': False,
+                'message': '密碼至少需要6個字符'
+            }), 400
+
+        # 創建新用戶（密碼於雜湊程序池中處理，不阻塞事件迴圈）
+        user = User(username, email, None)
+        user.password_hash = await password_hasher.hash_async(password)
+        await user.save_async(amongo.db)
+
+        access_token = create_access_token(identity=str(user.id), additional_claims=user.token_claims(),
+                                           expires_delta=timedelta(days=7))
+
+        return jsonify({
+            'success': True,
+            'message': '註冊成功',
+            'token': access_token,
+            'user': user.profile()
+        }), 201
+
+    except HashingOverloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.exception("註冊錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '註冊失敗',
+            'error': str(e)
+        }), 500
+
+@auth_bp.route('/login', methods=['POST'])
+@rate_limit('login')
+async def login():
+    try:
+        data = await request.get_json()
+        email = data.get('email', '').strip()
+        password = data.get('password', '').strip()
+
+        # 驗證輸入
+        if not all([email, password]):
+            return jsonify({
+                'success': False,
+                'message': '請填寫所有欄位'
+            }), 400
+
+        user = await User.find_by_email_async(amongo.db, email)
+        logger.debug("登入 %s，找到用戶: %s", email, user is not None)
+
+        if not user or not await password_hasher.verify_async(user.password_hash, password):
+            return jsonify({
+                'success': False,
+                'message': '電子郵件或密碼錯誤'
+            }), 401
+
+        # 雜湊方法或成本參數已變更時，順便以新設定重新雜湊
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                await user.update_password_hash_async(amongo.db, await password_hasher.hash_async(password))
+            except HashingOverloaded:
+                pass  # 忙碌時略過，下次登入再升級
+
+        access_token = create_access_token(identity=str(user.id), additional_claims=user.token_claims(),
+                                           expires_delta=timedelta(days=7))
+
+        return jsonify({
+            'success': True,
+            'message': '登入成功',
+            'token': access_token,
+            'user': user.profile()
+        })
+
+    except HashingOverloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.exception("登入錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '登入失敗',
+            'error': str(e)
+        }), 500
+
+@auth_bp.route('/me', methods=['GET'])
+@jwt_required()
+async def get_current_user():
+    """由 token claims 回傳用戶資料；舊 token 才查詢資料庫（並快取）"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        profile = profile_cache.get(current_user_id) or User.profile_from_claims(current_user_id, get_jwt())
+        if profile is None:
+            user = await User.find_by_id_async(amongo.db, current_user_id)
+            if not user:
+                return jsonify({
+                    'success': False,
+                    'message': '用戶不存在'
+                }), 404
+            profile = user.profile()
+            profile_cache.set(current_user_id, profile)
+
+        return jsonify({
+            'success': True,
+            'user': profile
+        })
+
+    except Exception as e:
+        logger.exception("取得用戶資料錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得用戶資料失敗',
+            'error': str(e)
+        }), 500
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+async def logout():
+    """撤銷目前的 token"""
+    try:
+        await revocation_list.revoke_token_async(amongo.db, get_jwt())
+        return jsonify({
+            'success': True,
+            'message': '已登出'
+        })
+
+    except Exception as e:
+        logger.exception("登出錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '登出失敗',
+            'error': str(e)
+        }), 500
+
+
+@auth_bp.route('/revoke-all', methods=['POST'])
+@jwt_required()
+async def revoke_all_sessions():
+    """登出所有裝置：撤銷此用戶目前為止簽發的所有 token"""
+    try:
+        claims = get_jwt()
+        await revocation_list.revoke_all_async(amongo.db, claims['sub'], current_app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+        # 同一秒內簽發的 token 不在 revoked_before 範圍內，目前的 token 另外撤銷
+        await revocation_list.revoke_token_async(amongo.db, claims)
+        return jsonify({
+            'success': True,
+            'message': '已登出所有裝置'
+        })
+
+    except Exception as e:
+        logger.exception("登出所有裝置錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '登出所有裝置失敗',
+            'error': str(e)
+        }), 500
@@ -0,0 +1,731 @@
+# backend/routes/async_tasks.py - routes/tasks.py 的非同步版本（Quart + Motor）
+#
+# 提供列表、CRUD、增量同步、即時事件與忙碌/空閒時段等高頻端點，HTTP 介面與同步版本相同。
+# 批次寫入、匯入與匯出仍由同步 app 提供。
+import asyncio
+from datetime import datetime
+from quart import Blueprint, current_app, request, jsonify, Response
+from models.task import Task
+from models.task_change import TaskChange
+from models.task_stats import TaskDailyStats
+from models.task_series import TaskSeries
+from utils.async_database import amongo
+from utils.async_jwt import jwt_required, get_jwt_identity
+from utils.conflicts import ConflictDetector
+from utils.etag import make_etag, with_etag
+from utils.log import get_logger
+from utils.workload import summarize_workload
+from utils.metrics import timed
+from utils.occupancy import occupancy_query, occupancy_from_docs, find_free_slots, serialize_occupancy
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.ratelimit import rate_limit, shed_load
+from utils.realtime import task_events
+from utils.serializer import (change_to_json, task_projection, select_fields, response_format,
+                              encoded_response)
+from utils.validators import (validate_date_format, validate_task_data, apply_task_updates,
+                              validate_series_data, merge_series_updates,
+                              parse_date_range, parse_list_range, parse_free_slot_args, parse_fields)
+from utils.versions import get_user_version_async
+
+tasks_bp = Blueprint('tasks', __name__)
+logger = get_logger('async_tasks')
+
+def _not_modified(etag):
+    """若請求的 If-None-Match 符合則回傳 304 回應，否則回傳 None"""
+    if request.if_none_match.contains_weak(etag):
+        return with_etag(Response('', status=304), etag, weak=not request.if_none_match.contains(etag))
+    return None
+
+async def _find_conflicts(user_id, date, start_time, end_time, exclude_id=None):
+    detector = ConflictDetector(amongo.db, user_id)
+    await detector.load_async([date])
+    return detector.find_conflicts(date, start_time, end_time, exclude_id=exclude_id)
+
+async def _build_occupancy(user_id, date_from, date_to):
+    version = await get_user_version_async(amongo.db, user_id)
+    docs = await amongo.db.tasks.find(*occupancy_query(user_id, date_from, date_to)).to_list(None)
+    return occupancy_from_docs(docs + await TaskSeries.expand_async(amongo.db, user_id, date_from, date_to,
+                                                                    version=version))
+
+@tasks_bp.route('/', methods=['GET'])
+@jwt_required()
+async def get_tasks():
+    try:
+        user_id = get_jwt_identity()
+        date = request.args.get('date')
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+
+        # 驗證日期與分頁參數
+        try:
+            parse_list_range(request.args)
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        # 版本未變時直接回傳 304，不查詢也不序列化
+        # MessagePack 只由快速序列化路徑提供；編碼不同的回應使用不同 ETag
+        fast = current_app.config.get('TASK_FAST_SERIALIZER', True)
+        fmt = response_format(request.accept_mimetypes) if fast else 'json'
+        version = await get_user_version_async(amongo.db, user_id)
+        etag = make_etag(user_id, version, request.query_string.decode(), fmt)
+        cached = _not_modified(etag)
+        if cached:
+            return cached
+
+        project, projection = task_projection(fields)
+        with timed('find_by_user'):
+            docs = await Task.find_docs_by_user_async(amongo.db, user_id, date, date_from, date_to,
+                                                      after=after, limit=limit + 1, projection=projection,
+                                                      version=version)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(last['date'], last['start_time'], last['_id'])
+
+        with timed('serialize'):
+            payload = {
+                'success': True,
+                'next_cursor': next_cursor
+            }
+            if fast:
+                # 原始文件直接轉為 JSON / MessagePack bytes，不建立 Task 物件
+                payload['tasks'] = [project(doc) for doc in docs]
+                response = encoded_response(payload, fmt, response_class=Response)
+            else:
+                payload['tasks'] = [select_fields(Task.from_dict(doc).to_dict(), fields) for doc in docs]
+                response = jsonify(payload)
+        return with_etag(response, etag)
+
+    except Exception as e:
+        logger.exception("[GET] 取得任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/', methods=['POST'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def create_task():
+    try:
+        user_id = get_jwt_identity()
+
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        data = await request.get_json()
+        is_valid, errors = validate_task_data(data, user_id)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'message': '數據驗證失敗',
+                'errors': errors
+            }), 400
+
+        conflicts = await _find_conflicts(user_id, data['date'], data['startTime'], data['endTime'])
+        if conflicts:
+            return jsonify({
+                'success': False,
+                'message': '該時段已有其他任務',
+                'conflicting_task': conflicts[0]
+            }), 400
+
+        task = Task(
+            user_id=str(user_id),
+            title=data.get('title'),
+            date=data.get('date'),
+            start_time=data.get('startTime'),
+            end_time=data.get('endTime'),
+            desc=data.get('desc', '')
+        )
+        await task.save_async(amongo.db)
+        logger.info("[POST] 任務保存成功，ID: %s", task.id)
+
+        return jsonify({
+            'success': True,
+            'message': '任務創建成功',
+            'task': task.to_dict()
+        }), 201
+
+    except Exception as e:
+        logger.exception("[POST] 創建任務整體錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '創建任務失敗',
+            'error': str(e),
+            'error_type': type(e).__name__
+        }), 500
+
+@tasks_bp.route('/<task_id>', methods=['GET'])
+@jwt_required()
+async def get_task(task_id):
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        etag = make_etag(user_id, await get_user_version_async(amongo.db, user_id), task_id,
+                         request.query_string.decode())
+        cached = _not_modified(etag)
+        if cached:
+            return cached
+
+        project, projection = task_projection(fields)
+        doc = await Task.find_doc_by_id_async(amongo.db, task_id, user_id, projection)
+        if not doc:
+            return jsonify({
+                'success': False,
+                'message': '任務不存在或無權限查看'
+            }), 404
+
+        return with_etag(jsonify({
+            'success': True,
+            'task': project(doc)
+        }), etag)
+
+    except Exception as e:
+        logger.exception("[GET by ID] 取得單一任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/<task_id>', methods=['PUT'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def update_task(task_id):
+    try:
+        user_id = get_jwt_identity()
+
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        data = await request.get_json()
+
+        task = await Task.find_by_id_async(amongo.db, task_id, user_id)
+        if not task:
+            return jsonify({
+                'success': False,
+                'message': '任務不存在或無權限修改'
+            }), 404
+
+        error = apply_task_updates(task, data)
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
+
+        # 檢查時間衝突（排除任務本身）
+        conflicts = await _find_conflicts(user_id, task.date, task.start_time, task.end_time,
+                                          exclude_id=task.id)
+        if conflicts:
+            return jsonify({
+                'success': False,
+                'message': '該時段已有其他任務',
+                'conflicting_task': conflicts[0]
+            }), 400
+
+        await task.save_async(amongo.db)
+        logger.info("[PUT] 任務更新成功: %s", task_id)
+
+        return jsonify({
+            'success': True,
+            'message': '任務更新成功',
+            'task': task.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[PUT] 更新任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '更新任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/<task_id>', methods=['DELETE'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def delete_task(task_id):
+    try:
+        user_id = get_jwt_identity()
+
+        task = await Task.find_by_id_async(amongo.db, task_id, user_id)
+        if not task:
+            return jsonify({
+                'success': False,
+                'message': '任務不存在或無權限刪除'
+            }), 404
+
+        result = await task.delete_async(amongo.db)
+        if result.deleted_count == 1:
+            logger.info("[DELETE] 任務刪除成功: %s", task_id)
+            return jsonify({
+                'success': True,
+                'message': '任務刪除成功',
+                'deleted_task_id': task_id
+            })
+
+        logger.warning("[DELETE] 刪除失敗，刪除數量: %d", result.deleted_count)
+        return jsonify({
+            'success': False,
+            'message': '任務刪除失敗'
+        }), 500
+
+    except Exception as e:
+        logger.exception("[DELETE] 刪除任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '刪除任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/changes', methods=['GET'])
+@jwt_required()
+async def get_changes():
+    """增量同步：回傳 since token 之後新增/修改與刪除的任務（重複系列變更時為 op: series）"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            seq, last_id = TaskChange.decode_token(request.args.get('since'))
+            limit = parse_limit(request.args.get('limit'), default=500, maximum=1000)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if seq < await TaskChange.compacted_seq_async(amongo.db, user_id):
+            return jsonify({
+                'success': True,
+                'reset': True,
+                'changes': [],
+                'next_token': None,
+                'has_more': False
+            })
+
+        records = await TaskChange.since_async(amongo.db, user_id, seq, last_id, limit)
+        has_more = len(records) > limit
+        records = records[:limit]
+
+        upserted_ids = [record['_id'] for record in records if record['op'] == 'upsert']
+        current = {}
+        if upserted_ids:
+            cursor = amongo.db.tasks.find({'_id': {'$in': upserted_ids}, 'user_id': str(user_id)})
+            current = {doc['_id']: doc for doc in await cursor.to_list(None)}
+
+        changes = [change_to_json(record, current.get(record['_id'])) for record in records]
+
+        if records:
+            last = records[-1]
+            next_token = TaskChange.encode_token(last['seq'], last['_id'] if has_more else None)
+        else:
+            next_token = TaskChange.encode_token(seq, last_id)
+
+        return jsonify({
+            'success': True,
+            'reset': False,
+            'changes': changes,
+            'next_token': next_token,
+            'has_more': has_more
+        })
+
+    except Exception as e:
+        logger.exception("[CHANGES] 取得變更錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得變更失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=('headers', 'query_string'))
+async def stream_tasks():
+    """以 Server-Sent Events 推送任務的新增/修改與刪除（與同步版本相同）"""
+    user_id = get_jwt_identity()
+    seq = await get_user_version_async(amongo.db, user_id)
+    subscription = task_events.subscribe(user_id, asyncio.Queue(task_events.queue_size), seq)
+    if subscription is None:
+        logger.warning("[STREAM] 即時連線數已達上限")
+        return jsonify({
+            'success': False,
+            'message': '伺服器忙碌中，請稍後再試'
+        }), 503, {'Retry-After': str(task_events.heartbeat)}
+
+    response = Response(task_events.iter_events_async(subscription, {'token': TaskChange.encode_token(seq)}),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.timeout = None  # 長時間連線，不套用 RESPONSE_TIMEOUT
+    return response
+
+@tasks_bp.route('/busy', methods=['GET'])
+@jwt_required()
+async def get_busy():
+    """取得日期範圍內每天合併後的忙碌時段"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            date_from, date_to = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        occupancy = await _build_occupancy(user_id, date_from, date_to)
+
+        return jsonify({
+            'success': True,
+            'from': date_from,
+            'to': date_to,
+            'busy': serialize_occupancy(occupancy)
+        })
+
+    except Exception as e:
+        logger.exception("[BUSY] 取得忙碌時段錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得忙碌時段失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/free-slots', methods=['GET'])
+@jwt_required()
+async def get_free_slots():
+    """找出日期範圍內前 N 個指定長度的空閒時段"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            date_from, date_to, duration, limit, day_start, day_end = parse_free_slot_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        occupancy = await _build_occupancy(user_id, date_from, date_to)
+        slots = find_free_slots(occupancy, date_from, date_to, duration, limit, day_start, day_end)
+
+        return jsonify({
+            'success': True,
+            'duration': duration,
+            'slots': slots
+        })
+
+    except Exception as e:
+        logger.exception("[FREE] 尋找空閒時段錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '尋找空閒時段失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/stats', methods=['GET'])
+@jwt_required()
+async def get_stats():
+    """日期範圍內每日、每週的任務數與忙碌時數（讀取每日彙總，不取回任務）"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            date_from, date_to = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        version = await get_user_version_async(amongo.db, user_id)
+        etag = make_etag(user_id, version, request.query_string.decode())
+        cached = _not_modified(etag)
+        if cached:
+            return cached
+
+        docs = await TaskDailyStats.find_range_async(amongo.db, user_id, date_from, date_to)
+        occurrences = await TaskSeries.expand_async(amongo.db, user_id, date_from, date_to, version=version)
+        return with_etag(jsonify({
+            'success': True,
+            'from': date_from,
+            'to': date_to,
+            **summarize_workload(docs, date_from, date_to, occurrences)
+        }), etag)
+
+    except Exception as e:
+        logger.exception("[STATS] 取得工作量統計錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得統計失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series', methods=['GET'])
+@jwt_required()
+async def get_series_list():
+    """列出用戶的重複任務系列（不展開發生）"""
+    try:
+        user_id = get_jwt_identity()
+        series = await TaskSeries.find_by_user_async(amongo.db, user_id)
+        return jsonify({
+            'success': True,
+            'series': [item.to_dict() for item in series]
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 取得重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series', methods=['POST'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def create_series():
+    """建立重複任務系列：只儲存一筆規則，列表查詢時依範圍展開"""
+    try:
+        user_id = get_jwt_identity()
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        data = await request.get_json()
+        is_valid, errors = validate_series_data(data, user_id)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'message': '數據驗證失敗',
+                'errors': errors
+            }), 400
+
+        series = TaskSeries.from_validated(user_id, data)
+        conflict = await ConflictDetector(amongo.db, user_id).find_series_conflicts_async(series)
+        if conflict:
+            return jsonify({
+                'success': False,
+                'message': f"{conflict['date']} 該時段已有其他任務",
+                'conflicting_task': conflict
+            }), 400
+
+        await series.save_async(amongo.db)
+        logger.info("[SERIES] 重複任務建立成功，ID: %s", series.id)
+        return jsonify({
+            'success': True,
+            'message': '重複任務建立成功',
+            'series': series.to_dict()
+        }), 201
+
+    except Exception as e:
+        logger.exception("[SERIES] 建立重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '建立重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>', methods=['GET'])
+@jwt_required()
+async def get_series(series_id):
+    """取得單一重複任務系列"""
+    try:
+        user_id = get_jwt_identity()
+        series = await TaskSeries.find_by_id_async(amongo.db, series_id, user_id)
+        if not series:
+            return jsonify({
+                'success': False,
+                'message': '重複任務不存在或無權限查看'
+            }), 404
+        return jsonify({
+            'success': True,
+            'series': series.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 取得重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>', methods=['PUT'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def update_series(series_id):
+    """修改重複任務系列（影響所有發生，包含過去的日期）"""
+    try:
+        user_id = get_jwt_identity()
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        existing = await TaskSeries.find_by_id_async(amongo.db, series_id, user_id)
+        if not existing:
+            return jsonify({
+                'success': False,
+                'message': '重複任務不存在或無權限修改'
+            }), 404
+
+        data = merge_series_updates(existing, await request.get_json())
+        is_valid, errors = validate_series_data(data, user_id)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'message': '數據驗證失敗',
+                'errors': errors
+            }), 400
+
+        series = TaskSeries.from_validated(user_id, data, existing.id, existing.created_at)
+        conflict = await ConflictDetector(amongo.db, user_id).find_series_conflicts_async(
+            series, exclude_series=series.id)
+        if conflict:
+            return jsonify({
+                'success': False,
+                'message': f"{conflict['date']} 該時段已有其他任務",
+                'conflicting_task': conflict
+            }), 400
+
+        await series.save_async(amongo.db)
+        logger.info("[SERIES] 重複任務更新成功: %s", series_id)
+        return jsonify({
+            'success': True,
+            'message': '重複任務更新成功',
+            'series': series.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 更新重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '更新重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>', methods=['DELETE'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def delete_series(series_id):
+    """刪除整個重複任務系列"""
+    try:
+        user_id = get_jwt_identity()
+        series = await TaskSeries.find_by_id_async(amongo.db, series_id, user_id)
+        if not series:
+            return jsonify({
+                'success': False,
+                'message': '重複任務不存在或無權限刪除'
+            }), 404
+
+        await series.delete_async(amongo.db)
+        logger.info("[SERIES] 重複任務刪除成功: %s", series_id)
+        return jsonify({
+            'success': True,
+            'message': '重複任務刪除成功'
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 刪除重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '刪除重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>/occurrences/<date>', methods=['DELETE'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+async def delete_occurrence(series_id, date):
+    """只刪除系列中的某一天（加入排除日期）"""
+    try:
+        user_id = get_jwt_identity()
+        if not validate_date_format(date):
+            return jsonify({
+                'success': False,
+                'message': '日期格式不正確，應為 YYYY-MM-DD'
+            }), 400
+
+        series = await TaskSeries.find_by_id_async(amongo.db, series_id, user_id)
+        if not series or not series.occurrence_dates(date, date):
+            return jsonify({
+                'success': False,
+                'message': '任務不存在或無權限刪除'
+            }), 404
+
+        await series.exclude_async(amongo.db, date)
+        logger.info("[SERIES] 已排除 %s 的 %s", series_id, date)
+        return jsonify({
+            'success': True,
+            'message': '任務已成功刪除',
+            'series': series.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 刪除單次任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '刪除任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/test', methods=['GET'])
+async def test_tasks_api():
+    """測試 API 是否正常工作"""
+    return jsonify({
+        'success': True,
+        'message': 'Tasks API 正常運行（async）',
+        'endpoints': {
+            'GET /': '獲取任務列表（支援 from/to 日期範圍、cursor/limit 分頁、fields 欄位選擇；指定範圍時包含重複任務的發生）',
+            'POST /': '創建新任務',
+            'GET /<id>': '獲取單個任務（支援 fields 欄位選擇）',
+            'PUT /<id>': '更新任務',
+            'DELETE /<id>': '刪除任務',
+            'GET /changes': '增量同步：取得 since token 之後的變更與刪除',
+            'GET /stream': '以 Server-Sent Events 即時推送任務變更（token 可放在 ?jwt=）',
+            'GET /busy': '取得日期範圍內的忙碌時段',
+            'GET /free-slots': '尋找指定長度的空閒時段',
+            'GET /stats': '日期範圍內每日、每週的任務數與忙碌時數',
+            'GET /series': '列出重複任務',
+            'POST /series': '建立重複任務（rule 為 freq/interval/byday/until/count 或 RRULE 字串）',
+            'GET /series/<id>': '取得單一重複任務',
+            'PUT /series/<id>': '修改重複任務',
+            'DELETE /series/<id>': '刪除整個重複任務',
+            'DELETE /series/<id>/occurrences/<date>': '只刪除重複任務的某一天'
+        },
+        'timestamp': datetime.utcnow().isoformat()
+    })
@@ -1,14 +1,30 @@
 # backend/routes/auth.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from datetime import timedelta
 from models.user import User
 from utils.database import mongo
-from bson import ObjectId
+from utils.log import get_logger
+from utils.hashing import password_hasher, HashingOverloaded
+from utils.cache import profile_cache
+from utils.revocation import revocation_list
+from utils.ratelimit import rate_limit
 
 auth_bp = Blueprint('auth', __name__)
+logger = get_logger('auth')
+
+def overloaded_response(error):
+    """雜湊程序池滿載時快速回傳 503，讓用戶端稍後重試"""
+    response = jsonify({
+        'success': False,
+        'message': '目前登入人數過多，請稍後再試'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register')
 def register():
     try:
         data = request.json
@@ -43,13 +59,15 @@ def register():
                 'message': '密碼至少需要6個字符'
             }), 400
         
-        # 創建新用戶
-        user = User(username, email, password)
+        # 創建新用戶（密碼於雜湊程序池中處理）
+        user = User(username, email, None)
+        user.password_hash = password_hasher.hash(password)
         user.save(mongo.db)
         
-        # 生成 JWT token
+        # 生成 JWT token（附上用戶資料，/me 可直接由 claims 回答）
         access_token = create_access_token(
             identity=str(user.id),
+            additional_claims=user.token_claims(),
             expires_delta=timedelta(days=7)
         )
         
@@ -57,15 +75,13 @@ def register():
             'success': True,
             'message': '註冊成功',
             'token': access_token,
-            'user': {
-                'id': str(user.id),
-                'username': user.username,
-                'email': user.email
-            }
+            'user': user.profile()
         }), 201
         
+    except HashingOverloaded as e:
+        return overloaded_response(e)
     except Exception as e:
-        print(f"註冊錯誤: {str(e)}")
+        logger.exception("註冊錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '註冊失敗',
@@ -73,6 +89,7 @@ def register():
         }), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login')
 def login():
     try:
         data = request.json
@@ -88,8 +105,7 @@ def login():
         
         # 查找用戶
         user = User.find_by_email(mongo.db, email)
-        print(f"找到用戶: {user is not None}")
-        print(f"用戶郵箱: {email}")
+        logger.debug("登入 %s，找到用戶: %s", email, user is not None)
         
         if not user:
             return jsonify({
@@ -97,17 +113,24 @@ def login():
                 'message': '電子郵件或密碼錯誤'
             }), 401
         
-        # 檢查密碼
-        print(f"檢查密碼: {user.check_password(password)}")
-        if not user.check_password(password):
+        # 檢查密碼（於雜湊程序池中驗證）
+        if not password_hasher.verify(user.password_hash, password):
             return jsonify({
                 'success': False,
                 'message': '電子郵件或密碼錯誤'
             }), 401
-        
-        # 生成 JWT token
+
+        # 雜湊方法或成本參數已變更時，順便以新設定重新雜湊
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.update_password_hash(mongo.db, password_hasher.hash(password))
+            except HashingOverloaded:
+                pass  # 忙碌時略過，下次登入再升級
+        
+        # 生成 JWT token（附上用戶資料，/me 可直接由 claims 回答）
         access_token = create_access_token(
             identity=str(user.id),
+            additional_claims=user.token_claims(),
             expires_delta=timedelta(days=7)
         )
         
@@ -115,15 +138,13 @@ def login():
             'success': True,
             'message': '登入成功',
             'token': access_token,
-            'user': {
-                'id': str(user.id),
-                'username': user.username,
-                'email': user.email
-            }
+            'user': user.profile()
         })
         
+    except HashingOverloaded as e:
+        return overloaded_response(e)
     except Exception as e:
-        print(f"登入錯誤: {str(e)}")
+        logger.exception("登入錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '登入失敗',
@@ -133,33 +154,73 @@ def login():
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
+    """由 token claims 回傳用戶資料；舊 token 才查詢資料庫（並快取）"""
     try:
         current_user_id = get_jwt_identity()
-        
-        user_data = mongo.db.users.find_one({'_id': ObjectId(current_user_id)})
-        if not user_data:
-            return jsonify({
-                'success': False,
-                'message': '用戶不存在'
-            }), 404
-        
-        # 移除密碼雜湊
-        user_data.pop('password_hash', None)
-        user_data.pop('password', None)
-        
+
+        profile = profile_cache.get(current_user_id) or User.profile_from_claims(current_user_id, get_jwt())
+        if profile is None:
+            user = User.find_by_id(mongo.db, current_user_id)
+            if not user:
+                return jsonify({
+                    'success': False,
+                    'message': '用戶不存在'
+                }), 404
+            profile = user.profile()
+            profile_cache.set(current_user_id, profile)
+
         return jsonify({
             'success': True,
-            'user': {
-                'id': str(user_data['_id']),
-                'username': user_data['username'],
-                'email': user_data['email']
-            }
+            'user': profile
         })
         
     except Exception as e:
-        print(f"取得用戶資料錯誤: {str(e)}")
+        logger.exception("取得用戶資料錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '取得用戶資料失敗',
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """撤銷目前的 token"""
+    try:
+        revocation_list.revoke_token(mongo.db, get_jwt())
+        return jsonify({
+            'success': True,
+            'message': '已登出'
+        })
+
+    except Exception as e:
+        logger.exception("登出錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '登出失敗',
+            'error': str(e)
+        }), 500
+
+
+@auth_bp.route('/revoke-all', methods=['POST'])
+@jwt_required()
+def revoke_all_sessions():
+    """登出所有裝置：撤銷此用戶目前為止簽發的所有 token"""
+    try:
+        claims = get_jwt()
+        revocation_list.revoke_all(mongo.db, claims['sub'], current_app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+        # 同一秒內簽發的 token 不在 revoked_before 範圍內，目前的 token 另外撤銷
+        revocation_list.revoke_token(mongo.db, claims)
+        return jsonify({
+            'success': True,
+            'message': '已登出所有裝置'
+        })
+
+    except Exception as e:
+        logger.exception("登出所有裝置錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '登出所有裝置失敗',
+            'error': str(e)
+        }), 500
@@ -1,93 +1,111 @@
 # backend/routes/tasks.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from models.task import Task
 from utils.database import mongo
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.validators import (validate_date_format, validate_task_data, apply_task_updates,
+                              validate_series_data, merge_series_updates,
+                              parse_date_range, parse_list_range, parse_free_slot_args, parse_fields)
+from utils.conflicts import ConflictDetector
+from utils.occupancy import build_occupancy, find_free_slots, serialize_occupancy
+from utils.batch import apply_task_batch, MAX_BATCH_SIZE
+from utils.export import export_cursor, iter_export, FORMATS as EXPORT_FORMATS
+from utils.importer import detect_format, open_text, iter_import, import_tasks as run_import
+from utils.versions import get_user_version
+from utils.etag import make_etag, not_modified, with_etag
+from models.task_change import TaskChange
+from models.task_stats import TaskDailyStats
+from models.task_series import TaskSeries
+from utils.log import get_logger
+from utils.metrics import timed
+from utils.workload import summarize_workload
+from utils.serializer import (change_to_json, task_projection, select_fields, response_format,
+                              encoded_response)
+from utils.ratelimit import rate_limit, shed_load
+from utils.realtime import task_events
 from bson import ObjectId
-import re
-import traceback
+import json
+import queue
+
+logger = get_logger('tasks')
 
 # 修正：先定義 Blueprint，再使用裝飾器
 tasks_bp = Blueprint('tasks', __name__)
 
-# 驗證函數
-def validate_time_format(time_str):
-    """驗證時間格式 HH:MM"""
-    if not isinstance(time_str, str):
-        return False
-    return re.match(r'^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$', time_str) is not None
-
-def validate_date_format(date_str):
-    """驗證日期格式 YYYY-MM-DD"""
-    if not isinstance(date_str, str):
-        return False
-    return re.match(r'^\d{4}-\d{2}-\d{2}$', date_str) is not None
-
-def validate_task_data(data, user_id):
-    """驗證任務數據"""
-    errors = []
-    
-    # 檢查必填欄位
-    required_fields = ['title', 'date', 'startTime', 'endTime']
-    for field in required_fields:
-        if field not in data or not data[field]:
-            # 嘗試使用底線格式的欄位名稱
-            alt_field = field.replace('Time', '_time')
-            if alt_field in data and data[alt_field]:
-                data[field] = data[alt_field]
-            else:
-                errors.append(f'缺少必填欄位: {field}')
-    
-    if errors:
-        return False, errors
-    
-    # 驗證時間格式
-    if not validate_time_format(data['startTime']):
-        errors.append('開始時間格式不正確，應為 HH:MM')
-    
-    if not validate_time_format(data['endTime']):
-        errors.append('結束時間格式不正確，應為 HH:MM')
-    
-    # 驗證日期格式
-    if not validate_date_format(data['date']):
-        errors.append('日期格式不正確，應為 YYYY-MM-DD')
-    
-    # 驗證時間邏輯
-    if data['startTime'] >= data['endTime']:
-        errors.append('結束時間必須晚於開始時間')
-    
-    return len(errors) == 0, errors
-
 @tasks_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_tasks():
     try:
         user_id = get_jwt_identity()
         date = request.args.get('date')
-        
-        print(f"[GET] 獲取任務 - 用戶ID: {user_id}, 日期: {date}")
-        
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+
+        logger.debug("[GET] 獲取任務 - 用戶ID: %s, 日期: %s, 範圍: %s ~ %s", user_id, date, date_from, date_to)
+
         # 驗證用戶ID
         if not user_id:
             return jsonify({
                 'success': False,
                 'message': '用戶未認證'
             }), 401
-        
-        # 只查找當前用戶的任務
-        tasks = Task.find_by_user(mongo.db, user_id, date)
-        
-        print(f"[GET] 找到 {len(tasks)} 個任務")
-        
-        return jsonify({
-            'success': True,
-            'tasks': [task.to_dict() for task in tasks]
-        })
+
+        # 驗證日期與分頁參數
+        try:
+            parse_list_range(request.args)
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        # 版本未變時直接回傳 304，不查詢也不序列化
+        # MessagePack 只由快速序列化路徑提供；編碼不同的回應使用不同 ETag
+        fast = current_app.config.get('TASK_FAST_SERIALIZER', True)
+        fmt = response_format(request.accept_mimetypes) if fast else 'json'
+        version = get_user_version(mongo.db, user_id)
+        etag = make_etag(user_id, version, request.query_string.decode(), fmt)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        # 只查找當前用戶的任務，多取一筆用來判斷是否還有下一頁
+        project, projection = task_projection(fields)
+        with timed('find_by_user'):
+            docs = Task.find_docs_by_user(mongo.db, user_id, date, date_from, date_to,
+                                          after=after, limit=limit + 1, projection=projection,
+                                          version=version)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(last['date'], last['start_time'], last['_id'])
+
+        logger.debug("[GET] 找到 %d 個任務", len(docs))
+
+        with timed('serialize'):
+            payload = {
+                'success': True,
+                'next_cursor': next_cursor
+            }
+            if fast:
+                # 原始文件直接轉為 JSON / MessagePack bytes，不建立 Task 物件
+                payload['tasks'] = [project(doc) for doc in docs]
+                response = encoded_response(payload, fmt)
+            else:
+                payload['tasks'] = [select_fields(Task.from_dict(doc).to_dict(), fields) for doc in docs]
+                response = jsonify(payload)
+        return with_etag(response, etag)
         
     except Exception as e:
-        print(f"[GET] 取得任務錯誤: {str(e)}")
-        traceback.print_exc()
+        logger.exception("[GET] 取得任務錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '取得任務失敗',
@@ -96,17 +114,16 @@ def get_tasks():
 
 @tasks_bp.route('/', methods=['POST'])
 @jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
 def create_task():
     try:
-        print("=" * 60)
-        print("[POST] 收到創建任務請求")
-        
         # 獲取用戶身份
         user_id = get_jwt_identity()
-        print(f"[POST] 當前用戶ID: {user_id}")
+        logger.debug("[POST] 當前用戶ID: %s", user_id)
         
         if not user_id:
-            print("[POST] 錯誤: 用戶ID為空")
+            logger.warning("[POST] 錯誤: 用戶ID為空")
             return jsonify({
                 'success': False,
                 'message': '用戶未認證'
@@ -114,19 +131,19 @@ def create_task():
         
         # 獲取請求數據
         if not request.is_json:
-            print("[POST] 錯誤: 請求不是JSON格式")
+            logger.info("[POST] 錯誤: 請求不是JSON格式")
             return jsonify({
                 'success': False,
                 'message': '請求格式必須為JSON'
             }), 400
         
         data = request.json
-        print(f"[POST] 請求數據: {data}")
+        logger.debug("[POST] 請求數據: %s", data)
         
         # 驗證數據
         is_valid, errors = validate_task_data(data, user_id)
         if not is_valid:
-            print(f"[POST] 驗證失敗: {errors}")
+            logger.info("[POST] 驗證失敗: %s", errors)
             return jsonify({
                 'success': False,
                 'message': '數據驗證失敗',
@@ -140,44 +157,21 @@ def create_task():
         end_time = data.get('endTime')
         desc = data.get('desc', '')
         
-        print(f"[POST] 解析後數據: title={title}, date={date}, start_time={start_time}, end_time={end_time}")
+        logger.debug("[POST] 解析後數據: title=%s, date=%s, start_time=%s, end_time=%s", title, date, start_time, end_time)
         
         # 檢查時間衝突（只檢查當前用戶的任務）
-        print(f"[POST] 檢查時間衝突...")
-        try:
-            conflicting_tasks = mongo.db.tasks.find({
-                'user_id': str(user_id),
-                'date': date,
-                '$or': [
-                    {
-                        'start_time': {'$lt': end_time},
-                        'end_time': {'$gt': start_time}
-                    }
-                ]
-            })
-            
-            conflict_count = conflicting_tasks.count()
-            print(f"[POST] 衝突任務數量: {conflict_count}")
-            
-            if conflict_count > 0:
-                conflict = list(conflicting_tasks)[0]
-                print(f"[POST] 發現衝突任務: {conflict}")
-                return jsonify({
-                    'success': False,
-                    'message': '該時段已有其他任務',
-                    'conflicting_task': {
-                        'id': str(conflict.get('_id')),
-                        'title': conflict.get('title'),
-                        'start_time': conflict.get('start_time'),
-                        'end_time': conflict.get('end_time')
-                    }
-                }), 400
-        except Exception as e:
-            print(f"[POST] 檢查時間衝突時出錯: {e}")
-            # 繼續創建任務，不因衝突檢查失敗而中斷
+        conflicts = ConflictDetector(mongo.db, user_id).find_conflicts(date, start_time, end_time)
+        logger.debug("[POST] 衝突任務數量: %d", len(conflicts))
+
+        if conflicts:
+            logger.info("[POST] 發現衝突任務: %s", conflicts[0]['id'])
+            return jsonify({
+                'success': False,
+                'message': '該時段已有其他任務',
+                'conflicting_task': conflicts[0]
+            }), 400
         
         # 創建任務 - 確保包含用戶ID
-        print(f"[POST] 創建Task物件...")
         try:
             task = Task(
                 user_id=str(user_id),  # 確保是字符串
@@ -188,10 +182,9 @@ def create_task():
                 desc=desc
             )
             
-            print(f"[POST] Task物件創建成功: {task.to_dict()}")
+            logger.debug("[POST] Task物件創建成功: %s", task.title)
         except Exception as e:
-            print(f"[POST] 創建Task物件失敗: {e}")
-            traceback.print_exc()
+            logger.exception("[POST] 創建Task物件失敗: %s", e)
             return jsonify({
                 'success': False,
                 'message': '創建任務物件失敗',
@@ -199,22 +192,17 @@ def create_task():
             }), 500
         
         # 保存任務到資料庫
-        print(f"[POST] 保存任務到資料庫...")
         try:
             task.save(mongo.db)
-            print(f"[POST] 任務保存成功，ID: {task.id}")
+            logger.info("[POST] 任務保存成功，ID: %s", task.id)
         except Exception as e:
-            print(f"[POST] 保存任務失敗: {e}")
-            traceback.print_exc()
+            logger.exception("[POST] 保存任務失敗: %s", e)
             return jsonify({
                 'success': False,
                 'message': '保存任務到資料庫失敗',
                 'error': str(e)
             }), 500
         
-        print("[POST] 任務創建成功！")
-        print("=" * 60)
-        
         return jsonify({
             'success': True,
             'message': '任務創建成功',
@@ -222,11 +210,8 @@ def create_task():
         }), 201
         
     except Exception as e:
-        print("!" * 60)
-        print(f"[POST] 創建任務整體錯誤: {str(e)}")
-        traceback.print_exc()
-        print("!" * 60)
-        
+        logger.exception("[POST] 創建任務整體錯誤: %s", e)
+
         return jsonify({
             'success': False,
             'message': '創建任務失敗',
@@ -240,7 +225,7 @@ def get_task(task_id):
     """獲取單個任務"""
     try:
         user_id = get_jwt_identity()
-        print(f"[GET by ID] 獲取任務 - 用戶ID: {user_id}, 任務ID: {task_id}")
+        logger.debug("[GET by ID] 獲取任務 - 用戶ID: %s, 任務ID: %s", user_id, task_id)
         
         if not user_id:
             return jsonify({
@@ -248,25 +233,38 @@ def get_task(task_id):
                 'message': '用戶未認證'
             }), 401
         
-        # 查找任務 - 確保是當前用戶的任務
-        task = Task.find_by_id(mongo.db, task_id, user_id)
-        if not task:
-            print(f"[GET by ID] 任務不存在或無權限查看")
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        etag = make_etag(user_id, get_user_version(mongo.db, user_id), task_id, request.query_string.decode())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        # 查找任務 - 確保是當前用戶的任務（只取回 fields 需要的欄位）
+        project, projection = task_projection(fields)
+        doc = Task.find_doc_by_id(mongo.db, task_id, user_id, projection)
+        if not doc:
+            logger.debug("[GET by ID] 任務不存在或無權限查看")
             return jsonify({
                 'success': False,
                 'message': '任務不存在或無權限查看'
             }), 404
         
-        print(f"[GET by ID] 找到任務: {task.title}")
+        logger.debug("[GET by ID] 找到任務: %s", doc['_id'])
         
-        return jsonify({
+        return with_etag(jsonify({
             'success': True,
-            'task': task.to_dict()
-        })
+            'task': project(doc)
+        }), etag)
         
     except Exception as e:
-        print(f"[GET by ID] 取得單一任務錯誤: {str(e)}")
-        traceback.print_exc()
+        logger.exception("[GET by ID] 取得單一任務錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '取得任務失敗',
@@ -275,10 +273,12 @@ def get_task(task_id):
 
 @tasks_bp.route('/<task_id>', methods=['PUT'])
 @jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
 def update_task(task_id):
     try:
         user_id = get_jwt_identity()
-        print(f"[PUT] 更新任務 - 用戶ID: {user_id}, 任務ID: {task_id}")
+        logger.debug("[PUT] 更新任務 - 用戶ID: %s, 任務ID: %s", user_id, task_id)
         
         if not user_id:
             return jsonify({
@@ -293,70 +293,41 @@ def update_task(task_id):
             }), 400
         
         data = request.json
-        print(f"[PUT] 更新數據: {data}")
+        logger.debug("[PUT] 更新數據: %s", data)
         
         # 查找任務 - 確保是當前用戶的任務
         task = Task.find_by_id(mongo.db, task_id, user_id)
         if not task:
-            print(f"[PUT] 任務不存在或無權限修改")
+            logger.debug("[PUT] 任務不存在或無權限修改")
             return jsonify({
                 'success': False,
                 'message': '任務不存在或無權限修改'
             }), 404
         
         # 更新任務數據
-        updates = {}
-        if 'title' in data:
-            task.title = data['title']
-            updates['title'] = data['title']
-        
-        if 'date' in data:
-            if not validate_date_format(data['date']):
-                return jsonify({
-                    'success': False,
-                    'message': '日期格式不正確，應為 YYYY-MM-DD'
-                }), 400
-            task.date = data['date']
-            updates['date'] = data['date']
-        
-        if 'startTime' in data or 'start_time' in data:
-            start_time = data.get('startTime') or data.get('start_time')
-            if not validate_time_format(start_time):
-                return jsonify({
-                    'success': False,
-                    'message': '開始時間格式不正確，應為 HH:MM'
-                }), 400
-            task.start_time = start_time
-            updates['start_time'] = start_time
-        
-        if 'endTime' in data or 'end_time' in data:
-            end_time = data.get('endTime') or data.get('end_time')
-            if not validate_time_format(end_time):
-                return jsonify({
-                    'success': False,
-                    'message': '結束時間格式不正確，應為 HH:MM'
-                }), 400
-            task.end_time = end_time
-            updates['end_time'] = end_time
-        
-        if 'desc' in data:
-            task.desc = data['desc']
-            updates['desc'] = data['desc']
-        
-        # 驗證時間邏輯
-        if hasattr(task, 'start_time') and hasattr(task, 'end_time'):
-            if task.start_time >= task.end_time:
-                return jsonify({
-                    'success': False,
-                    'message': '結束時間必須晚於開始時間'
-                }), 400
-        
-        print(f"[PUT] 執行更新: {updates}")
+        error = apply_task_updates(task, data)
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
+
+        # 檢查時間衝突（排除任務本身）
+        conflicts = ConflictDetector(mongo.db, user_id).find_conflicts(
+            task.date, task.start_time, task.end_time, exclude_id=task.id
+        )
+        if conflicts:
+            logger.info("[PUT] 發現衝突任務: %s", conflicts[0]['id'])
+            return jsonify({
+                'success': False,
+                'message': '該時段已有其他任務',
+                'conflicting_task': conflicts[0]
+            }), 400
         
         # 保存更新
         task.save(mongo.db)
         
-        print(f"[PUT] 任務更新成功")
+        logger.info("[PUT] 任務更新成功: %s", task_id)
         
         return jsonify({
             'success': True,
@@ -365,8 +336,7 @@ def update_task(task_id):
         })
         
     except Exception as e:
-        print(f"[PUT] 更新任務錯誤: {str(e)}")
-        traceback.print_exc()
+        logger.exception("[PUT] 更新任務錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '更新任務失敗',
@@ -375,10 +345,12 @@ def update_task(task_id):
 
 @tasks_bp.route('/<task_id>', methods=['DELETE'])
 @jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
 def delete_task(task_id):
     try:
         user_id = get_jwt_identity()
-        print(f"[DELETE] 刪除任務 - 用戶ID: {user_id}, 任務ID: {task_id}")
+        logger.debug("[DELETE] 刪除任務 - 用戶ID: %s, 任務ID: %s", user_id, task_id)
         
         if not user_id:
             return jsonify({
@@ -389,34 +361,587 @@ def delete_task(task_id):
         # 查找任務 - 確保是當前用戶的任務
         task = Task.find_by_id(mongo.db, task_id, user_id)
         if not task:
-            print(f"[DELETE] 任務不存在或無權限刪除")
+            logger.debug("[DELETE] 任務不存在或無權限刪除")
             return jsonify({
                 'success': False,
                 'message': '任務不存在或無權限刪除'
             }), 404
         
-        print(f"[DELETE] 找到任務: {task.title}")
+        logger.debug("[DELETE] 找到任務: %s", task.title)
         
         # 刪除任務
         result = task.delete(mongo.db)
         
         if result.deleted_count == 1:
-            print(f"[DELETE] 任務刪除成功")
+            logger.info("[DELETE] 任務刪除成功: %s", task_id)
             return jsonify({
                 'success': True,
                 'message': '任務刪除成功',
                 'deleted_task_id': task_id
             })
         else:
-            print(f"[DELETE] 刪除失敗，刪除數量: {result.deleted_count}")
+            logger.warning("[DELETE] 刪除失敗，刪除數量: %d", result.deleted_count)
             return jsonify({
                 'success': False,
                 'message': '任務刪除失敗'
             }), 500
         
     except Exception as e:
-        print(f"[DELETE] 刪除任務錯誤: {str(e)}")
-        traceback.print_exc()
+        logger.exception("[DELETE] 刪除任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '刪除任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/batch', methods=['POST'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+def batch_tasks():
+    """批次建立、更新、刪除任務（單一 bulk_write）"""
+    try:
+        user_id = get_jwt_identity()
+
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        data = request.json or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({
+                'success': False,
+                'message': 'operations 必須為非空陣列'
+            }), 400
+
+        if len(operations) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'message': f'單次最多 {MAX_BATCH_SIZE} 個操作'
+            }), 400
+
+        ordered = bool(data.get('ordered', True))
+        logger.debug("[BATCH] 用戶ID: %s, 操作數量: %d, ordered=%s", user_id, len(operations), ordered)
+
+        results = apply_task_batch(mongo.db, user_id, operations, ordered=ordered)
+
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        all_succeeded = all(result['status'] in ('created', 'updated', 'deleted') for result in results)
+
+        logger.info("[BATCH] 結果: %s", summary)
+
+        return jsonify({
+            'success': all_succeeded,
+            'message': '批次操作完成' if all_succeeded else '部分操作失敗',
+            'summary': summary,
+            'results': results
+        }), 200 if all_succeeded else 207
+
+    except Exception as e:
+        logger.exception("[BATCH] 批次操作錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '批次操作失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_tasks():
+    """以串流方式匯出任務（format=ndjson 或 ics）"""
+    user_id = get_jwt_identity()
+    fmt = request.args.get('format', 'ndjson')
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': 'format 必須為 ndjson 或 ics'
+        }), 400
+
+    for value in (date_from, date_to):
+        if value and not validate_date_format(value):
+            return jsonify({
+                'success': False,
+                'message': '日期格式不正確，應為 YYYY-MM-DD'
+            }), 400
+
+    logger.debug("[EXPORT] 用戶ID: %s, 格式: %s", user_id, fmt)
+
+    mimetype, filename = EXPORT_FORMATS[fmt]
+    cursor = export_cursor(mongo.db, user_id, date_from, date_to)
+    return Response(
+        stream_with_context(iter_export(cursor, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@tasks_bp.route('/import', methods=['POST'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+def import_tasks():
+    """匯入 iCalendar 或 CSV 檔案（multipart 欄位 file）
+
+    on_conflict=allow 時不檢查時段衝突；stream=1 時以 NDJSON 逐區塊回報進度。
+    """
+    try:
+        user_id = get_jwt_identity()
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({
+                'success': False,
+                'message': '請上傳檔案（欄位名稱 file）'
+            }), 400
+
+        fmt = detect_format(upload.filename, request.args.get('format') or request.form.get('format'))
+        if not fmt:
+            return jsonify({
+                'success': False,
+                'message': '僅支援 .ics 或 .csv 檔案'
+            }), 400
+
+        check_conflicts = request.args.get('on_conflict', 'skip') != 'allow'
+        text_stream = open_text(upload.stream)
+        logger.debug("[IMPORT] 用戶ID: %s, 檔案: %s, 格式: %s", user_id, upload.filename, fmt)
+
+        if request.args.get('stream') == '1':
+            def generate():
+                for report in iter_import(mongo.db, user_id, text_stream, fmt,
+                                          check_conflicts=check_conflicts):
+                    yield json.dumps(report.to_dict(), ensure_ascii=False) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        report = run_import(mongo.db, user_id, text_stream, fmt, check_conflicts=check_conflicts)
+        logger.info("[IMPORT] 完成: 匯入 %d 筆，失敗 %d 筆", report.imported, report.failed)
+
+        return jsonify({
+            'success': report.failed == 0,
+            'message': '匯入完成' if report.failed == 0 else '匯入完成，部分資料有誤',
+            'report': report.to_dict()
+        })
+
+    except UnicodeDecodeError:
+        return jsonify({
+            'success': False,
+            'message': '檔案必須為 UTF-8 編碼'
+        }), 400
+    except Exception as e:
+        logger.exception("[IMPORT] 匯入任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '匯入任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_changes():
+    """增量同步：回傳 since token 之後新增/修改與刪除的任務
+
+    token 過舊（相關墓碑已被壓縮）時回傳 reset: true，用戶端需重新完整載入。
+    重複系列變更時回傳 {'op': 'series', 'id'}（發生在查詢時才展開），用戶端應重新載入列表。
+    """
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            seq, last_id = TaskChange.decode_token(request.args.get('since'))
+            limit = parse_limit(request.args.get('limit'), default=500, maximum=1000)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        if seq < TaskChange.compacted_seq(mongo.db, user_id):
+            return jsonify({
+                'success': True,
+                'reset': True,
+                'changes': [],
+                'next_token': None,
+                'has_more': False
+            })
+
+        records = TaskChange.since(mongo.db, user_id, seq, last_id, limit)
+        has_more = len(records) > limit
+        records = records[:limit]
+
+        # 一次取回所有仍存在的任務；已被刪除者即使紀錄為 upsert 也視為刪除
+        upserted_ids = [record['_id'] for record in records if record['op'] == 'upsert']
+        current = {
+            doc['_id']: doc
+            for doc in mongo.db.tasks.find({'_id': {'$in': upserted_ids}, 'user_id': str(user_id)})
+        } if upserted_ids else {}
+
+        changes = [change_to_json(record, current.get(record['_id'])) for record in records]
+
+        if records:
+            last = records[-1]
+            next_token = TaskChange.encode_token(last['seq'], last['_id'] if has_more else None)
+        else:
+            next_token = TaskChange.encode_token(seq, last_id)
+
+        return jsonify({
+            'success': True,
+            'reset': False,
+            'changes': changes,
+            'next_token': next_token,
+            'has_more': has_more
+        })
+
+    except Exception as e:
+        logger.exception("[CHANGES] 取得變更錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得變更失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_tasks():
+    """以 Server-Sent Events 推送任務的新增/修改與刪除（取代輪詢 loadTasks）
+
+    EventSource 無法設定標頭，token 可放在 ?jwt=。連線後先送 ready（含目前的同步 token），
+    之後為 task 事件（內容與 /changes 的一筆相同）；收到 reset 時用戶端應重新載入。
+    """
+    user_id = get_jwt_identity()
+    seq = get_user_version(mongo.db, user_id)
+    subscription = task_events.subscribe(user_id, queue.Queue(task_events.queue_size), seq)
+    if subscription is None:
+        logger.warning("[STREAM] 即時連線數已達上限")
+        return jsonify({
+            'success': False,
+            'message': '伺服器忙碌中，請稍後再試'
+        }), 503, {'Retry-After': str(task_events.heartbeat)}
+
+    response = Response(task_events.iter_events(subscription, {'token': TaskChange.encode_token(seq)}),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: task_events.unsubscribe(subscription))
+    return response
+
+@tasks_bp.route('/busy', methods=['GET'])
+@jwt_required()
+def get_busy():
+    """取得日期範圍內每天合併後的忙碌時段"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            date_from, date_to = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        occupancy = build_occupancy(mongo.db, user_id, date_from, date_to)
+
+        return jsonify({
+            'success': True,
+            'from': date_from,
+            'to': date_to,
+            'busy': serialize_occupancy(occupancy)
+        })
+
+    except Exception as e:
+        logger.exception("[BUSY] 取得忙碌時段錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得忙碌時段失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/free-slots', methods=['GET'])
+@jwt_required()
+def get_free_slots():
+    """找出日期範圍內前 N 個指定長度的空閒時段"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            date_from, date_to, duration, limit, day_start, day_end = parse_free_slot_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        occupancy = build_occupancy(mongo.db, user_id, date_from, date_to)
+        slots = find_free_slots(occupancy, date_from, date_to, duration, limit, day_start, day_end)
+
+        return jsonify({
+            'success': True,
+            'duration': duration,
+            'slots': slots
+        })
+
+    except Exception as e:
+        logger.exception("[FREE] 尋找空閒時段錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '尋找空閒時段失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def get_stats():
+    """日期範圍內每日、每週的任務數與忙碌時數（讀取每日彙總，不取回任務）"""
+    try:
+        user_id = get_jwt_identity()
+
+        try:
+            date_from, date_to = parse_date_range(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+
+        version = get_user_version(mongo.db, user_id)
+        etag = make_etag(user_id, version, request.query_string.decode())
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        docs = TaskDailyStats.find_range(mongo.db, user_id, date_from, date_to)
+        occurrences = TaskSeries.expand(mongo.db, user_id, date_from, date_to, version=version)
+        return with_etag(jsonify({
+            'success': True,
+            'from': date_from,
+            'to': date_to,
+            **summarize_workload(docs, date_from, date_to, occurrences)
+        }), etag)
+
+    except Exception as e:
+        logger.exception("[STATS] 取得工作量統計錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得統計失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series', methods=['GET'])
+@jwt_required()
+def get_series_list():
+    """列出用戶的重複任務系列（不展開發生）"""
+    try:
+        user_id = get_jwt_identity()
+        series = TaskSeries.find_by_user(mongo.db, user_id)
+        return jsonify({
+            'success': True,
+            'series': [item.to_dict() for item in series]
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 取得重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series', methods=['POST'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+def create_series():
+    """建立重複任務系列：只儲存一筆規則，列表查詢時依範圍展開"""
+    try:
+        user_id = get_jwt_identity()
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        data = request.json
+        is_valid, errors = validate_series_data(data, user_id)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'message': '數據驗證失敗',
+                'errors': errors
+            }), 400
+
+        series = TaskSeries.from_validated(user_id, data)
+        conflict = ConflictDetector(mongo.db, user_id).find_series_conflicts(series)
+        if conflict:
+            logger.info("[SERIES] 發現衝突任務: %s (%s)", conflict['id'], conflict['date'])
+            return jsonify({
+                'success': False,
+                'message': f"{conflict['date']} 該時段已有其他任務",
+                'conflicting_task': conflict
+            }), 400
+
+        series.save(mongo.db)
+        logger.info("[SERIES] 重複任務建立成功，ID: %s", series.id)
+        return jsonify({
+            'success': True,
+            'message': '重複任務建立成功',
+            'series': series.to_dict()
+        }), 201
+
+    except Exception as e:
+        logger.exception("[SERIES] 建立重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '建立重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>', methods=['GET'])
+@jwt_required()
+def get_series(series_id):
+    """取得單一重複任務系列"""
+    try:
+        user_id = get_jwt_identity()
+        series = TaskSeries.find_by_id(mongo.db, series_id, user_id)
+        if not series:
+            return jsonify({
+                'success': False,
+                'message': '重複任務不存在或無權限查看'
+            }), 404
+        return jsonify({
+            'success': True,
+            'series': series.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 取得重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '取得重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>', methods=['PUT'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+def update_series(series_id):
+    """修改重複任務系列（影響所有發生，包含過去的日期）"""
+    try:
+        user_id = get_jwt_identity()
+        if not request.is_json:
+            return jsonify({
+                'success': False,
+                'message': '請求格式必須為JSON'
+            }), 400
+
+        existing = TaskSeries.find_by_id(mongo.db, series_id, user_id)
+        if not existing:
+            return jsonify({
+                'success': False,
+                'message': '重複任務不存在或無權限修改'
+            }), 404
+
+        data = merge_series_updates(existing, request.json)
+        is_valid, errors = validate_series_data(data, user_id)
+        if not is_valid:
+            return jsonify({
+                'success': False,
+                'message': '數據驗證失敗',
+                'errors': errors
+            }), 400
+
+        series = TaskSeries.from_validated(user_id, data, existing.id, existing.created_at)
+        conflict = ConflictDetector(mongo.db, user_id).find_series_conflicts(series, exclude_series=series.id)
+        if conflict:
+            logger.info("[SERIES] 發現衝突任務: %s (%s)", conflict['id'], conflict['date'])
+            return jsonify({
+                'success': False,
+                'message': f"{conflict['date']} 該時段已有其他任務",
+                'conflicting_task': conflict
+            }), 400
+
+        series.save(mongo.db)
+        logger.info("[SERIES] 重複任務更新成功: %s", series_id)
+        return jsonify({
+            'success': True,
+            'message': '重複任務更新成功',
+            'series': series.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 更新重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '更新重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>', methods=['DELETE'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+def delete_series(series_id):
+    """刪除整個重複任務系列"""
+    try:
+        user_id = get_jwt_identity()
+        series = TaskSeries.find_by_id(mongo.db, series_id, user_id)
+        if not series:
+            return jsonify({
+                'success': False,
+                'message': '重複任務不存在或無權限刪除'
+            }), 404
+
+        series.delete(mongo.db)
+        logger.info("[SERIES] 重複任務刪除成功: %s", series_id)
+        return jsonify({
+            'success': True,
+            'message': '重複任務刪除成功'
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 刪除重複任務錯誤: %s", e)
+        return jsonify({
+            'success': False,
+            'message': '刪除重複任務失敗',
+            'error': str(e)
+        }), 500
+
+@tasks_bp.route('/series/<series_id>/occurrences/<date>', methods=['DELETE'])
+@jwt_required()
+@rate_limit('task_write')
+@shed_load('task_write')
+def delete_occurrence(series_id, date):
+    """只刪除系列中的某一天（加入排除日期）"""
+    try:
+        user_id = get_jwt_identity()
+        if not validate_date_format(date):
+            return jsonify({
+                'success': False,
+                'message': '日期格式不正確，應為 YYYY-MM-DD'
+            }), 400
+
+        series = TaskSeries.find_by_id(mongo.db, series_id, user_id)
+        if not series or not series.occurrence_dates(date, date):
+            return jsonify({
+                'success': False,
+                'message': '任務不存在或無權限刪除'
+            }), 404
+
+        series.exclude(mongo.db, date)
+        logger.info("[SERIES] 已排除 %s 的 %s", series_id, date)
+        return jsonify({
+            'success': True,
+            'message': '任務已成功刪除',
+            'series': series.to_dict()
+        })
+
+    except Exception as e:
+        logger.exception("[SERIES] 刪除單次任務錯誤: %s", e)
         return jsonify({
             'success': False,
             'message': '刪除任務失敗',
@@ -430,11 +955,25 @@ def test_tasks_api():
         'success': True,
         'message': 'Tasks API 正常運行',
         'endpoints': {
-            'GET /': '獲取任務列表',
+            'GET /': '獲取任務列表（支援 from/to 日期範圍、cursor/limit 分頁、fields 欄位選擇；指定範圍時包含重複任務的發生）',
             'POST /': '創建新任務',
-            'GET /<id>': '獲取單個任務',
+            'GET /<id>': '獲取單個任務（支援 fields 欄位選擇）',
             'PUT /<id>': '更新任務',
-            'DELETE /<id>': '刪除任務'
+            'DELETE /<id>': '刪除任務',
+            'POST /batch': '批次建立/更新/刪除任務',
+            'GET /export': '串流匯出任務 (NDJSON / iCalendar)',
+            'POST /import': '匯入 iCalendar / CSV 檔案',
+            'GET /changes': '增量同步：取得 since token 之後的變更與刪除',
+            'GET /stream': '以 Server-Sent Events 即時推送任務變更（token 可放在 ?jwt=）',
+            'GET /busy': '取得日期範圍內的忙碌時段',
+            'GET /free-slots': '尋找指定長度的空閒時段',
+            'GET /stats': '日期範圍內每日、每週的任務數與忙碌時數',
+            'GET /series': '列出重複任務',
+            'POST /series': '建立重複任務（rule 為 freq/interval/byday/until/count 或 RRULE 字串）',
+            'GET /series/<id>': '取得單一重複任務',
+            'PUT /series/<id>': '修改重複任務',
+            'DELETE /series/<id>': '刪除整個重複任務',
+            'DELETE /series/<id>/occurrences/<date>': '只刪除重複任務的某一天'
         },
         'timestamp': datetime.utcnow().isoformat()
     })
\ No newline at end of file
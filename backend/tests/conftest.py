@@ -0,0 +1,6 @@
+# backend/tests/conftest.py - 測試共用設定（需要 mongomock：pip install mongomock pytest）
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MONGO_URI', 'mongomock://localhost/calendar_test')
@@ -0,0 +1,38 @@
+# backend/tests/test_password_pool.py - 密碼雜湊程序池（forkserver / spawn）
+import os
+import runpy
+import threading
+import pytest
+
+pytest.importorskip('mongomock')
+
+from app import create_app
+from utils.hashing import password_hasher
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def test_register_and_login_through_worker_pool():
+    """註冊與登入實際經過程序池雜湊，子程序不使用 fork"""
+    app = create_app()
+    client = app.test_client()
+
+    r = client.post('/api/auth/register', json={'username': 'pool', 'email': 'pool@x.com', 'password': 'secret1'})
+    assert r.status_code == 201, r.get_json()
+    r = client.post('/api/auth/login', json={'email': 'pool@x.com', 'password': 'secret1'})
+    assert r.status_code == 200
+    r = client.post('/api/auth/login', json={'email': 'pool@x.com', 'password': 'wrong12'})
+    assert r.status_code == 401
+
+    assert password_hasher._pool is not None
+    assert password_hasher._pool._mp_context.get_start_method() != 'fork'
+
+
+def test_worker_reimport_of_app_module_builds_nothing():
+    """子程序以 __mp_main__ 匯入 python app.py 的主程式時，不建立 app、不啟動背景執行緒"""
+    threads = threading.active_count()
+    namespace = runpy.run_path(APP_PATH, run_name='__mp_main__')
+
+    assert 'create_app' in namespace
+    assert 'app' not in namespace
+    assert threading.active_count() == threads
@@ -0,0 +1,48 @@
+# backend/utils/async_database.py - async_app 使用的 Motor 連線
+import os
+from utils.log import get_logger
+
+logger = get_logger('async_database')
+
+
+class AsyncMongo:
+    """對應 utils.database.mongo：提供 .cx（用戶端）與 .db（資料庫）"""
+
+    def __init__(self):
+        self.cx = None
+        self.db = None
+
+
+amongo = AsyncMongo()
+
+
+def _database_name(uri):
+    return (uri.split('/', 3)[3] if uri.count('/') >= 3 else '').split('?')[0] or 'calendar_app'
+
+
+def init_async_db(app):
+    """在伺服器啟動後（事件迴圈內）建立 Motor 用戶端
+
+    索引由同步程式（背景索引同步或 flask sync-indexes）負責建立，這裡不重複處理。
+    MONGO_URI 以 mongomock:// 開頭時改用 mongomock_motor（本機測試用）。
+    """
+    app.config['MONGO_URI'] = os.getenv('MONGO_URI', app.config.get('MONGO_URI'))
+
+    @app.before_serving
+    async def connect():
+        uri = app.config['MONGO_URI']
+        if uri.startswith('mongomock://'):
+            from mongomock_motor import AsyncMongoMockClient
+            amongo.cx = AsyncMongoMockClient()
+        else:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            amongo.cx = AsyncIOMotorClient(uri)
+        amongo.db = amongo.cx[_database_name(uri)]
+        logger.info("✅ 資料庫連接成功 (Motor)")
+
+    @app.after_serving
+    async def close():
+        if amongo.cx is not None:
+            amongo.cx.close()
+
+    return amongo
@@ -0,0 +1,73 @@
+# backend/utils/async_jwt.py - async_app 使用的 JWT（與 Flask-JWT-Extended 簽發的 token 互通）
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import jwt
+from quart import current_app, g, jsonify, request
+from utils.revocation import revocation_list
+
+ALGORITHM = 'HS256'
+
+
+def create_access_token(identity, additional_claims=None, expires_delta=None):
+    """簽發與 flask_jwt_extended.create_access_token 相同 claims 的 access token"""
+    now = datetime.now(timezone.utc)
+    expires_delta = expires_delta or timedelta(seconds=current_app.config['JWT_ACCESS_TOKEN_EXPIRES'])
+    claims = {
+        'fresh': False,
+        'iat': now,
+        'jti': str(uuid.uuid4()),
+        'type': 'access',
+        'sub': str(identity),
+        'nbf': now,
+        'csrf': str(uuid.uuid4()),
+        'exp': now + expires_delta
+    }
+    claims.update(additional_claims or {})
+    return jwt.encode(claims, current_app.config['JWT_SECRET_KEY'], algorithm=ALGORITHM)
+
+
+def decode_access_token(token):
+    """驗證並解碼 access token；失敗時拋出 jwt.PyJWTError"""
+    claims = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=[ALGORITHM])
+    if claims.get('type') != 'access':
+        raise jwt.InvalidTokenError('Only access tokens are allowed')
+    return claims
+
+
+def jwt_required(locations=('headers',)):
+    """對應 flask_jwt_extended.jwt_required()，錯誤回應的狀態碼與內容也相同
+
+    locations 可加上 'query_string'（?jwt=，供無法設定標頭的 EventSource 使用）。
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            header = request.headers.get('Authorization')
+            token = request.args.get('jwt') if 'query_string' in locations else None
+            if header or not token:
+                if not header:
+                    return jsonify({'msg': 'Missing Authorization Header'}), 401
+                parts = header.split()
+                if len(parts) != 2 or parts[0] != 'Bearer':
+                    return jsonify({'msg': "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}), 422
+                token = parts[1]
+            try:
+                g.jwt = decode_access_token(token)
+            except jwt.ExpiredSignatureError:
+                return jsonify({'msg': 'Token has expired'}), 401
+            except jwt.PyJWTError as e:
+                return jsonify({'msg': str(e)}), 422
+            if revocation_list.is_revoked(g.jwt):
+                return jsonify({'msg': 'Token has been revoked'}), 401
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_jwt_identity():
+    return g.jwt['sub']
+
+
+def get_jwt():
+    return g.jwt
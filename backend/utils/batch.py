@@ -0,0 +1,182 @@
+# backend/utils/batch.py - 批次建立/更新/刪除任務
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError
+from models.task import Task
+from utils.conflicts import ConflictDetector
+from utils.timeutils import time_fields
+from utils.validators import validate_task_data
+
+MAX_BATCH_SIZE = 1000
+
+# 底線格式欄位名稱 -> validate_task_data 使用的名稱
+FIELD_ALIASES = {'start_time': 'startTime', 'end_time': 'endTime'}
+
+
+def _to_object_id(value):
+    try:
+        return ObjectId(value)
+    except Exception:
+        return None
+
+
+def _merge_update(existing, changes):
+    """將更新內容套用到既有文件，回傳 validate_task_data 可用的資料"""
+    merged = {
+        'title': existing.get('title'),
+        'date': existing.get('date'),
+        'startTime': existing.get('start_time'),
+        'endTime': existing.get('end_time'),
+        'desc': existing.get('desc', '')
+    }
+    for field, value in changes.items():
+        key = FIELD_ALIASES.get(field, field)
+        if key in merged:
+            merged[key] = value
+    return merged
+
+
+def apply_task_batch(db, user_id, operations, ordered=True):
+    """驗證並套用一批任務操作，回傳每個操作的結果列表
+
+    operations 元素格式：
+        {'op': 'create', 'task': {...}}
+        {'op': 'update', 'id': '...', 'task': {...}}
+        {'op': 'delete', 'id': '...'}
+
+    驗證與衝突檢查（含批次內彼此衝突）在寫入前一次完成，之後以單一
+    bulk_write 寫入。ordered=True 時遇到第一個失敗即停止，其後標記為 skipped。
+    """
+    user_id = str(user_id)
+    results = [{'index': i, 'op': (op or {}).get('op') if isinstance(op, dict) else None,
+                'status': 'pending'} for i, op in enumerate(operations)]
+
+    # 一次載入所有被更新/刪除的既有任務
+    ids = [_to_object_id(op.get('id')) for op in operations if isinstance(op, dict) and op.get('id')]
+    existing = {
+        str(doc['_id']): doc
+        for doc in db.tasks.find({'_id': {'$in': [oid for oid in ids if oid]}, 'user_id': user_id})
+    }
+
+    # 一次載入所有相關日期的區間
+    detector = ConflictDetector(db, user_id)
+    dates = set()
+    for op in operations:
+        if not isinstance(op, dict):
+            continue
+        if isinstance(op.get('task'), dict) and isinstance(op['task'].get('date'), str):
+            dates.add(op['task']['date'])
+        if op.get('id') and str(op.get('id')) in existing:
+            dates.add(existing[str(op['id'])]['date'])
+    detector.load(dates)
+
+    requests = []
+    request_index = []  # bulk_write 請求索引 -> 操作索引
+    touched_dates = set()
+    stopped = False
+
+    for i, op in enumerate(operations):
+        result = results[i]
+        if stopped:
+            result['status'] = 'skipped'
+            continue
+
+        errors = _plan_operation(op, user_id, existing, detector, result, requests, touched_dates)
+        if errors:
+            result['status'] = 'error'
+            result['errors'] = errors
+            if ordered:
+                stopped = True
+        else:
+            request_index.append(i)
+
+    if requests:
+        try:
+            db.tasks.bulk_write(requests, ordered=ordered)
+        except BulkWriteError as e:
+            failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+            first_failure = min(failed) if failed else None
+            for position, i in enumerate(request_index):
+                if position in failed:
+                    results[i]['status'] = 'error'
+                    results[i]['errors'] = [failed[position].get('errmsg', '寫入失敗')]
+                elif ordered and first_failure is not None and position > first_failure:
+                    results[i]['status'] = 'skipped'
+        # 其他例外（連線中斷、逾時等）無法得知哪些寫入已生效，直接拋出，不記錄任何變更
+
+        for result in results:
+            if result['status'] == 'pending':
+                result['status'] = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}[result['op']]
+        Task.notify_changed(
+            db, user_id, touched_dates,
+            upserted=[r['id'] for r in results if r['status'] in ('created', 'updated')],
+            deleted=[r['id'] for r in results if r['status'] == 'deleted']
+        )
+
+    return results
+
+
+def _plan_operation(op, user_id, existing, detector, result, requests, touched_dates):
+    """驗證單一操作並加入寫入請求，回傳錯誤列表（空列表表示成功）"""
+    if not isinstance(op, dict) or op.get('op') not in ('create', 'update', 'delete'):
+        return ['op 必須為 create、update 或 delete']
+
+    kind = op['op']
+    if kind == 'create':
+        data = dict(op.get('task') or {})
+        is_valid, errors = validate_task_data(data, user_id)
+        if not is_valid:
+            return errors
+
+        conflicts = detector.find_conflicts(data['date'], data['startTime'], data['endTime'])
+        if conflicts:
+            result['conflicting_task'] = conflicts[0]
+            return ['該時段已有其他任務']
+
+        task = Task(user_id=user_id, title=data['title'], date=data['date'],
+                    start_time=data['startTime'], end_time=data['endTime'],
+                    desc=data.get('desc', ''), _id=ObjectId())
+        detector.add(task.id, task.date, task.start_time, task.end_time, task.title)
+        requests.append(InsertOne({'_id': task.id, **task.to_document()}))
+        touched_dates.add(task.date)
+        result['id'] = str(task.id)
+        return []
+
+    task_id = str(op.get('id') or '')
+    result['id'] = task_id
+    doc = existing.get(task_id)
+    if not doc:
+        return ['任務不存在或無權限修改']
+
+    if kind == 'delete':
+        detector.remove(task_id, doc['date'])
+        existing.pop(task_id)
+        requests.append(DeleteOne({'_id': doc['_id'], 'user_id': user_id}))
+        touched_dates.add(doc['date'])
+        return []
+
+    data = _merge_update(doc, op.get('task') or {})
+    is_valid, errors = validate_task_data(data, user_id)
+    if not is_valid:
+        return errors
+
+    conflicts = detector.find_conflicts(data['date'], data['startTime'], data['endTime'], exclude_id=task_id)
+    if conflicts:
+        result['conflicting_task'] = conflicts[0]
+        return ['該時段已有其他任務']
+
+    changes = {
+        'title': data['title'],
+        'date': data['date'],
+        'start_time': data['startTime'],
+        'end_time': data['endTime'],
+        'desc': data.get('desc', '')
+    }
+    detector.remove(task_id, doc['date'])
+    detector.add(task_id, changes['date'], changes['start_time'], changes['end_time'], changes['title'])
+    existing[task_id] = {**doc, **changes}
+    requests.append(UpdateOne({'_id': doc['_id'], 'user_id': user_id}, {'$set': {
+        **changes, **time_fields(changes['date'], changes['start_time'], changes['end_time'])
+    }}))
+    touched_dates.update((doc['date'], changes['date']))
+    return []
@@ -0,0 +1,240 @@
+# backend/utils/cache.py - 任務列表的讀取快取（記憶體 LRU / Redis）
+import threading
+import time
+from collections import OrderedDict
+from bson import json_util
+
+# 代表「不限日期」的範圍上下界
+MIN_DATE = ''
+MAX_DATE = '9999-12-31'
+
+
+class LRUCache:
+    """行程內的 LRU 快取，每筆資料有 TTL，並依用戶記錄每筆資料涵蓋的日期範圍"""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (到期時間, 值)
+        self._by_user = {}          # user_id -> set(key)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            self._by_user.setdefault(key[0], set()).add(key)
+            while len(self._data) > self.max_entries:
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        self._data.pop(key, None)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def invalidate(self, user_id, dates=None):
+        """刪除該用戶範圍內含任一指定日期的資料；dates 為 None 時全部刪除"""
+        with self._lock:
+            removed = 0
+            for key in list(self._by_user.get(user_id, ())):
+                if dates is not None:
+                    _, lo, hi = key[:3]
+                    if not any(lo <= date <= hi for date in dates):
+                        continue
+                self._remove(key)
+                removed += 1
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_user.clear()
+
+
+class RedisCache:
+    """Redis 快取：值以 BSON 相容 JSON 儲存，並以每個用戶的 set 記錄其快取鍵"""
+
+    def __init__(self, client, ttl=60, prefix='taskcache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, key):
+        return self.prefix + '|'.join(str(part) for part in key)
+
+    def _index(self, user_id):
+        return f'{self.prefix}idx:{user_id}'
+
+    def get(self, key):
+        raw = self.client.get(self._key(key))
+        return json_util.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        redis_key = self._key(key)
+        pipe = self.client.pipeline()
+        pipe.setex(redis_key, self.ttl, json_util.dumps(value))
+        pipe.sadd(self._index(key[0]), redis_key)
+        pipe.expire(self._index(key[0]), self.ttl)
+        pipe.execute()
+
+    def invalidate(self, user_id, dates=None):
+        index = self._index(user_id)
+        stale = []
+        for member in self.client.smembers(index):
+            member = member.decode() if isinstance(member, bytes) else member
+            _, lo, hi = member[len(self.prefix):].split('|')[:3]
+            if dates is None or any(lo <= date <= hi for date in dates):
+                stale.append(member)
+        if stale:
+            self.client.delete(*stale)
+            self.client.srem(index, *stale)
+        return len(stale)
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+
+class TaskListCache:
+    """Task.find_by_user 前的讀取快取，由 Task.save/delete 依日期精準失效"""
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """依設定選擇後端：TASK_CACHE = memory（預設）/ redis / none"""
+        kind = app.config.get('TASK_CACHE', 'memory')
+        ttl = int(app.config.get('TASK_CACHE_TTL', 30))
+        if kind == 'redis':
+            from utils.database import get_redis_client
+            self.backend = RedisCache(get_redis_client(app.config['REDIS_URL']), ttl=ttl)
+        elif kind == 'memory':
+            self.backend = LRUCache(max_entries=int(app.config.get('TASK_CACHE_SIZE', 1024)), ttl=ttl)
+        else:
+            self.backend = None
+        app.extensions['task_cache'] = self
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(user_id, date=None, date_from=None, date_to=None, extra=(), version=None):
+        """快取鍵：(user_id, 範圍下界, 範圍上界, 其他查詢參數..., 用戶版本)
+
+        失效只發生在處理寫入的程序；記憶體快取時其他程序的舊資料仍在。
+        帶入用戶版本（ETag 使用的同一個值）後，版本改變即換成新的鍵，
+        回應內容與 ETag 一定對應同一個版本。
+        """
+        if date:
+            lo, hi = date, date
+        else:
+            lo, hi = date_from or MIN_DATE, date_to or MAX_DATE
+        return (str(user_id), lo, hi) + tuple(str(part) for part in extra) + (f'v{version}',)
+
+    def get_or_load(self, key, loader):
+        """讀取快取，未命中時呼叫 loader() 並寫入"""
+        if not self.enabled:
+            return loader()
+
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is not None:
+            return value
+
+        value = loader()
+        self.backend.set(key, value)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        """get_or_load 的非同步版本，loader 為回傳 awaitable 的函式"""
+        if not self.enabled:
+            return await loader()
+
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is not None:
+            return value
+
+        value = await loader()
+        self.backend.set(key, value)
+        return value
+
+    def invalidate(self, user_id, dates=None):
+        if not self.enabled:
+            return 0
+        removed = self.backend.invalidate(str(user_id), dates)
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__ if self.backend else None,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+task_cache = TaskListCache()
+
+
+class ProfileCache:
+    """/api/auth/me 的用戶資料快取（行程內 LRU），User.save 更新資料時失效
+
+    新簽發的 token 已帶有 username/email claims，這個快取只在舊 token
+    （沒有這些 claims）時避免每次都查詢資料庫。
+    """
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        size = int(app.config.get('PROFILE_CACHE_SIZE', 1024))
+        self.backend = LRUCache(max_entries=size, ttl=int(app.config.get('PROFILE_CACHE_TTL', 300))) if size else None
+        app.extensions['profile_cache'] = self
+
+    def get(self, user_id):
+        return self.backend.get((str(user_id), 'profile')) if self.backend else None
+
+    def set(self, user_id, profile):
+        if self.backend:
+            self.backend.set((str(user_id), 'profile'), profile)
+
+    def invalidate(self, user_id):
+        if self.backend:
+            self.backend.invalidate(str(user_id))
+
+
+profile_cache = ProfileCache()
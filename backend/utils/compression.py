@@ -0,0 +1,96 @@
+# backend/utils/compression.py - 依 Accept-Encoding 壓縮回應（gzip / brotli）
+import gzip
+
+try:
+    import brotli  # 選用：有安裝時優先使用，JSON 壓縮率比 gzip 高
+except ImportError:
+    brotli = None
+
+# 值得壓縮的內容類型（JSON、文字、MessagePack）
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/msgpack', 'text/')
+
+
+def available_encodings():
+    """伺服器支援的編碼，依偏好排序"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """依請求的 Accept-Encoding（含 q 值）選出編碼；不接受任何一種時回傳 None"""
+    return accept_encodings.best_match(available_encodings())
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESS_BROTLI_LEVEL', 4))
+    return gzip.compress(data, compresslevel=config.get('COMPRESS_GZIP_LEVEL', 6), mtime=0)
+
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if 'Content-Encoding' in response.headers:
+        return False
+    return (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def _weaken_etag(response):
+    """壓縮後內容與未壓縮的位元組不同，強 ETag 不再成立，改為弱 ETag（條件式 GET 以弱比較判斷）"""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def init_compression(app):
+    """Flask：在 after_request 壓縮超過 COMPRESS_MIN_SIZE 的回應（串流回應不處理）"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if not _compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.is_streamed or response.direct_passthrough:
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+        return response
+
+
+def init_async_compression(app):
+    """init_compression 的 Quart 版本"""
+    if not app.config.get('COMPRESS_ENABLED', True):
+        return
+    from quart import request
+    from quart.wrappers.response import DataBody
+
+    @app.after_request
+    async def compress_response(response):
+        if not _compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        if not isinstance(response.response, DataBody):
+            return response
+
+        data = await response.get_data()
+        if len(data) < app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, app.config))
+        response.headers['Content-Encoding'] = encoding
+        _weaken_etag(response)
+        return response
@@ -0,0 +1,208 @@
+# backend/utils/conflicts.py - 任務時段衝突偵測
+from datetime import timedelta
+from models.task import Task
+from models.task_series import TaskSeries
+from utils.occupancy import task_date, task_interval
+from utils.timeutils import parse_date, time_to_minutes
+
+# 建立或修改重複系列時檢查衝突的天數（從第一次發生起算；沒有結束日期的系列不會無限展開）
+SERIES_CONFLICT_HORIZON_DAYS = 366
+
+class DayIntervals:
+    """單日的任務區間。
+
+    載入時一次排序，並把排序後的陣列視為隱式平衡二元樹，每個節點記錄子樹內的最大結束時間。
+    之後 add() 的區間先放在未排序的暫存區、remove() 只記錄移除的任務，查詢時一併比對；
+    暫存區大於已排序部分時才合併重建，因此新增的攤銷成本為 O(log n)。
+    """
+
+    # 暫存區至少累積這麼多筆才合併（小的日期不必每次新增都重建）
+    MIN_PENDING = 32
+
+    def __init__(self, intervals=()):
+        # 元素為 (start, end, task_id, payload)，start/end 為分鐘數
+        self._items = sorted(intervals, key=self._sort_key)
+        self._pending = []
+        self._removed = set()
+        self._rebuild()
+
+    @staticmethod
+    def _sort_key(item):
+        return item[:3]
+
+    def __len__(self):
+        return len(self._items) + len(self._pending) - len(self._removed)
+
+    def _rebuild(self):
+        self._max_end = [0] * len(self._items)
+        self._build(0, len(self._items))
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return 0
+        mid = (lo + hi) // 2
+        self._max_end[mid] = max(self._items[mid][1], self._build(lo, mid), self._build(mid + 1, hi))
+        return self._max_end[mid]
+
+    def _compact(self):
+        """把暫存區併入已排序的陣列並丟棄已移除的區間"""
+        removed = self._removed
+        self._items = sorted((item for item in self._items + self._pending if id(item) not in removed),
+                             key=self._sort_key)
+        self._pending = []
+        self._removed = set()
+        self._rebuild()
+
+    def add(self, start, end, task_id, payload=None):
+        """加入區間"""
+        self._pending.append((start, end, task_id, payload))
+        if len(self._pending) > max(self.MIN_PENDING, len(self._items)):
+            self._compact()
+
+    def remove(self, task_id):
+        """移除指定任務的區間"""
+        self._removed.update(id(item) for item in self._items + self._pending if item[2] == task_id)
+
+    def overlapping(self, start, end, exclude_id=None):
+        """回傳與 [start, end) 重疊的區間，依開始時間排序"""
+        found = []
+        self._query(0, len(self._items), start, end, found)
+        found.extend(item for item in self._pending if item[0] < end and item[1] > start)
+        found = [item for item in found if item[2] != exclude_id and id(item) not in self._removed]
+        if self._pending:
+            found.sort(key=self._sort_key)
+        return found
+
+    def _query(self, lo, hi, start, end, found):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        # 整棵子樹都在 start 之前結束，不可能重疊
+        if self._max_end[mid] <= start:
+            return
+        self._query(lo, mid, start, end, found)
+        item = self._items[mid]
+        # 右側子樹的開始時間都不早於 mid，若 mid 已在 end 之後開始即可停止
+        if item[0] >= end:
+            return
+        if item[1] > start:
+            found.append(item)
+        self._query(mid + 1, hi, start, end, found)
+
+
+class ConflictDetector:
+    """單一用戶的衝突偵測器：按日期載入任務區間，供建立、更新與批次匯入共用。
+
+    一次 load() 以單一查詢載入多個日期（另以一次查詢載入重疊的重複系列並展開發生）；
+    透過 add()/remove() 可以把同一批次中尚未寫入資料庫的變更納入後續檢查。
+    """
+
+    PROJECTION = {'title': 1, 'date': 1, 'start_time': 1, 'end_time': 1, 'day': 1, 'start_min': 1, 'end_min': 1}
+
+    def __init__(self, db, user_id):
+        self.db = db
+        self.user_id = str(user_id)
+        self._days = {}
+
+    @staticmethod
+    def build_query(user_id, dates):
+        """載入指定日期任務時使用的查詢條件"""
+        return {'user_id': str(user_id), **Task.dates_filter(dates)}
+
+    def _missing(self, dates):
+        return sorted({date for date in dates if date not in self._days})
+
+    def _series_query(self, missing):
+        return TaskSeries.window_query(self.user_id, missing[0], missing[-1])
+
+    def _fill(self, missing, docs, series_docs=()):
+        intervals = {date: [] for date in missing}
+        occurrences = [doc for doc in TaskSeries.expand_docs(series_docs, missing[0], missing[-1])
+                       if doc['date'] in intervals]
+        for doc in list(docs) + occurrences:
+            try:
+                start, end = task_interval(doc)
+            except (KeyError, ValueError, AttributeError):
+                continue  # 略過格式錯誤的舊資料
+            intervals.setdefault(task_date(doc), []).append((start, end, str(doc['_id']), {
+                'title': doc.get('title'),
+                'start_time': doc['start_time'],
+                'end_time': doc['end_time'],
+                **({'series_id': doc['series_id']} if 'series_id' in doc else {})
+            }))
+
+        for date, items in intervals.items():
+            self._days[date] = DayIntervals(items)
+
+    def load(self, dates):
+        """載入尚未快取的日期（單一查詢）"""
+        missing = self._missing(dates)
+        if missing:
+            self._fill(missing, self.db.tasks.find(self.build_query(self.user_id, missing), self.PROJECTION),
+                       self.db.task_series.find(self._series_query(missing)))
+
+    async def load_async(self, dates):
+        """load 的 Motor 版本；預先載入後 find_conflicts 等方法不會再查詢資料庫"""
+        missing = self._missing(dates)
+        if missing:
+            cursor = self.db.tasks.find(self.build_query(self.user_id, missing), self.PROJECTION)
+            series_cursor = self.db.task_series.find(self._series_query(missing))
+            self._fill(missing, await cursor.to_list(None), await series_cursor.to_list(None))
+
+    def find_conflicts(self, date, start_time, end_time, exclude_id=None, exclude_series=None):
+        """回傳與指定時段重疊的任務摘要列表（含重複系列的發生）
+
+        exclude_series 為系列 ID，更新系列時略過它自己的發生。
+        """
+        self.load([date])
+        start, end = time_to_minutes(start_time), time_to_minutes(end_time)
+        exclude_id = str(exclude_id) if exclude_id else None
+        exclude_series = str(exclude_series) if exclude_series else None
+        return [
+            {'id': task_id, **payload}
+            for _, _, task_id, payload in self._days[date].overlapping(start, end, exclude_id)
+            if not (exclude_series and payload.get('series_id') == exclude_series)
+        ]
+
+    def find_series_conflicts(self, series, horizon_days=SERIES_CONFLICT_HORIZON_DAYS, exclude_series=None):
+        """檢查系列前 horizon_days 天內的發生，回傳第一個衝突（附上日期）或 None"""
+        first = parse_date(series.date)
+        dates = series.occurrence_dates(series.date, (first + timedelta(days=horizon_days - 1)).isoformat())
+        self.load(dates)
+        for date in dates:
+            conflicts = self.find_conflicts(date, series.start_time, series.end_time,
+                                            exclude_series=exclude_series)
+            if conflicts:
+                return {**conflicts[0], 'date': date}
+        return None
+
+    async def find_series_conflicts_async(self, series, horizon_days=SERIES_CONFLICT_HORIZON_DAYS,
+                                          exclude_series=None):
+        """find_series_conflicts 的 Motor 版本"""
+        first = parse_date(series.date)
+        await self.load_async(series.occurrence_dates(
+            series.date, (first + timedelta(days=horizon_days - 1)).isoformat()))
+        return self.find_series_conflicts(series, horizon_days, exclude_series)
+
+    def check_many(self, slots):
+        """批次檢查多個時段，slots 元素為 (date, start_time, end_time[, exclude_id])
+
+        所有日期以單一查詢載入，回傳與 slots 對應的衝突列表。
+        """
+        slots = list(slots)
+        self.load(slot[0] for slot in slots)
+        return [self.find_conflicts(*slot) for slot in slots]
+
+    def add(self, task_id, date, start_time, end_time, title=None):
+        """將（尚未寫入或剛寫入的）任務加入偵測範圍"""
+        self.load([date])
+        self._days[date].add(time_to_minutes(start_time), time_to_minutes(end_time), str(task_id), {
+            'title': title,
+            'start_time': start_time,
+            'end_time': end_time
+        })
+
+    def remove(self, task_id, date):
+        """將任務自偵測範圍移除（例如同批次中被刪除或改期）"""
+        self.load([date])
+        self._days[date].remove(str(task_id))
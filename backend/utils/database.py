@@ -2,23 +2,86 @@
 from flask_pymongo import PyMongo
 from datetime import datetime
 import os
+import threading
+from utils.log import get_logger
+
+logger = get_logger('database')
 
 mongo = PyMongo()
 
+def _init_mongomock(uri):
+    """MONGO_URI 以 mongomock:// 開頭時改用 mongomock（本機測試、不需 mongod）"""
+    import mongomock
+    database_name = uri.split('/', 3)[3] if uri.count('/') >= 3 else ''
+    mongo.cx = mongomock.MongoClient()
+    mongo.db = mongo.cx[database_name or 'calendar_app']
+
+def _sync_indexes_in_background(app):
+    """在背景執行緒依註冊表同步索引，避免阻塞啟動"""
+    from models.indexes import sync_indexes
+
+    def run():
+        try:
+            report = sync_indexes(mongo.db, drop_stale=app.config.get('INDEX_DROP_STALE', False))
+            logger.info("✅ 索引同步完成: 建立 %s, 刪除 %s", report['created'], report['dropped'])
+        except Exception as e:
+            logger.exception("⚠️ 索引同步失敗: %s", e)
+
+    thread = threading.Thread(target=run, name='index-sync', daemon=True)
+    thread.start()
+    return thread
+
+def _running_cli_command():
+    """是否正在執行 flask 維運指令（flask run 在 run 指令內才載入 app，不算在內）"""
+    import click
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and ctx.command.name != 'run'
+
+def start_tombstone_compaction(app):
+    """在背景定期壓縮超過保留期限的刪除墓碑（TASK_COMPACTION_INTERVAL 為 0 時停用）"""
+    from models.task_change import TaskChange
+
+    interval = app.config.get('TASK_COMPACTION_INTERVAL', 3600)
+    retention_days = app.config.get('TASK_TOMBSTONE_RETENTION_DAYS', 30)
+    if interval <= 0:
+        return None
+
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                removed = TaskChange.compact(mongo.db, retention_days)
+                if removed:
+                    logger.info("✅ 墓碑壓縮完成: 刪除 %d 筆", removed)
+            except Exception as e:
+                logger.exception("⚠️ 墓碑壓縮失敗: %s", e)
+
+    thread = threading.Thread(target=run, name='tombstone-compaction', daemon=True)
+    thread.start()
+    app.extensions['tombstone_compaction'] = stop
+    return thread
+
+def get_redis_client(url):
+    """建立 Redis 用戶端；fakeredis:// 使用 fakeredis（本機測試用的替身）"""
+    if url.startswith('fakeredis://'):
+        import fakeredis
+        return fakeredis.FakeRedis()
+    import redis
+    return redis.Redis.from_url(url)
+
 def init_db(app):
     """初始化資料庫連接"""
     app.config['MONGO_URI'] = os.getenv('MONGO_URI', 'mongodb://localhost:27017/calendar_app')
-    mongo.init_app(app)
-    
-    # 創建索引
-    with app.app_context():
-        # 用戶集合索引
-        mongo.db.users.create_index('email', unique=True)
-        mongo.db.users.create_index('username', unique=True)
-        
-        # 任務集合索引
-        mongo.db.tasks.create_index([('userId', 1), ('date', 1)])
-        mongo.db.tasks.create_index([('userId', 1), ('createdAt', -1)])
-        
-    print("✅ 資料庫連接成功")
-    return mongo
\ No newline at end of file
+    if app.config['MONGO_URI'].startswith('mongomock://'):
+        _init_mongomock(app.config['MONGO_URI'])
+    else:
+        mongo.init_app(app)
+
+    # 創建索引（宣告在各模型的 INDEXES，於背景建立；INDEX_DROP_STALE 時一併刪除過時索引）
+    # flask 維運指令（sync-indexes、migrate-task-times 等）不在背景同步，避免與指令本身的操作同時進行
+    if not _running_cli_command():
+        app.extensions['index_sync'] = _sync_indexes_in_background(app)
+
+    logger.info("✅ 資料庫連接成功")
+    return mongo
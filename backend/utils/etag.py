@@ -0,0 +1,23 @@
+# backend/utils/etag.py - 條件式 GET（ETag / If-None-Match）
+import hashlib
+from flask import request, Response
+
+def make_etag(user_id, version, *parts):
+    """由用戶、版本與影響回應內容的參數組出 ETag 值（不含引號）"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+    return f'{user_id}-{version}-{digest}'
+
+def not_modified(etag):
+    """若請求的 If-None-Match 符合則回傳 304 回應，否則回傳 None
+
+    以弱比較判斷：壓縮過的回應帶的是弱 ETag（W/"..."），見 utils.compression。
+    """
+    if request.if_none_match.contains_weak(etag):
+        return with_etag(Response(status=304), etag, weak=not request.if_none_match.contains(etag))
+    return None
+
+def with_etag(response, etag, weak=False):
+    """設定 ETag，並要求瀏覽器每次都重新驗證"""
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,53 @@
+# backend/utils/export.py - 串流匯出任務（NDJSON / iCalendar）
+import json
+from models.task import Task
+from utils.ical import calendar_header, calendar_footer, task_to_vevent
+
+EXPORT_BATCH_SIZE = 500
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'tasks.ndjson'),
+    'ics': ('text/calendar; charset=utf-8', 'tasks.ics')
+}
+
+def export_cursor(db, user_id, date_from=None, date_to=None):
+    """建立匯出用的游標，批次大小固定以維持記憶體用量平穩"""
+    query = {'user_id': str(user_id), **Task.date_filter(date_from=date_from, date_to=date_to)}
+
+    return (db.tasks.find(query)
+            .sort(Task.sort_keys())
+            .batch_size(EXPORT_BATCH_SIZE))
+
+def _document_to_json(doc):
+    created_at = doc.get('created_at')
+    return json.dumps({
+        'id': str(doc['_id']),
+        'user_id': doc.get('user_id'),
+        'title': doc.get('title'),
+        'date': doc.get('date'),
+        'start_time': doc.get('start_time'),
+        'end_time': doc.get('end_time'),
+        'desc': doc.get('desc', ''),
+        'created_at': created_at.isoformat() if created_at else None
+    }, ensure_ascii=False)
+
+def iter_ndjson(cursor):
+    """逐筆輸出 NDJSON，每行一個任務"""
+    try:
+        for doc in cursor:
+            yield _document_to_json(doc) + '\n'
+    finally:
+        cursor.close()
+
+def iter_ics(cursor):
+    """逐筆輸出 iCalendar 內容"""
+    try:
+        yield calendar_header()
+        for doc in cursor:
+            yield task_to_vevent(doc)
+        yield calendar_footer()
+    finally:
+        cursor.close()
+
+def iter_export(cursor, fmt):
+    return iter_ics(cursor) if fmt == 'ics' else iter_ndjson(cursor)
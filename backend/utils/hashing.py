@@ -0,0 +1,122 @@
+# backend/utils/hashing.py - 密碼雜湊/驗證的有界程序池
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+from utils.metrics import registry
+
+# werkzeug 的雜湊格式為 "<method>$<salt>$<hash>"；method 需寫完整參數才能判斷是否需要升級
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+hash_rejections = registry.counter(
+    'password_hash_rejections_total', '因雜湊程序池滿載而拒絕的請求數', ('reason',))
+
+
+class HashingOverloaded(Exception):
+    """雜湊程序池滿載或逾時；路由應回傳 503 與 Retry-After"""
+
+    def __init__(self, retry_after):
+        super().__init__('密碼驗證服務忙碌中')
+        self.retry_after = retry_after
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """以固定大小的程序池執行雜湊，並限制排隊中的工作數
+
+    超過 max_pending 時立即拋出 HashingOverloaded，而不是讓請求執行緒
+    排隊等待；程序池於第一次使用時才建立（避免在 fork 前啟動子程序）。
+    """
+
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = 2
+        self.max_pending = 8
+        self.timeout = 10
+        self.retry_after = 1
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.max_pending = app.config.get('PASSWORD_HASH_QUEUE', self.workers * 4)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # 本程序已有背景執行緒（索引同步、撤銷清單、即時事件），fork 可能複製到被其他執行緒持有的鎖，
+                # 因此改用 forkserver（不支援時 spawn）。forkserver 只預先載入本模組，子程序由單執行緒的伺服器 fork。
+                # 兩者都會在子程序以 __mp_main__ 匯入主程式，因此 app.py 只在 create_app() 內建立 app。
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload([__name__])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+                atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+            return self._pool
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            hash_rejections.inc('queue_full')
+            raise HashingOverloaded(self.retry_after)
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            hash_rejections.inc('timeout')
+            raise HashingOverloaded(self.retry_after)
+
+    def hash(self, password):
+        """以設定的方法雜湊密碼"""
+        return self._result(self._submit(_hash, password, self.method))
+
+    def verify(self, password_hash, password):
+        """驗證密碼；雜湊為空時直接回傳 False"""
+        if not password_hash:
+            return False
+        return self._result(self._submit(_verify, password_hash, password))
+
+    async def hash_async(self, password):
+        return await self._result_async(self._submit(_hash, password, self.method))
+
+    async def verify_async(self, password_hash, password):
+        if not password_hash:
+            return False
+        return await self._result_async(self._submit(_verify, password_hash, password))
+
+    async def _result_async(self, future):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            hash_rejections.inc('timeout')
+            raise HashingOverloaded(self.retry_after)
+
+    def needs_rehash(self, password_hash):
+        """雜湊方法或成本參數與目前設定不同時回傳 True"""
+        return bool(password_hash) and password_hash.split('$', 1)[0] != self.method
+
+
+password_hasher = PasswordHasher()
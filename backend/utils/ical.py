@@ -0,0 +1,162 @@
+# backend/utils/ical.py - RFC 5545 iCalendar 輸出與解析
+import re
+from datetime import datetime, timedelta
+
+PRODID = '-//Calendar App//Tasks Export//ZH-TW'
+
+def escape_text(value):
+    """跳脫 TEXT 欄位中的特殊字元"""
+    return (str(value or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+def fold_line(line):
+    """依 RFC 5545 將超過 75 位元組的內容行折行，回傳以 CRLF 結尾的字串"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = char
+            limit = 74  # 續行開頭的空白佔一個位元組
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+def _format_local(date, time_str):
+    hours, minutes = time_str.split(':')
+    return f"{date.replace('-', '')}T{int(hours):02d}{int(minutes):02d}00"
+
+def calendar_header():
+    return ''.join(fold_line(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN'
+    ))
+
+def calendar_footer():
+    return fold_line('END:VCALENDAR')
+
+def task_to_vevent(doc):
+    """將任務文件轉為 VEVENT 區塊（浮動時間，不帶時區）"""
+    created_at = doc.get('created_at') or datetime.utcnow()
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{doc['_id']}@calendar-app",
+        f"DTSTAMP:{created_at.strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART:{_format_local(doc['date'], doc['start_time'])}",
+        f"DTEND:{_format_local(doc['date'], doc['end_time'])}",
+        f"SUMMARY:{escape_text(doc.get('title'))}"
+    ]
+    if doc.get('desc'):
+        lines.append(f"DESCRIPTION:{escape_text(doc['desc'])}")
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+# ==================== 解析 ====================
+DURATION_PATTERN = re.compile(r'^P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+def unescape_text(value):
+    """還原 TEXT 欄位的跳脫字元"""
+    return re.sub(r'\\([\\;,nN])',
+                  lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+def iter_unfolded(lines):
+    """將折行的內容行合併，逐行產生 (行號, 內容)，不需讀入整個檔案"""
+    current = None
+    current_number = 0
+    for number, raw in enumerate(lines, start=1):
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current_number, current
+        current, current_number = line, number
+    if current is not None:
+        yield current_number, current
+
+def _parse_property(line):
+    """解析 NAME;PARAM=VALUE:content，回傳 (名稱, 參數, 內容)"""
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    return name.upper(), dict(p.split('=', 1) for p in params if '=' in p), value
+
+def _parse_datetime(value, params):
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        raise ValueError('不支援全天事件')
+    return datetime.strptime(value.rstrip('Z')[:15], '%Y%m%dT%H%M%S')
+
+def _parse_duration(value):
+    match = DURATION_PATTERN.match(value.lstrip('+'))
+    if not match or not any(match.groups()):
+        raise ValueError(f'DURATION 格式不正確: {value}')
+    weeks, days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+def iter_vevents(lines):
+    """逐一解析 VEVENT，產生 (行號, 任務資料 dict 或 ValueError)
+
+    任務資料使用 validate_task_data 的欄位名稱（title/date/startTime/endTime/desc）。
+    時間以事件本身的時鐘時間為準（TZID 與 UTC 時間不做換算）。
+    """
+    event = None
+    nested = 0  # VEVENT 內的子元件（例如 VALARM）深度，其屬性不採用
+    for number, line in iter_unfolded(lines):
+        upper = line.upper()
+        if upper == 'BEGIN:VEVENT':
+            event, nested = {'_line': number}, 0
+            continue
+        if event is None:
+            continue
+        if upper == 'END:VEVENT':
+            yield event['_line'], _event_to_task(event)
+            event = None
+            continue
+        if upper.startswith('BEGIN:'):
+            nested += 1
+            continue
+        if upper.startswith('END:'):
+            nested -= 1
+            continue
+        if nested:
+            continue
+
+        name, params, value = _parse_property(line)
+        if name in ('SUMMARY', 'DESCRIPTION', 'DTSTART', 'DTEND', 'DURATION'):
+            event[name] = (params, value)
+
+def _event_to_task(event):
+    try:
+        if 'DTSTART' not in event:
+            raise ValueError('缺少 DTSTART')
+        start = _parse_datetime(event['DTSTART'][1], event['DTSTART'][0])
+        if 'DTEND' in event:
+            end = _parse_datetime(event['DTEND'][1], event['DTEND'][0])
+        elif 'DURATION' in event:
+            end = start + _parse_duration(event['DURATION'][1])
+        else:
+            raise ValueError('缺少 DTEND 或 DURATION')
+        if end.date() != start.date():
+            raise ValueError('不支援跨日事件')
+    except ValueError as e:
+        return e
+
+    return {
+        'title': unescape_text(event.get('SUMMARY', ({}, ''))[1]),
+        'date': start.strftime('%Y-%m-%d'),
+        'startTime': start.strftime('%H:%M'),
+        'endTime': end.strftime('%H:%M'),
+        'desc': unescape_text(event.get('DESCRIPTION', ({}, ''))[1])
+    }
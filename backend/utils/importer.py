@@ -0,0 +1,158 @@
+# backend/utils/importer.py - 串流匯入 iCalendar / CSV 任務
+import csv
+import io
+from models.task import Task
+from models.task_bucket import TaskBuckets
+from models.task_stats import TaskDailyStats
+from utils.conflicts import ConflictDetector
+from utils.ical import iter_vevents
+from utils.timeutils import duration_minutes
+from utils.validators import validate_task_data
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# CSV 欄位名稱（不分大小寫）-> validate_task_data 使用的名稱
+CSV_COLUMNS = {
+    'title': 'title',
+    'date': 'date',
+    'starttime': 'startTime',
+    'start_time': 'startTime',
+    'endtime': 'endTime',
+    'end_time': 'endTime',
+    'desc': 'desc',
+    'description': 'desc'
+}
+
+
+def detect_format(filename, explicit=None):
+    """依指定格式或副檔名判斷檔案格式，無法判斷時回傳 None"""
+    fmt = explicit
+    if not fmt and filename and '.' in filename:
+        fmt = filename.rsplit('.', 1)[-1]
+    fmt = (fmt or '').lower()
+    return fmt if fmt in ('ics', 'csv') else None
+
+
+def open_text(binary_stream):
+    """將上傳的二進位串流包成文字串流（逐行讀取，不整份讀入）"""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+
+def iter_csv_rows(text_stream):
+    """逐列解析 CSV，產生 (行號, 任務資料 dict)"""
+    reader = csv.DictReader(text_stream)
+    for row in reader:
+        data = {}
+        for column, value in row.items():
+            key = CSV_COLUMNS.get((column or '').strip().lower())
+            if key:
+                data[key] = (value or '').strip()
+        yield reader.line_num, data
+
+
+def iter_rows(text_stream, fmt):
+    if fmt == 'ics':
+        return iter_vevents(text_stream)
+    return iter_csv_rows(text_stream)
+
+
+class ImportReport:
+    """匯入進度與結果"""
+
+    def __init__(self):
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.conflicts = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'conflicts': self.conflicts,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _flush(db, user_id, chunk, report, check_conflicts):
+    """驗證衝突後以單次 insert_many 寫入一個區塊"""
+    if check_conflicts:
+        # 每個區塊重新建立偵測器：只載入本區塊涉及的日期，前面區塊已寫入資料庫
+        detector = ConflictDetector(db, user_id)
+        detector.load(data['date'] for _, data in chunk)
+
+    documents = []
+    for row, data in chunk:
+        if check_conflicts:
+            conflicts = detector.find_conflicts(data['date'], data['startTime'], data['endTime'])
+            if conflicts:
+                report.conflicts += 1
+                report.add_error(row, [f"該時段已有其他任務: {conflicts[0]['title']}"])
+                continue
+            detector.add(f'row-{row}', data['date'], data['startTime'], data['endTime'], data['title'])
+
+        task = Task(user_id=user_id, title=data['title'], date=data['date'],
+                    start_time=data['startTime'], end_time=data['endTime'],
+                    desc=data.get('desc', ''))
+        documents.append(task.to_document())
+
+    if documents:
+        result = db.tasks.insert_many(documents, ordered=False)
+        stats = {}
+        for doc in documents:
+            TaskDailyStats.add(stats, doc['date'], 1, duration_minutes(doc['start_time'], doc['end_time']))
+        dates = {doc['date'] for doc in documents}
+        if TaskBuckets.ENABLED:
+            TaskBuckets.refresh(db, user_id, dates)
+        Task.notify_changed(db, user_id, dates, upserted=result.inserted_ids, stats=stats)
+        report.imported += len(documents)
+
+
+def iter_import(db, user_id, text_stream, fmt, chunk_size=IMPORT_CHUNK_SIZE, check_conflicts=True):
+    """逐區塊匯入，每寫入一個區塊產生一次目前的 ImportReport
+
+    記憶體中最多只保留一個區塊的資料。
+    """
+    user_id = str(user_id)
+    report = ImportReport()
+    chunk = []
+
+    for row, data in iter_rows(text_stream, fmt):
+        report.processed += 1
+        if isinstance(data, Exception):
+            report.add_error(row, [str(data)])
+            continue
+
+        is_valid, errors = validate_task_data(data, user_id)
+        if not is_valid:
+            report.add_error(row, errors)
+            continue
+
+        chunk.append((row, data))
+        if len(chunk) >= chunk_size:
+            _flush(db, user_id, chunk, report, check_conflicts)
+            chunk = []
+            yield report
+
+    if chunk:
+        _flush(db, user_id, chunk, report, check_conflicts)
+    yield report
+
+
+def import_tasks(db, user_id, text_stream, fmt, chunk_size=IMPORT_CHUNK_SIZE,
+                 check_conflicts=True, progress=None):
+    """執行完整匯入並回傳最終 ImportReport；progress 會在每個區塊後被呼叫"""
+    report = None
+    for report in iter_import(db, user_id, text_stream, fmt, chunk_size, check_conflicts):
+        if progress:
+            progress(report)
+    return report
@@ -0,0 +1,159 @@
+# backend/utils/log.py - 結構化日誌（JSON 輸出、請求 ID、DEBUG 抽樣、非阻塞佇列）
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+ROOT_LOGGER = 'calendar'
+
+# 接受用戶端（或反向代理）傳入的 X-Request-ID，但限制字元與長度
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# LogRecord 內建屬性；其餘屬性（logger.info(..., extra={...})）會輸出為 JSON 欄位
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id'}
+
+
+def get_logger(name):
+    """取得模組用的 logger，例如 get_logger('tasks') -> calendar.tasks"""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+# 非 Flask 請求（async_app）的請求 ID，由 bind_request_id() 設定
+_request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def bind_request_id(incoming=None):
+    """驗證傳入的 X-Request-ID（不合格則產生新的），設為目前 context 的請求 ID"""
+    request_id = incoming if incoming and _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    _request_id.set(request_id)
+    return request_id
+
+
+def current_request_id():
+    """目前請求的 ID；不在請求中時回傳 None"""
+    if not has_request_context():
+        return _request_id.get()
+    if 'request_id' not in g:
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    return g.request_id
+
+
+class RequestIdFilter(logging.Filter):
+    """在發出日誌的執行緒中附上請求 ID（必須掛在佇列之前）"""
+
+    def filter(self, record):
+        record.request_id = current_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """DEBUG 等級的紀錄只保留 rate 比例，其他等級全數通過"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """每筆紀錄輸出為一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """開發用的單行文字格式"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        return super().format(record)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """保留 extra 欄位與例外堆疊，讓背景執行緒的 formatter 仍能輸出"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(config):
+    """依設定建立 handler：LOG_LEVEL、LOG_FORMAT（json/text）、LOG_DEBUG_SAMPLE_RATE
+
+    回傳 (calendar logger, QueueListener)。
+    """
+    level = logging.getLevelName(str(config.get('LOG_LEVEL', 'INFO')).upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    formatter = JsonFormatter() if config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    # 請求執行緒只把紀錄放入佇列，實際寫出由 QueueListener 的背景執行緒負責
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(SamplingFilter(config.get('LOG_DEBUG_SAMPLE_RATE', 1.0)))
+    queue_handler.addFilter(RequestIdFilter())
+
+    listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger, listener
+
+
+def init_logging(app):
+    """初始化 Flask app 的日誌，並在回應加上 X-Request-ID"""
+    logger, listener = configure_logging(app.config)
+
+    @app.after_request
+    def add_request_id(response):
+        response.headers['X-Request-ID'] = current_request_id()
+        return response
+
+    app.extensions['log_listener'] = listener
+    return logger
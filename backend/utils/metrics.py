@@ -0,0 +1,175 @@
+# backend/utils/metrics.py - 請求延遲、狀態碼與 MongoDB 指令計時（Prometheus 文字格式）
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, Response
+from pymongo import monitoring
+
+# 延遲直方圖的上界（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """依標籤累加的計數器"""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {value}' for key, value in items]
+
+
+class Histogram:
+    """固定區間的直方圖；每次觀測只做一次二分搜尋與一次加鎖"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # 標籤值 -> [各區間計數..., 總和, 次數]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        names = self.labels + ('le',)
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(names, key + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(names, key + ("+Inf",))} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {series[-1]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []  # 輸出時才計算的數值：回傳 [(名稱, 類型, 說明, 值)]
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            for name, metric_type, help_text, value in collect():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', '每個端點的請求延遲', ('method', 'endpoint'))
+http_requests_total = registry.counter(
+    'http_requests_total', '每個端點的回應狀態碼計數', ('method', 'endpoint', 'status'))
+stage_duration = registry.histogram(
+    'app_stage_duration_seconds', '請求內各階段（查詢、序列化等）的耗時', ('stage',))
+mongo_command_duration = registry.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB 指令耗時', ('command',))
+mongo_command_failures = registry.counter(
+    'mongodb_command_failures_total', '失敗的 MongoDB 指令數', ('command',))
+
+
+@contextmanager
+def timed(stage):
+    """記錄區塊耗時到 app_stage_duration_seconds{stage=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """以 pymongo 的指令監聽記錄每個 Mongo 指令的耗時"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event):
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+        mongo_command_failures.inc(event.command_name)
+
+
+def init_metrics(app):
+    """註冊請求計時中介層與 Mongo 指令監聽；必須在建立 MongoClient 之前呼叫"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    monitoring.register(MongoCommandListener())
+
+    @app.before_request
+    def start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            # 以路由規則作為標籤，避免 /api/tasks/<id> 產生無限多組標籤
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, request.method, endpoint)
+            http_requests_total.inc(request.method, endpoint, str(response.status_code))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
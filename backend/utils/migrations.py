@@ -0,0 +1,113 @@
+# backend/utils/migrations.py - 可中斷、可續跑的批次資料遷移（進度記錄在 migrations 集合）
+import time
+from datetime import datetime
+from pymongo import UpdateOne
+from utils.log import get_logger
+from utils.timeutils import time_fields
+
+logger = get_logger('migrations')
+
+MIGRATION_BATCH_SIZE = 1000
+
+TASK_TIME_FIELDS = 'task_time_fields'
+
+
+class Checkpoint:
+    """migrations 集合中的一筆進度：
+
+        {_id: 遷移名稱, last_id, processed, skipped, started_at, updated_at, completed_at}
+
+    每批寫入後更新 last_id；中斷後重新執行會從 last_id 之後繼續。
+    """
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def load(self):
+        return self.db.migrations.find_one({'_id': self.name})
+
+    def reset(self):
+        self.db.migrations.delete_one({'_id': self.name})
+
+    def start(self):
+        now = datetime.utcnow()
+        self.db.migrations.update_one(
+            {'_id': self.name},
+            {'$setOnInsert': {'last_id': None, 'processed': 0, 'skipped': 0, 'started_at': now},
+             '$set': {'updated_at': now, 'completed_at': None}},
+            upsert=True
+        )
+        return self.load()
+
+    def advance(self, last_id, processed, skipped):
+        self.db.migrations.update_one(
+            {'_id': self.name},
+            {'$set': {'last_id': last_id, 'updated_at': datetime.utcnow()},
+             '$inc': {'processed': processed, 'skipped': skipped}}
+        )
+
+    def complete(self):
+        now = datetime.utcnow()
+        self.db.migrations.update_one({'_id': self.name}, {'$set': {'updated_at': now, 'completed_at': now}})
+
+
+def _time_field_update(doc):
+    """回傳補上數值欄位的 UpdateOne；格式錯誤的舊資料回傳 None（略過）"""
+    try:
+        fields = time_fields(doc.get('date'), doc.get('start_time'), doc.get('end_time'))
+    except ValueError:
+        return None
+    # 條件包含原本的字串值：遷移期間若任務已被 API 修改（已寫入新的數值欄位），此筆不覆蓋
+    return UpdateOne(
+        {'_id': doc['_id'], 'date': doc.get('date'),
+         'start_time': doc.get('start_time'), 'end_time': doc.get('end_time')},
+        {'$set': fields}
+    )
+
+
+def migrate_task_time_fields(db, batch_size=MIGRATION_BATCH_SIZE, pause=0.0, restart=False, progress=None):
+    """為 tasks 集合補上 day / start_min / end_min
+
+    依 _id 遞增分批處理，每批一次 bulk_write 後記錄進度，可在服務運行中執行。
+    只寫入新增的數值欄位，不改動 API 回傳的內容，因此不需讓快取與 ETag 失效。
+    pause 為每批之間暫停的秒數，用來降低對線上流量的影響。回傳最後的進度文件。
+    """
+    checkpoint = Checkpoint(db, TASK_TIME_FIELDS)
+    if restart:
+        checkpoint.reset()
+    state = checkpoint.load()
+    if state and state.get('completed_at'):
+        return state
+
+    state = checkpoint.start()
+    last_id = state.get('last_id')
+    projection = {'date': 1, 'start_time': 1, 'end_time': 1}
+
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        docs = list(db.tasks.find(query, projection).sort('_id', 1).limit(batch_size))
+        if not docs:
+            break
+
+        requests = []
+        skipped = 0
+        for doc in docs:
+            request = _time_field_update(doc)
+            if request is None:
+                skipped += 1
+                logger.warning("⚠️ 任務 %s 的日期或時間格式不正確，略過", doc['_id'])
+            else:
+                requests.append(request)
+        if requests:
+            db.tasks.bulk_write(requests, ordered=False)
+
+        last_id = docs[-1]['_id']
+        checkpoint.advance(last_id, len(requests), skipped)
+        if progress:
+            progress(checkpoint.load())
+        if pause:
+            time.sleep(pause)
+
+    checkpoint.complete()
+    return checkpoint.load()
@@ -0,0 +1,97 @@
+# backend/utils/occupancy.py - 每日佔用（忙碌區間）與空檔計算
+from models.task import Task
+from models.task_series import TaskSeries
+from utils.versions import get_user_version
+from utils.timeutils import day_to_date, time_to_minutes, minutes_to_time, date_range, MINUTES_PER_DAY
+
+def merge_intervals(intervals):
+    """合併重疊或相鄰的 (start, end) 分鐘區間，回傳排序後的列表"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def occupancy_query(user_id, date_from, date_to):
+    """build_occupancy 使用的 (查詢條件, 投影)"""
+    return (
+        {'user_id': str(user_id), **Task.date_filter(date_from=date_from, date_to=date_to)},
+        {'_id': 0, 'date': 1, 'start_time': 1, 'end_time': 1, 'day': 1, 'start_min': 1, 'end_min': 1}
+    )
+
+def task_interval(doc):
+    """任務文件的 (start, end) 分鐘數；優先使用數值欄位，尚未遷移的舊資料由字串換算"""
+    if 'start_min' in doc:
+        return doc['start_min'], doc['end_min']
+    return time_to_minutes(doc['start_time']), time_to_minutes(doc['end_time'])
+
+def task_date(doc):
+    """任務文件的 YYYY-MM-DD；有 day 時以 day 換算（舊資料的日期字串可能未補零）"""
+    return day_to_date(doc['day']) if 'day' in doc else doc['date']
+
+def occupancy_from_docs(docs):
+    """由任務文件建立 {date: [(start, end), ...]} 的每日合併忙碌區間"""
+    busy = {}
+    for doc in docs:
+        try:
+            interval = task_interval(doc)
+        except (KeyError, ValueError, AttributeError):
+            continue  # 略過格式錯誤的舊資料
+        busy.setdefault(task_date(doc), []).append(interval)
+
+    return {date: merge_intervals(intervals) for date, intervals in busy.items()}
+
+def build_occupancy(db, user_id, date_from, date_to):
+    """以單一查詢建立每日合併忙碌區間（含重複系列的發生）
+
+    只投影日期與起訖時間，不取回完整任務內容。系列的展開快取以用戶版本為鍵，其他程序的系列變更也會反映。
+    """
+    version = get_user_version(db, user_id)
+    docs = list(db.tasks.find(*occupancy_query(user_id, date_from, date_to)))
+    return occupancy_from_docs(docs + TaskSeries.expand(db, user_id, date_from, date_to, version=version))
+
+def free_intervals(busy, day_start=0, day_end=MINUTES_PER_DAY):
+    """由合併後的忙碌區間推出 [day_start, day_end) 內的空檔"""
+    free = []
+    cursor = day_start
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= day_end:
+            break
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < day_end:
+        free.append((cursor, day_end))
+    return free
+
+def find_free_slots(occupancy, date_from, date_to, duration, limit,
+                    day_start=0, day_end=MINUTES_PER_DAY):
+    """依時間順序找出前 limit 個長度為 duration 分鐘的空閒時段"""
+    slots = []
+    for date in date_range(date_from, date_to):
+        for start, end in free_intervals(occupancy.get(date, []), day_start, day_end):
+            while start + duration <= end:
+                slots.append({
+                    'date': date,
+                    'start_time': minutes_to_time(start),
+                    'end_time': minutes_to_time(start + duration)
+                })
+                if len(slots) >= limit:
+                    return slots
+                start += duration
+    return slots
+
+def serialize_occupancy(occupancy):
+    """轉為 {date: [{'start_time', 'end_time'}, ...]} 供 JSON 輸出"""
+    return {
+        date: [
+            {'start_time': minutes_to_time(start), 'end_time': minutes_to_time(end)}
+            for start, end in intervals
+        ]
+        for date, intervals in sorted(occupancy.items())
+    }
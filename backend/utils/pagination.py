@@ -0,0 +1,38 @@
+# backend/utils/pagination.py
+import base64
+import json
+from bson import ObjectId
+from utils.timeutils import parse_date, time_to_minutes
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(date, start_time, task_id):
+    """將排序鍵 (date, start_time, _id) 編碼為不透明的游標字串"""
+    raw = json.dumps([date, start_time, str(task_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解碼游標，格式錯誤時拋出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, start_time, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        parse_date(date)
+        time_to_minutes(start_time)  # 排序鍵需能換算為日序號與分鐘數
+        if ':' in task_id:
+            # 重複系列的發生：'<系列ID>:<日期>'
+            ObjectId(task_id.split(':', 1)[0])
+            parse_date(task_id.split(':', 1)[1])
+            return date, start_time, task_id
+        return date, start_time, ObjectId(task_id)
+    except Exception:
+        raise ValueError('游標格式不正確')
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """解析每頁筆數，限制在 1 到 maximum 之間"""
+    if value in (None, ''):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit 必須大於 0')
+    return min(limit, maximum)
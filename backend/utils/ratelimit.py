@@ -0,0 +1,306 @@
+# backend/utils/ratelimit.py - 滑動視窗限流（記憶體 / Redis）與寫入端點的負載卸除
+import inspect
+import math
+import re
+import threading
+import time
+from functools import wraps
+from flask import Response, jsonify, request
+from utils.log import get_logger
+from utils.metrics import registry
+
+logger = get_logger('ratelimit')
+
+rate_limit_rejections = registry.counter(
+    'rate_limit_rejections_total', '因超過限流而拒絕的請求數', ('limit', 'key'))
+load_shed_rejections = registry.counter(
+    'load_shed_rejections_total', '因同時處理中的請求過多而拒絕的請求數', ('name',))
+
+UNITS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(spec):
+    """'5/minute'、'100/hour' 或 '10/30'（秒）-> (次數, 視窗秒數)"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\w+)\s*', spec or '')
+    if not match:
+        raise ValueError(f'無效的限流設定: {spec!r}')
+    count, unit = int(match.group(1)), match.group(2)
+    window = int(unit) if unit.isdigit() else UNITS.get(unit.rstrip('s'))
+    if not window:
+        raise ValueError(f'無效的限流單位: {unit!r}')
+    return count, window
+
+
+def _estimate(prev, curr, elapsed):
+    """滑動視窗計數：上一個視窗依剩餘比例加權，加上目前視窗的次數"""
+    return prev * (1 - elapsed) + curr
+
+
+def _retry_after(prev, curr, elapsed, limit, window):
+    """下一個請求可被接受前需等待的秒數（至少 1 秒）"""
+    if curr + 1 <= limit and prev > 0:
+        # 在目前視窗內等上一個視窗的權重降到足夠低
+        needed = 1 - (limit - 1 - curr) / prev
+        return max(1, math.ceil((needed - elapsed) * window))
+    # 目前視窗已滿：等到下一個視窗，並讓本視窗的權重降到足夠低
+    needed = 1 - (limit - 1) / curr if curr else 0
+    return max(1, math.ceil((1 - elapsed + max(0.0, needed)) * window))
+
+
+class MemoryBackend:
+    """行程內的滑動視窗計數（多個工作程序時各自計算）"""
+
+    PRUNE_EVERY = 1024
+
+    def __init__(self):
+        self._windows = {}  # key -> [視窗編號, 上一視窗次數, 目前視窗次數, 視窗秒數]
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def hit(self, key, limit, window):
+        """記錄一次請求；允許時回傳 None，拒絕時回傳 Retry-After 秒數"""
+        now = time.time()
+        index, offset = divmod(now, window)
+        elapsed = offset / window
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                self._prune(now)
+
+            entry = self._windows.get(key)
+            if entry is None or entry[0] < index - 1:
+                entry = [index, 0, 0, window]
+            elif entry[0] == index - 1:
+                entry = [index, entry[2], 0, window]
+            self._windows[key] = entry
+
+            _, prev, curr, _ = entry
+            if _estimate(prev, curr + 1, elapsed) > limit:
+                return _retry_after(prev, curr, elapsed, limit, window)
+            entry[2] += 1
+            return None
+
+    def _prune(self, now):
+        # 超過兩個視窗沒有請求的鍵已不影響計數
+        for key in [k for k, (index, _, _, window) in self._windows.items() if (index + 2) * window <= now]:
+            del self._windows[key]
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class RedisBackend:
+    """多個程序共用的滑動視窗計數；每個視窗一個計數鍵，兩個視窗後自動過期"""
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        index, offset = divmod(now, window)
+        index = int(index)
+        elapsed = offset / window
+        curr_key = f'{self.prefix}{key}:{index}'
+        prev_key = f'{self.prefix}{key}:{index - 1}'
+
+        pipe = self.client.pipeline()
+        pipe.incr(curr_key)
+        pipe.expire(curr_key, window * 2)
+        pipe.get(prev_key)
+        curr, _, prev = pipe.execute()
+        prev = int(prev or 0)
+
+        if _estimate(prev, curr, elapsed) > limit:
+            # 被拒絕的請求不計入，用戶端依 Retry-After 重試時才能通過
+            self.client.decr(curr_key)
+            return _retry_after(prev, curr - 1, elapsed, limit, window)
+        return None
+
+    def clear(self):
+        for key in self.client.scan_iter(f'{self.prefix}*'):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    """依 RATE_LIMITS 設定限制各端點的請求頻率
+
+    RATE_LIMITS 形如 {'login': {'ip': '20/minute', 'account': '5/minute'}}；
+    端點以 @rate_limit('login') 套用，每種鍵（ip / account / user）各自計數，
+    任一種超過即回傳 429 與 Retry-After。
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.limits = {}
+
+    def init_app(self, app):
+        """依設定選擇後端：RATE_LIMIT_BACKEND = memory（預設）/ redis / none"""
+        kind = app.config.get('RATE_LIMIT_BACKEND', 'memory')
+        if kind == 'redis':
+            from utils.database import get_redis_client
+            self.backend = RedisBackend(get_redis_client(app.config['REDIS_URL']))
+        elif kind == 'memory':
+            self.backend = MemoryBackend()
+        else:
+            self.backend = None
+        self.limits = {
+            name: {key: parse_rate(spec) for key, spec in specs.items() if spec}
+            for name, specs in app.config.get('RATE_LIMITS', {}).items()
+        }
+        app.extensions['rate_limiter'] = self
+
+    def check(self, name, identities):
+        """identities 為 {鍵種類: 值}；回傳 None（允許）或 Retry-After 秒數"""
+        if self.backend is None:
+            return None
+        retry_after = None
+        for key, (limit, window) in self.limits.get(name, {}).items():
+            value = identities.get(key)
+            if not value:
+                continue
+            try:
+                wait = self.backend.hit(f'{name}:{key}:{value}', limit, window)
+            except Exception as e:
+                # 共用後端無法連線時不阻擋請求
+                logger.warning("⚠️ 限流後端錯誤，略過檢查: %s", e)
+                return None
+            if wait is not None:
+                rate_limit_rejections.inc(name, key)
+                retry_after = max(retry_after or 0, wait)
+        return retry_after
+
+    def keys(self, name):
+        return set(self.limits.get(name, {}))
+
+
+class LoadShedder:
+    """限制同時處理中的請求數；超過時立即回傳 503，而不是讓請求排隊"""
+
+    def __init__(self):
+        self.max_inflight = {}
+        self.retry_after = 1
+        self._slots = {}
+
+    def init_app(self, app):
+        self.max_inflight = dict(app.config.get('LOAD_SHED_MAX_INFLIGHT', {}))
+        self.retry_after = app.config.get('LOAD_SHED_RETRY_AFTER', 1)
+        self._slots = {name: threading.BoundedSemaphore(limit)
+                       for name, limit in self.max_inflight.items() if limit > 0}
+        app.extensions['load_shedder'] = self
+
+    def acquire(self, name):
+        """取得處理名額；回傳 False 表示應拒絕（未設定上限時一律回傳 True）"""
+        slots = self._slots.get(name)
+        if slots is None:
+            return True
+        if slots.acquire(blocking=False):
+            return True
+        load_shed_rejections.inc(name)
+        return False
+
+    def release(self, name):
+        slots = self._slots.get(name)
+        if slots is not None:
+            slots.release()
+
+
+rate_limiter = RateLimiter()
+load_shedder = LoadShedder()
+
+
+def _too_many_requests(retry_after, jsonify=jsonify):
+    return jsonify({
+        'success': False,
+        'message': '請求過於頻繁，請稍後再試'
+    }), 429, {'Retry-After': str(retry_after)}
+
+
+def _overloaded(jsonify=jsonify):
+    return jsonify({
+        'success': False,
+        'message': '伺服器忙碌中，請稍後再試'
+    }), 503, {'Retry-After': str(load_shedder.retry_after)}
+
+
+def _account(data):
+    data = data if isinstance(data, dict) else {}
+    return str(data.get('email') or data.get('username') or '').strip().lower() or None
+
+
+def rate_limit(name):
+    """依 RATE_LIMITS[name] 限流；需要 user 鍵時請放在 @jwt_required() 之下"""
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            return _async_rate_limit(name, view)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            keys = rate_limiter.keys(name)
+            identities = {'ip': request.remote_addr}
+            if 'account' in keys:
+                identities['account'] = _account(request.get_json(silent=True))
+            if 'user' in keys:
+                from flask_jwt_extended import get_jwt_identity
+                identities['user'] = get_jwt_identity()
+            retry_after = rate_limiter.check(name, identities)
+            if retry_after is not None:
+                return _too_many_requests(retry_after)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _async_rate_limit(name, view):
+    from quart import jsonify as async_jsonify, request as async_request
+    from utils.async_jwt import get_jwt_identity
+
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        keys = rate_limiter.keys(name)
+        identities = {'ip': async_request.remote_addr}
+        if 'account' in keys:
+            identities['account'] = _account(await async_request.get_json(silent=True))
+        if 'user' in keys:
+            identities['user'] = get_jwt_identity()
+        retry_after = rate_limiter.check(name, identities)
+        if retry_after is not None:
+            return _too_many_requests(retry_after, async_jsonify)
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+def shed_load(name):
+    """同時處理中的請求超過 LOAD_SHED_MAX_INFLIGHT[name] 時回傳 503（串流回應送完才算處理完）"""
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            from quart import jsonify as async_jsonify
+
+            @wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                if not load_shedder.acquire(name):
+                    return _overloaded(async_jsonify)
+                try:
+                    return await view(*args, **kwargs)
+                finally:
+                    load_shedder.release(name)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not load_shedder.acquire(name):
+                return _overloaded()
+            deferred = False
+            try:
+                response = view(*args, **kwargs)
+                if isinstance(response, Response) and response.is_streamed:
+                    # 串流回應的內容在 view 返回後才產生，送完（或連線中斷）關閉回應時才釋放
+                    response.call_on_close(lambda: load_shedder.release(name))
+                    deferred = True
+                return response
+            finally:
+                if not deferred:
+                    load_shedder.release(name)
+        return wrapper
+    return decorator
@@ -0,0 +1,294 @@
+# backend/utils/realtime.py - 任務即時事件：每個程序一個共用的變更監看器，分送到各連線的記憶體佇列
+import asyncio
+import queue
+import threading
+from pymongo.errors import OperationFailure
+from models.task_change import TaskChange
+from utils.log import get_logger
+from utils.metrics import registry
+from utils.serializer import change_to_json, dumps
+
+logger = get_logger('realtime')
+
+# 輪詢模式每次查詢最多涵蓋的用戶數（$or 的分支數）
+POLL_USERS_PER_QUERY = 200
+# 監看失敗後重新開始前等待的秒數
+RETRY_DELAY = 5
+# 不是 replica set（不支援 change stream）時的錯誤碼
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+_WATCH_PIPELINE = [{'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}}]
+
+HEARTBEAT = b': ping\n\n'
+
+
+def format_event(name, payload):
+    """SSE 的一個事件（bytes）"""
+    return b'event: ' + name.encode('ascii') + b'\ndata: ' + dumps(payload) + b'\n\n'
+
+
+class Subscription:
+    """一條 SSE 連線；queue 為 queue.Queue（Flask）或 asyncio.Queue（Quart）"""
+
+    __slots__ = ('user_id', 'queue', 'overflowed')
+
+    def __init__(self, user_id, event_queue):
+        self.user_id = user_id
+        self.queue = event_queue
+        self.overflowed = False
+
+    def drain(self):
+        """丟棄佇列中的事件（送出 reset 之後用戶端會重新載入）"""
+        self.overflowed = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class TaskEventHub:
+    """監看 task_changes，把任務的新增/修改（upsert）與刪除（delete）分送給該用戶的連線
+
+    每個程序只有一個資料庫游標（change stream，或不支援時的輪詢），每條 SSE 連線只是一個記憶體佇列。
+    事件格式與 GET /changes 相同：{'op': 'upsert', 'task': {...}, 'token'}、{'op': 'delete', 'id', 'token'}
+    或重複系列變更時的 {'op': 'series', 'id', 'token'}，token 可直接作為 /changes 的 since。佇列滿（用戶端讀取太慢）時改送 reset，用戶端應重新載入。
+    """
+
+    def __init__(self):
+        self.mode = 'auto'  # auto / change_stream / poll
+        self.poll_interval = 1.0
+        self.queue_size = 100
+        self.heartbeat = 15
+        self.max_subscribers = 1000
+        self.active_mode = None
+        self._subscribers = {}  # user_id -> {Subscription}
+        self._seqs = {}         # user_id -> 已分送的最大序號（輪詢模式使用）
+        self._resume_token = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.mode = app.config.get('REALTIME_MODE', 'auto')
+        if self.mode == 'auto' and app.config.get('MONGO_URI', '').startswith('mongomock://'):
+            self.mode = 'poll'  # mongomock 沒有 change stream
+        self.poll_interval = app.config.get('REALTIME_POLL_INTERVAL', 1.0)
+        self.queue_size = app.config.get('REALTIME_QUEUE_SIZE', 100)
+        self.heartbeat = app.config.get('REALTIME_HEARTBEAT', 15)
+        self.max_subscribers = app.config.get('REALTIME_MAX_SUBSCRIBERS', 1000)
+        if 'task_events' not in app.extensions:
+            registry.collectors.append(lambda: [
+                ('task_event_subscribers', 'gauge', '目前的任務即時事件連線數', self.subscriber_count())
+            ])
+        app.extensions['task_events'] = self
+
+    # ---- 訂閱 ----
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, user_id, event_queue, seq):
+        """註冊一條連線；seq 為連線時用戶的任務版本（之後的變更才送出）。連線數已達上限時回傳 None"""
+        user_id = str(user_id)
+        with self._lock:
+            if sum(len(subs) for subs in self._subscribers.values()) >= self.max_subscribers:
+                return None
+            subscription = Subscription(user_id, event_queue)
+            subs = self._subscribers.setdefault(user_id, set())
+            if not subs:
+                self._seqs[user_id] = seq
+            subs.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs is None:
+                return
+            subs.discard(subscription)
+            if not subs:
+                del self._subscribers[subscription.user_id]
+                self._seqs.pop(subscription.user_id, None)
+
+    # ---- 分送 ----
+
+    def publish(self, user_id, payload):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for subscription in subs:
+            try:
+                subscription.queue.put_nowait(payload)
+            except (queue.Full, asyncio.QueueFull):
+                subscription.overflowed = True
+
+    def _reset_all(self):
+        """監看中斷、可能漏掉事件時，讓所有連線重新載入"""
+        with self._lock:
+            subs = [sub for user_subs in self._subscribers.values() for sub in user_subs]
+        for subscription in subs:
+            subscription.overflowed = True
+
+    def _dispatch(self, records, docs):
+        """變更紀錄 -> 事件；docs 為 {任務ID: 目前的任務文件}（與 /changes 相同，見 change_to_json）"""
+        for record in records:
+            user_id = record['user_id']
+            token = TaskChange.encode_token(record['seq'])
+            doc = docs.get(record['_id']) if record['op'] == 'upsert' else None
+            payload = {**change_to_json(record, doc), 'token': token}
+            with self._lock:
+                if user_id in self._seqs:
+                    self._seqs[user_id] = max(self._seqs[user_id], record['seq'])
+            self.publish(user_id, payload)
+
+    def _subscribed(self, record):
+        return record is not None and record.get('user_id') in self._subscribers
+
+    def _poll_queries(self):
+        with self._lock:
+            items = list(self._seqs.items())
+        for i in range(0, len(items), POLL_USERS_PER_QUERY):
+            yield {'$or': [{'user_id': user_id, 'seq': {'$gt': seq}}
+                           for user_id, seq in items[i:i + POLL_USERS_PER_QUERY]]}
+
+    @staticmethod
+    def _upserted_ids(records):
+        return [record['_id'] for record in records if record['op'] == 'upsert']
+
+    # ---- 監看（Flask：背景執行緒）----
+
+    def _poll(self, db):
+        for query in self._poll_queries():
+            records = list(db.task_changes.find(query).sort([('seq', 1), ('_id', 1)]))
+            ids = self._upserted_ids(records)
+            docs = {doc['_id']: doc for doc in db.tasks.find({'_id': {'$in': ids}})} if ids else {}
+            self._dispatch(records, docs)
+
+    def _watch(self, db):
+        with db.task_changes.watch(_WATCH_PIPELINE, full_document='updateLookup',
+                                   resume_after=self._resume_token) as stream:
+            self.active_mode = 'change_stream'
+            for change in stream:
+                self._resume_token = stream.resume_token
+                record = change.get('fullDocument')
+                if not self._subscribed(record):
+                    continue
+                doc = db.tasks.find_one({'_id': record['_id']}) if record['op'] == 'upsert' else None
+                self._dispatch([record], {record['_id']: doc} if doc else {})
+
+    def _fallback(self, e):
+        """auto 模式下 change stream 不可用時改為輪詢，回傳是否已切換"""
+        if (self.mode == 'auto' and isinstance(e, OperationFailure)
+                and e.code == CHANGE_STREAM_UNSUPPORTED):
+            logger.warning("⚠️ 資料庫不支援 change stream（需要 replica set），任務即時事件改為輪詢")
+            self.mode = 'poll'
+            return True
+        return False
+
+    def _failed(self, e):
+        logger.exception("⚠️ 任務即時事件監看失敗: %s", e)
+        self._resume_token = None
+        self._reset_all()
+
+    def start_thread(self, db_getter):
+        """在背景執行共用的監看器（Flask app 使用；db_getter 回傳 pymongo 資料庫）"""
+        stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                if self.mode == 'poll':
+                    self.active_mode = 'poll'
+                    try:
+                        self._poll(db_getter())
+                    except Exception as e:
+                        logger.exception("⚠️ 任務即時事件輪詢失敗: %s", e)
+                    stop.wait(self.poll_interval)
+                    continue
+                try:
+                    self._watch(db_getter())
+                except Exception as e:
+                    if not self._fallback(e):
+                        self._failed(e)
+                        stop.wait(RETRY_DELAY)
+
+        threading.Thread(target=run, name='task-events', daemon=True).start()
+        return stop
+
+    def iter_events(self, subscription, ready):
+        """Flask 串流回應的內容：先送 ready，之後為 task / reset 事件，閒置時送心跳註解"""
+        try:
+            yield format_event('ready', ready)
+            while True:
+                try:
+                    payload = subscription.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    payload = None
+                if subscription.overflowed:
+                    subscription.drain()
+                    yield format_event('reset', {})
+                elif payload is None:
+                    yield HEARTBEAT
+                else:
+                    yield format_event('task', payload)
+        finally:
+            self.unsubscribe(subscription)
+
+    # ---- 監看（Quart：事件迴圈內的 task）----
+
+    async def _poll_async(self, adb):
+        for query in self._poll_queries():
+            records = await adb.task_changes.find(query).sort([('seq', 1), ('_id', 1)]).to_list(None)
+            ids = self._upserted_ids(records)
+            docs = {doc['_id']: doc for doc in
+                    await adb.tasks.find({'_id': {'$in': ids}}).to_list(None)} if ids else {}
+            self._dispatch(records, docs)
+
+    async def _watch_async(self, adb):
+        async with adb.task_changes.watch(_WATCH_PIPELINE, full_document='updateLookup',
+                                          resume_after=self._resume_token) as stream:
+            self.active_mode = 'change_stream'
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                record = change.get('fullDocument')
+                if not self._subscribed(record):
+                    continue
+                doc = await adb.tasks.find_one({'_id': record['_id']}) if record['op'] == 'upsert' else None
+                self._dispatch([record], {record['_id']: doc} if doc else {})
+
+    async def run_async(self, adb_getter):
+        """start_thread 的事件迴圈版本（async_app 使用）"""
+        while True:
+            if self.mode == 'poll':
+                self.active_mode = 'poll'
+                try:
+                    await self._poll_async(adb_getter())
+                except Exception as e:
+                    logger.exception("⚠️ 任務即時事件輪詢失敗: %s", e)
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                await self._watch_async(adb_getter())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not self._fallback(e):
+                    self._failed(e)
+                    await asyncio.sleep(RETRY_DELAY)
+
+    async def iter_events_async(self, subscription, ready):
+        """iter_events 的 Quart 版本"""
+        try:
+            yield format_event('ready', ready)
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscription.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    payload = None
+                if subscription.overflowed:
+                    subscription.drain()
+                    yield format_event('reset', {})
+                elif payload is None:
+                    yield HEARTBEAT
+                else:
+                    yield format_event('task', payload)
+        finally:
+            self.unsubscribe(subscription)
+
+
+task_events = TaskEventHub()
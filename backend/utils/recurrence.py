@@ -0,0 +1,188 @@
+# backend/utils/recurrence.py - 類 RRULE 的重複規則：解析、驗證與依日期範圍展開
+import re
+from datetime import date, timedelta
+from utils.timeutils import parse_date
+
+FREQS = ('daily', 'weekly', 'monthly')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+MAX_INTERVAL = 366
+MAX_COUNT = 5000
+
+
+def _parse_rrule_string(text):
+    """'FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=20261231' -> dict"""
+    data = {}
+    for part in text.strip().removeprefix('RRULE:').split(';'):
+        if not part:
+            continue
+        name, sep, value = part.partition('=')
+        if not sep:
+            raise ValueError(f'無效的規則片段: {part!r}')
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'byday':
+            data['byday'] = value.split(',')
+        elif name == 'until' and re.fullmatch(r'\d{8}(T\d{6}Z?)?', value):
+            data['until'] = f'{value[:4]}-{value[4:6]}-{value[6:8]}'
+        else:
+            data[name] = value
+    return data
+
+
+def parse_rule(value, dtstart):
+    """驗證並正規化重複規則，回傳 {freq, interval, byday, until, count}；不合法時拋出 ValueError
+
+    value 可為 dict（{'freq': 'weekly', 'byday': ['MO', 'WE'], 'until': '2026-12-31'}）
+    或 RRULE 字串（'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10'）。weekly 未指定 byday 時為 dtstart 的星期，
+    monthly 固定為 dtstart 的日期（該月沒有這一天時略過）。
+    """
+    if isinstance(value, str):
+        value = _parse_rrule_string(value)
+    if not isinstance(value, dict):
+        raise ValueError('rule 必須為物件或 RRULE 字串')
+
+    freq = str(value.get('freq') or '').lower()
+    if freq not in FREQS:
+        raise ValueError('rule.freq 必須為 daily、weekly 或 monthly')
+
+    try:
+        interval = int(value.get('interval') or 1)
+        count = int(value['count']) if value.get('count') not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError('rule.interval 與 rule.count 必須為整數') from None
+    if not 1 <= interval <= MAX_INTERVAL:
+        raise ValueError(f'rule.interval 必須介於 1 到 {MAX_INTERVAL}')
+    if count is not None and not 1 <= count <= MAX_COUNT:
+        raise ValueError(f'rule.count 必須介於 1 到 {MAX_COUNT}')
+
+    byday = None
+    if freq == 'weekly':
+        byday = value.get('byday') or [WEEKDAYS[dtstart.weekday()]]
+        if isinstance(byday, str):
+            byday = byday.split(',')
+        byday = [str(day).strip().upper() for day in byday]
+        if any(day not in WEEKDAYS for day in byday):
+            raise ValueError('rule.byday 只能包含 MO、TU、WE、TH、FR、SA、SU')
+        byday = sorted(set(byday), key=WEEKDAYS.index)
+
+    until = value.get('until') or None
+    if until is not None:
+        try:
+            until_date = parse_date(until)
+        except (TypeError, ValueError):
+            raise ValueError('rule.until 格式不正確，應為 YYYY-MM-DD') from None
+        if until_date < dtstart:
+            raise ValueError('rule.until 不可早於開始日期')
+        until = until_date.isoformat()
+    if until and count:
+        raise ValueError('rule.until 與 rule.count 只能擇一')
+
+    return {'freq': freq, 'interval': interval, 'byday': byday, 'until': until, 'count': count}
+
+
+def format_rule(rule):
+    """正規化後的規則 -> RRULE 字串"""
+    parts = [f"FREQ={rule['freq'].upper()}", f"INTERVAL={rule['interval']}"]
+    if rule.get('byday'):
+        parts.append(f"BYDAY={','.join(rule['byday'])}")
+    if rule.get('until'):
+        parts.append(f"UNTIL={rule['until'].replace('-', '')}")
+    if rule.get('count'):
+        parts.append(f"COUNT={rule['count']}")
+    return ';'.join(parts)
+
+
+def _add_months(start, months):
+    """start 之後第 months 個月的同一天；該月沒有這一天時回傳 None"""
+    year, month = divmod(start.month - 1 + months, 12)
+    if start.year + year > date.max.year:
+        raise OverflowError('date value out of range')
+    try:
+        return start.replace(year=start.year + year, month=month + 1)
+    except ValueError:
+        return None
+
+
+def _daily(dtstart, interval, date_from):
+    # 直接跳到範圍開始前的第一個週期，不從 dtstart 逐一計算
+    n = max(0, -(-(date_from - dtstart).days // interval))
+    while True:
+        yield n, dtstart + timedelta(days=n * interval)
+        n += 1
+
+
+def _weekly(dtstart, interval, byday, date_from):
+    offsets = [WEEKDAYS.index(day) for day in byday]
+    week0 = dtstart - timedelta(days=dtstart.weekday())
+    first_week = [offset for offset in offsets if offset >= dtstart.weekday()]
+    k = max(0, (date_from - week0).days // (7 * interval))
+    # 第 k 週之前已出現的次數（COUNT 需要）
+    n = 0 if k == 0 else len(first_week) + (k - 1) * len(offsets)
+    while True:
+        week = week0 + timedelta(weeks=k * interval)
+        for offset in (first_week if k == 0 else offsets):
+            yield n, week + timedelta(days=offset)
+            n += 1
+        k += 1
+
+
+def _monthly(dtstart, interval):
+    n = 0
+    k = 0
+    while True:
+        day = _add_months(dtstart, k * interval)
+        if day is not None:
+            yield n, day
+            n += 1
+        k += 1
+
+
+def iter_dates(dtstart, rule, date_from, date_to, exdates=()):
+    """依序產生 [date_from, date_to] 內的發生日期（date 物件）
+
+    exdates 為排除的日期（YYYY-MM-DD）；與 RRULE 相同，被排除的日期仍計入 count。
+    """
+    until = parse_date(rule['until']) if rule.get('until') else None
+    count = rule.get('count')
+    last = min(date_to, until) if until else date_to
+    start = max(date_from, dtstart)
+    if start > last:
+        return
+
+    freq, interval = rule['freq'], rule['interval']
+    if freq == 'daily':
+        candidates = _daily(dtstart, interval, start)
+    elif freq == 'weekly':
+        candidates = _weekly(dtstart, interval, rule['byday'], start)
+    else:
+        candidates = _monthly(dtstart, interval)
+
+    excluded = set(exdates)
+    try:
+        for n, day in candidates:
+            if count is not None and n >= count:
+                return
+            if day > last:
+                return
+            if day >= start and day.isoformat() not in excluded:
+                yield day
+    except OverflowError:
+        return  # 超出 date 可表示的範圍
+
+
+def occurs_on(dtstart, rule, day, exdates=()):
+    """指定日期是否為發生日"""
+    return next(iter_dates(dtstart, rule, day, day, exdates), None) is not None
+
+
+def last_date(dtstart, rule):
+    """最後一次發生的日期；沒有結束條件時回傳 None"""
+    if rule.get('until'):
+        return parse_date(rule['until'])
+    if not rule.get('count'):
+        return None
+    last = None
+    for last in iter_dates(dtstart, rule, dtstart, date.max):
+        pass
+    return last
@@ -0,0 +1,215 @@
+# backend/utils/revocation.py - token 撤銷清單：bloom filter + TTL 集合，定期從資料庫同步
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from models.revoked_token import RevokedToken
+from utils.log import get_logger
+from utils.metrics import registry
+
+logger = get_logger('revocation')
+
+revocation_checks = registry.counter(
+    'token_revocation_checks_total', 'token 撤銷檢查結果', ('result',))
+
+# 同步時往回重疊的秒數，避免漏掉同時寫入、created_at 稍早的紀錄（重複套用無妨）
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class BloomFilter:
+    """固定大小的 bloom filter；只能新增，清除時需重建"""
+
+    def __init__(self, capacity=100000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    """JWT blocklist 檢查：大部分請求只做一次 bloom filter 查詢，不需要任何 I/O
+
+    - 已撤銷的 jti 放在 bloom filter 與 {jti: 到期時間} 集合；bloom 判斷「可能存在」
+      時才以集合確認，集合依 token 到期時間定期清除。
+    - 「登出所有裝置」記錄每個用戶的 revoked_before，iat 早於它的 token 一律失效。
+    - 其他程序的撤銷由背景同步取得，因此最多有 REVOCATION_SYNC_INTERVAL 秒的延遲；
+      同一程序內的撤銷立即生效。
+    """
+
+    def __init__(self):
+        self.capacity = 100000
+        self.error_rate = 0.001
+        self.sync_interval = 10
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._revoked = {}         # jti -> 到期時間（UNIX 秒）
+        self._revoked_before = {}  # user_id -> (revoked_before, 到期時間)
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.capacity = app.config.get('REVOCATION_BLOOM_CAPACITY', 100000)
+        self.error_rate = app.config.get('REVOCATION_BLOOM_ERROR_RATE', 0.001)
+        self.sync_interval = app.config.get('REVOCATION_SYNC_INTERVAL', 10)
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        if 'revocation_list' not in app.extensions:
+            registry.collectors.append(lambda: [
+                ('revoked_tokens', 'gauge', '記憶體中已撤銷且未過期的 token 數', len(self._revoked)),
+                ('revoked_users', 'gauge', '記憶體中「登出所有裝置」的用戶數', len(self._revoked_before))
+            ])
+        app.extensions['revocation_list'] = self
+
+    # ---- 檢查 ----
+
+    def is_revoked(self, claims):
+        """JWT blocklist loader 使用；claims 為解碼後的 payload"""
+        user_entry = self._revoked_before.get(str(claims.get('sub')))
+        if user_entry and claims.get('iat', 0) < user_entry[0]:
+            revocation_checks.inc('user_revoked')
+            return True
+
+        jti = claims.get('jti')
+        if not jti or jti not in self._bloom:
+            revocation_checks.inc('bloom_negative')
+            return False
+        if jti in self._revoked:
+            revocation_checks.inc('revoked')
+            return True
+        revocation_checks.inc('false_positive')
+        return False
+
+    # ---- 撤銷（寫入資料庫並立即套用到本程序）----
+
+    def revoke_token(self, db, claims):
+        expires = claims['exp']
+        RevokedToken.revoke_jti(db, claims['jti'], claims['sub'], datetime.utcfromtimestamp(expires))
+        self._add_jti(claims['jti'], expires)
+
+    def revoke_all(self, db, user_id, max_token_lifetime):
+        """使該用戶在這一秒之前簽發的所有 token 失效（iat 只有秒精度，
+        同一秒內簽發的 token 不受影響；呼叫端應另外撤銷目前的 token）"""
+        now = int(time.time())
+        expires = now + max_token_lifetime
+        RevokedToken.revoke_user(db, user_id, now, datetime.utcfromtimestamp(expires))
+        self._set_revoked_before(str(user_id), now, expires)
+
+    async def revoke_token_async(self, adb, claims):
+        expires = claims['exp']
+        await RevokedToken.revoke_jti_async(adb, claims['jti'], claims['sub'], datetime.utcfromtimestamp(expires))
+        self._add_jti(claims['jti'], expires)
+
+    async def revoke_all_async(self, adb, user_id, max_token_lifetime):
+        now = int(time.time())
+        expires = now + max_token_lifetime
+        await RevokedToken.revoke_user_async(adb, user_id, now, datetime.utcfromtimestamp(expires))
+        self._set_revoked_before(str(user_id), now, expires)
+
+    def _add_jti(self, jti, expires):
+        with self._lock:
+            if jti not in self._revoked:
+                self._revoked[jti] = expires
+                self._bloom.add(jti)
+
+    def _set_revoked_before(self, user_id, revoked_before, expires):
+        with self._lock:
+            current = self._revoked_before.get(user_id)
+            if not current or current[0] < revoked_before:
+                self._revoked_before[user_id] = (revoked_before, expires)
+
+    # ---- 同步與清除 ----
+
+    def apply(self, docs):
+        """套用從資料庫讀到的撤銷紀錄"""
+        for doc in docs:
+            # Mongo 回傳不含時區的 UTC 時間
+            expires = doc['expires_at'].replace(tzinfo=timezone.utc).timestamp() if doc.get('expires_at') else time.time()
+            if doc.get('kind') == 'user':
+                self._set_revoked_before(doc['user_id'], doc['revoked_before'], expires)
+            else:
+                self._add_jti(doc['_id'], expires)
+            created_at = doc.get('created_at')
+            if created_at and (self._synced_at is None or created_at > self._synced_at):
+                self._synced_at = created_at
+
+    def _since(self):
+        return self._synced_at - SYNC_OVERLAP if self._synced_at else None
+
+    def sync(self, db):
+        self.apply(RevokedToken.changed_since(db, self._since()))
+        self.prune()
+
+    async def sync_async(self, adb):
+        self.apply(await RevokedToken.changed_since_async(adb, self._since()))
+        self.prune()
+
+    def prune(self):
+        """移除已過期 token 的紀錄；數量大幅減少或超出容量時重建 bloom filter"""
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, expires in self._revoked.items() if expires <= now]
+            for jti in expired:
+                del self._revoked[jti]
+            for user_id in [u for u, (_, expires) in self._revoked_before.items() if expires <= now]:
+                del self._revoked_before[user_id]
+
+            if expired or self._bloom.count > self._bloom.capacity:
+                capacity = max(self.capacity, len(self._revoked) * 2)
+                bloom = BloomFilter(capacity, self.error_rate)
+                for jti in self._revoked:
+                    bloom.add(jti)
+                self._bloom = bloom
+
+    def start_sync_thread(self, db_getter):
+        """在背景定期同步（Flask app 使用；db_getter 回傳 pymongo 資料庫）
+
+        第一次同步會載入所有未過期的撤銷紀錄，之後只讀取新增的部分。
+        """
+        stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                try:
+                    self.sync(db_getter())
+                except Exception as e:
+                    logger.exception("⚠️ 撤銷清單同步失敗: %s", e)
+                stop.wait(self.sync_interval)
+
+        threading.Thread(target=run, name='revocation-sync', daemon=True).start()
+        return stop
+
+    async def run_async_sync(self, adb_getter):
+        """start_sync_thread 的事件迴圈版本（async_app 使用）"""
+        while True:
+            try:
+                await self.sync_async(adb_getter())
+            except Exception as e:
+                logger.exception("⚠️ 撤銷清單同步失敗: %s", e)
+            await asyncio.sleep(self.sync_interval)
+
+    def stats(self):
+        return {
+            'revoked_tokens': len(self._revoked),
+            'revoked_users': len(self._revoked_before),
+            'bloom_bits': self._bloom.size,
+            'bloom_hashes': self._bloom.hashes
+        }
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,136 @@
+# backend/utils/serializer.py - 任務列表的快速序列化：原始文件直接轉為 JSON（或 MessagePack）bytes
+import json
+from functools import lru_cache
+from flask import Response
+
+try:
+    import orjson  # 選用：有安裝時使用，編碼速度約為標準 json 的數倍
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # 選用：用戶端以 Accept: application/msgpack 要求時使用
+except ImportError:
+    msgpack = None
+
+_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+_MSGPACK_TYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+
+def http_date(value):
+    """與 Flask jsonify 輸出 datetime 相同的格式（RFC 1123，UTC），不受 locale 影響"""
+    return '%s, %02d %s %04d %02d:%02d:%02d GMT' % (
+        _DAYS[value.weekday()], value.day, _MONTHS[value.month - 1], value.year,
+        value.hour, value.minute, value.second)
+
+
+def compile_projection(fields):
+    """依 [(輸出欄位, 文件欄位, 轉換函式或 None, 預設值)] 產生 doc -> dict 的函式
+
+    欄位清單只在這裡處理一次：產生一個直接建立 dict 的函式，
+    每筆文件不再需要迴圈走訪欄位清單。
+    """
+    namespace = {}
+    lines = ['def project(doc):', '    get = doc.get']
+    items = []
+    for i, (out, src, convert, default) in enumerate(fields):
+        namespace[f'_d{i}'] = default
+        if convert is None:
+            items.append(f'{out!r}: get({src!r}, _d{i})')
+        else:
+            namespace[f'_c{i}'] = convert
+            lines.append(f'    v{i} = get({src!r})')
+            items.append(f'{out!r}: _c{i}(v{i}) if v{i} is not None else _d{i}')
+    lines.append('    return {' + ', '.join(items) + '}')
+    exec(compile('\n'.join(lines), f'<projection {",".join(f[0] for f in fields)}>', 'exec'), namespace)
+    return namespace['project']
+
+
+# 與 Task.to_dict() 經 jsonify 後的內容相同
+TASK_FIELDS = (
+    ('id', '_id', str, None),
+    ('user_id', 'user_id', None, None),
+    ('title', 'title', None, None),
+    ('date', 'date', None, None),
+    ('start_time', 'start_time', None, None),
+    ('end_time', 'end_time', None, None),
+    ('desc', 'desc', None, ''),
+    ('created_at', 'created_at', http_date, None),
+    ('series_id', 'series_id', None, None)
+)
+
+task_to_json = compile_projection(TASK_FIELDS)
+
+# fields= 可用的預設組合；summary 為月曆格子需要的欄位（不含可能很長的 desc）
+TASK_FIELD_PRESETS = {
+    'summary': ('id', 'title', 'date', 'start_time', 'end_time', 'series_id')
+}
+
+# keyset 分頁的游標需要這些文件欄位，即使回應不輸出也要查詢
+_CURSOR_SOURCES = ('date', 'start_time')
+
+
+@lru_cache(maxsize=64)
+def task_projection(fields=None):
+    """回傳 (doc -> dict 函式, Mongo projection)；fields 為 None 時輸出全部欄位"""
+    if fields is None:
+        return task_to_json, None
+    selected = [spec for spec in TASK_FIELDS if spec[0] in fields]
+    projection = {src: 1 for _, src, _, _ in selected}
+    projection.update({src: 1 for src in _CURSOR_SOURCES})
+    if 'id' not in fields:
+        projection['_id'] = 1  # 仍需 _id 產生游標
+    return compile_projection(selected), projection
+
+
+def change_to_json(record, doc=None):
+    """task_changes 的一筆紀錄 -> /changes 與即時事件的內容
+
+    doc 為任務目前的文件，已不存在的任務視為刪除；系列的紀錄只帶系列 ID，用戶端應重新載入列表。
+    """
+    if record['op'] == 'series':
+        return {'op': 'series', 'id': str(record['_id'])}
+    if doc:
+        return {'op': 'upsert', 'task': task_to_json(doc)}
+    return {'op': 'delete', 'id': str(record['_id'])}
+
+
+def select_fields(task_dict, fields):
+    """只保留 fields 指定的欄位（Task.to_dict() 的結果；fields 為 None 時原樣回傳）"""
+    if fields is None:
+        return task_dict
+    return {name: task_dict[name] for name in fields}
+
+
+def dumps(payload):
+    """編碼為 UTF-8 JSON bytes；沒有 orjson 時使用標準 json"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200, response_class=Response):
+    """以 dumps 編碼的 JSON 回應（async_app 傳入 quart.Response）"""
+    return response_class(dumps(payload), status=status, mimetype='application/json')
+
+
+def response_format(accept_mimetypes):
+    """依 Accept 選擇 'json' 或 'msgpack'；未安裝 msgpack 或用戶端未明確要求時為 json"""
+    if msgpack is None:
+        return 'json'
+    best = accept_mimetypes.best_match(('application/json',) + _MSGPACK_TYPES, default='application/json')
+    return 'msgpack' if best in _MSGPACK_TYPES else 'json'
+
+
+def encoded_response(payload, fmt='json', status=200, response_class=Response):
+    """依 response_format 的結果編碼回應，並標示內容依 Accept 而異"""
+    if fmt == 'msgpack':
+        response = response_class(msgpack.packb(payload, use_bin_type=True), status=status,
+                                  mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = json_response(payload, status, response_class)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,60 @@
+# backend/utils/timeutils.py - 時間字串與分鐘數、日期與日序號的轉換
+from datetime import date, datetime, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+
+# 日序號的起點：day = 與 1970-01-01 相差的天數
+EPOCH_DATE = date(1970, 1, 1)
+
+def time_to_minutes(time_str):
+    """將 HH:MM（或 H:MM）轉為從午夜起算的分鐘數"""
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def normalize_time(time_str):
+    """將 H:MM 補零為 HH:MM（字串排序才與時間先後一致）"""
+    return minutes_to_time(time_to_minutes(time_str))
+
+def duration_minutes(start_time, end_time):
+    """任務長度（分鐘）；結束早於開始時視為跨午夜（與前端 calculateDuration 相同），格式錯誤時為 0"""
+    try:
+        return (time_to_minutes(end_time) - time_to_minutes(start_time)) % MINUTES_PER_DAY
+    except (AttributeError, ValueError):
+        return 0
+
+def minutes_to_time(minutes):
+    """將分鐘數轉回 HH:MM；1440 表示當天結束，輸出 24:00"""
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+def parse_date(date_str):
+    """解析 YYYY-MM-DD，格式或日期不合法時拋出 ValueError"""
+    return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+def date_to_day(date_str):
+    """YYYY-MM-DD -> 日序號（整數，可直接比較大小與做範圍查詢）"""
+    return (parse_date(date_str) - EPOCH_DATE).days
+
+def day_to_date(day):
+    """日序號 -> YYYY-MM-DD"""
+    return (EPOCH_DATE + timedelta(days=day)).isoformat()
+
+def time_fields(date_str, start_time, end_time):
+    """任務文件的數值欄位：day（日序號）、start_min / end_min（從午夜起算的分鐘數）
+
+    格式錯誤時拋出 ValueError。
+    """
+    try:
+        return {
+            'day': date_to_day(date_str),
+            'start_min': time_to_minutes(start_time),
+            'end_min': time_to_minutes(end_time)
+        }
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError('日期或時間格式不正確') from None
+
+def date_range(date_from, date_to):
+    """依序產生 date_from 到 date_to（包含兩端）的 YYYY-MM-DD 字串"""
+    current, last = parse_date(date_from), parse_date(date_to)
+    while current <= last:
+        yield current.isoformat()
+        current += timedelta(days=1)
@@ -0,0 +1,213 @@
+# backend/utils/validators.py - 任務欄位與查詢參數驗證
+import re
+from datetime import datetime, timedelta
+from utils.pagination import parse_limit
+from utils.serializer import TASK_FIELDS, TASK_FIELD_PRESETS
+from utils.recurrence import parse_rule
+from utils.timeutils import time_to_minutes, normalize_time, parse_date
+
+# 範圍查詢最多涵蓋的天數
+MAX_RANGE_DAYS = 366
+
+def validate_time_format(time_str):
+    """驗證時間格式 HH:MM"""
+    if not isinstance(time_str, str):
+        return False
+    return re.match(r'^([0-1]?[0-9]|2[0-3]):[0-5][0-9]$', time_str) is not None
+
+def validate_date_format(date_str):
+    """驗證日期格式 YYYY-MM-DD（且為實際存在的日期，才能換算日序號）"""
+    if not isinstance(date_str, str) or re.match(r'^\d{4}-\d{2}-\d{2}$', date_str) is None:
+        return False
+    try:
+        parse_date(date_str)
+    except ValueError:
+        return False
+    return True
+
+def validate_task_data(data, user_id):
+    """驗證任務數據"""
+    errors = []
+    
+    # 檢查必填欄位
+    required_fields = ['title', 'date', 'startTime', 'endTime']
+    for field in required_fields:
+        if field not in data or not data[field]:
+            # 嘗試使用底線格式的欄位名稱
+            alt_field = field.replace('Time', '_time')
+            if alt_field in data and data[alt_field]:
+                data[field] = data[alt_field]
+            else:
+                errors.append(f'缺少必填欄位: {field}')
+    
+    if errors:
+        return False, errors
+    
+    # 驗證時間格式
+    if not validate_time_format(data['startTime']):
+        errors.append('開始時間格式不正確，應為 HH:MM')
+    
+    if not validate_time_format(data['endTime']):
+        errors.append('結束時間格式不正確，應為 HH:MM')
+    
+    # 驗證日期格式
+    if not validate_date_format(data['date']):
+        errors.append('日期格式不正確，應為 YYYY-MM-DD')
+    
+    if errors:
+        return False, errors
+
+    # 統一為 HH:MM，並以分鐘數比較（'9:00' 與 '10:00' 的字串比較結果不正確）
+    data['startTime'] = normalize_time(data['startTime'])
+    data['endTime'] = normalize_time(data['endTime'])
+    if time_to_minutes(data['startTime']) >= time_to_minutes(data['endTime']):
+        errors.append('結束時間必須晚於開始時間')
+    
+    return len(errors) == 0, errors
+
+
+def apply_task_updates(task, data):
+    """將 PUT 請求的欄位套用到任務上，回傳錯誤訊息（None 表示成功）"""
+    if 'title' in data:
+        task.title = data['title']
+
+    if 'date' in data:
+        if not validate_date_format(data['date']):
+            return '日期格式不正確，應為 YYYY-MM-DD'
+        task.date = data['date']
+
+    if 'startTime' in data or 'start_time' in data:
+        start_time = data.get('startTime') or data.get('start_time')
+        if not validate_time_format(start_time):
+            return '開始時間格式不正確，應為 HH:MM'
+        task.start_time = normalize_time(start_time)
+
+    if 'endTime' in data or 'end_time' in data:
+        end_time = data.get('endTime') or data.get('end_time')
+        if not validate_time_format(end_time):
+            return '結束時間格式不正確，應為 HH:MM'
+        task.end_time = normalize_time(end_time)
+
+    if 'desc' in data:
+        task.desc = data['desc']
+
+    # 驗證時間邏輯（以分鐘數比較；未修改的舊資料可能不是 HH:MM）
+    try:
+        if time_to_minutes(task.start_time) >= time_to_minutes(task.end_time):
+            return '結束時間必須晚於開始時間'
+    except (AttributeError, ValueError):
+        return '時間格式不正確，應為 HH:MM'
+    return None
+
+def validate_series_data(data, user_id):
+    """驗證重複系列：任務欄位同 validate_task_data（date 為第一次的日期），另需 rule；exdates 為選填
+
+    成功時 data['rule'] 會被換成正規化後的規則。
+    """
+    is_valid, errors = validate_task_data(data, user_id)
+    if not is_valid:
+        return False, errors
+
+    try:
+        data['rule'] = parse_rule(data.get('rule'), parse_date(data['date']))
+    except ValueError as e:
+        errors.append(str(e))
+
+    exdates = data.get('exdates') or []
+    if not isinstance(exdates, list) or not all(validate_date_format(date) for date in exdates):
+        errors.append('exdates 必須為 YYYY-MM-DD 日期的陣列')
+    else:
+        data['exdates'] = exdates
+
+    return len(errors) == 0, errors
+
+
+def merge_series_updates(series, data):
+    """將 PUT 請求的欄位套用到既有系列上，回傳 validate_series_data 可用的資料"""
+    merged = {
+        'title': series.title,
+        'date': series.date,
+        'startTime': series.start_time,
+        'endTime': series.end_time,
+        'desc': series.desc,
+        'rule': series.rule,
+        'exdates': series.exdates
+    }
+    aliases = {'start_time': 'startTime', 'end_time': 'endTime'}
+    for field, value in data.items():
+        key = aliases.get(field, field)
+        if key in merged:
+            merged[key] = value
+    return merged
+
+def parse_date_range(args, default_days=14):
+    """解析 from/to 查詢參數，回傳 (from, to)；不合法時拋出 ValueError
+
+    未提供 from 時從今天開始，未提供 to 時涵蓋 default_days 天。
+    """
+    date_from = args.get('from') or datetime.utcnow().date().isoformat()
+    if not validate_date_format(date_from):
+        raise ValueError('日期格式不正確，應為 YYYY-MM-DD')
+    start = parse_date(date_from)
+
+    date_to = args.get('to') or (start + timedelta(days=default_days - 1)).isoformat()
+    if not validate_date_format(date_to):
+        raise ValueError('日期格式不正確，應為 YYYY-MM-DD')
+    end = parse_date(date_to)
+
+    _check_span(start, end)
+    return date_from, date_to
+
+def _check_span(start, end):
+    if end < start:
+        raise ValueError('結束日期不可早於開始日期')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'日期範圍最多 {MAX_RANGE_DAYS} 天')
+
+def parse_list_range(args):
+    """解析任務列表的 date / from / to（皆可省略），回傳 (date, from, to)；不合法時拋出 ValueError
+
+    同時提供 from 與 to 時，範圍內的重複任務會展開，因此與 parse_date_range 一樣限制天數。
+    """
+    date, date_from, date_to = args.get('date'), args.get('from'), args.get('to')
+    for value in (date, date_from, date_to):
+        if value and not validate_date_format(value):
+            raise ValueError('日期格式不正確，應為 YYYY-MM-DD')
+    if date_from and date_to:
+        _check_span(parse_date(date_from), parse_date(date_to))
+    return date, date_from, date_to
+
+def parse_free_slot_args(args):
+    """解析 /free-slots 的查詢參數；不合法時拋出 ValueError
+
+    回傳 (from, to, duration, limit, day_start, day_end)，時間皆為分鐘數。
+    """
+    date_from, date_to = parse_date_range(args)
+    duration = int(args.get('duration', 60))
+    limit = parse_limit(args.get('limit'), default=5, maximum=100)
+    day_start = args.get('day_start', '00:00')
+    day_end = args.get('day_end', '24:00')
+    if not validate_time_format(day_start) or not (day_end == '24:00' or validate_time_format(day_end)):
+        raise ValueError('時間格式不正確，應為 HH:MM')
+    day_start, day_end = time_to_minutes(day_start), time_to_minutes(day_end)
+    if day_start >= day_end:
+        raise ValueError('day_end 必須晚於 day_start')
+    if not 0 < duration <= day_end - day_start:
+        raise ValueError('duration 必須為正整數且不超過每日可用時間')
+    return date_from, date_to, duration, limit, day_start, day_end
+
+def parse_fields(value):
+    """解析 fields= 參數：預設組合名稱或逗號分隔的欄位；未指定時回傳 None（全部欄位）
+
+    回傳依 TASK_FIELDS 順序排列的 tuple，讓相同欄位組合共用同一個序列化函式。
+    """
+    if not value:
+        return None
+    if value in TASK_FIELD_PRESETS:
+        return TASK_FIELD_PRESETS[value]
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    known = [spec[0] for spec in TASK_FIELDS]
+    unknown = requested - set(known)
+    if unknown:
+        raise ValueError(f"未知的欄位: {', '.join(sorted(unknown))}")
+    return tuple(name for name in known if name in requested)
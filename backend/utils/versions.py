@@ -0,0 +1,32 @@
+# backend/utils/versions.py - 每個用戶的任務版本計數器
+from pymongo import ReturnDocument
+
+def get_user_version(db, user_id):
+    """讀取用戶目前的任務版本（從未寫入時為 0）"""
+    doc = db.task_versions.find_one({'_id': str(user_id)}, {'version': 1})
+    return (doc or {}).get('version', 0)
+
+def bump_user_version(db, user_id):
+    """原子地遞增用戶的任務版本，回傳遞增後的值"""
+    doc = db.task_versions.find_one_and_update(
+        {'_id': str(user_id)},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc['version']
+
+async def get_user_version_async(adb, user_id):
+    """get_user_version 的 Motor 版本"""
+    doc = await adb.task_versions.find_one({'_id': str(user_id)}, {'version': 1})
+    return (doc or {}).get('version', 0)
+
+async def bump_user_version_async(adb, user_id):
+    """bump_user_version 的 Motor 版本"""
+    doc = await adb.task_versions.find_one_and_update(
+        {'_id': str(user_id)},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return doc['version']
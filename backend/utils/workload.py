@@ -0,0 +1,46 @@
+# backend/utils/workload.py - 由每日彙總組出 /stats 的每日、每週工作量
+from datetime import timedelta
+from utils.timeutils import date_range, duration_minutes, parse_date
+
+
+def _hours(minutes):
+    return round(minutes / 60, 2)
+
+
+def week_start(date_str):
+    """該日期所在週的週一（與前端 getWeekStartDate 相同）"""
+    day = parse_date(date_str)
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def summarize_workload(docs, date_from, date_to, occurrences=()):
+    """docs 為 TaskDailyStats.find_range 的結果；範圍內沒有任務的日期補 0
+
+    occurrences 為 TaskSeries.expand 展開的發生（重複系列不在每日彙總內，逐筆加入）。
+    每週小計只計入範圍內的日期，week_start 為週一。
+    """
+    by_date = {doc['date']: dict(doc) for doc in docs}
+    for occurrence in occurrences:
+        doc = by_date.setdefault(occurrence['date'], {'count': 0, 'minutes': 0})
+        doc['count'] += 1
+        doc['minutes'] += duration_minutes(occurrence['start_time'], occurrence['end_time'])
+    days = []
+    weeks = {}
+    total_count = total_minutes = 0
+    for date in date_range(date_from, date_to):
+        doc = by_date.get(date)
+        count, minutes = (doc['count'], doc['minutes']) if doc else (0, 0)
+        days.append({'date': date, 'count': count, 'hours': _hours(minutes)})
+
+        week = weeks.setdefault(week_start(date), [0, 0])
+        week[0] += count
+        week[1] += minutes
+        total_count += count
+        total_minutes += minutes
+
+    return {
+        'days': days,
+        'weeks': [{'week_start': start, 'count': count, 'hours': _hours(minutes)}
+                  for start, (count, minutes) in weeks.items()],
+        'total': {'count': total_count, 'hours': _hours(total_minutes)}
+    }
@@ -40,12 +40,15 @@ let currentDate = new Date();
 let currentView = 'month'; // 'month' 或 'week'
 let timeTrendChart = null;
 let busyChart = null;
+let dailyStats = {}; // 日期 -> { count, hours }，由 /tasks/stats 取得
 
 // API 設定
 const API_BASE_URL = 'http://localhost:5000/api';
 let currentUser = null;
 let authToken = null;
 let isSubmitting = false; // 防止重複提交
+let taskStream = null; // EventSource：接收其他分頁或裝置的任務變更
+let statsRefreshTimer = null;
 
 // ==================== DOM 加載完成後初始化 ====================
 document.addEventListener('DOMContentLoaded', function() {
@@ -121,6 +124,7 @@ function showMainApp() {
   
   // 載入當前用戶的任務（不是預設任務）
   loadTasks();
+  connectTaskStream();
 }
 
 // 新增表單驗證函數
@@ -306,6 +310,9 @@ function initAuthEvents() {
 }
 
 // ==================== API 請求函數 ====================
+// GET 回應的 ETag 快取：endpoint -> { etag, body }，伺服器回 304 時直接重用
+const responseCache = new Map();
+
 async function apiRequest(endpoint, method = 'GET', data = null) {
   const headers = {
     'Content-Type': 'application/json',
@@ -314,6 +321,11 @@ async function apiRequest(endpoint, method = 'GET', data = null) {
   if (authToken) {
     headers['Authorization'] = `Bearer ${authToken}`;
   }
+
+  const cached = method === 'GET' ? responseCache.get(endpoint) : null;
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
   
   const config = {
     method,
@@ -327,6 +339,12 @@ async function apiRequest(endpoint, method = 'GET', data = null) {
   try {
     console.log(`📤 發送 ${method} 請求到 ${endpoint}`, data);
     const response = await fetch(`${API_BASE_URL}${endpoint}`, config);
+
+    if (response.status === 304 && cached) {
+      console.log(`📥 未變更，使用快取回應: ${endpoint}`);
+      return cached.body;
+    }
+
     const result = await response.json();
     
     console.log(`📥 收到回應:`, result);
@@ -334,6 +352,11 @@ async function apiRequest(endpoint, method = 'GET', data = null) {
     if (!response.ok) {
       throw new Error(result.message || '請求失敗');
     }
+
+    const etag = response.headers.get('ETag');
+    if (method === 'GET' && etag) {
+      responseCache.set(endpoint, { etag, body: result });
+    }
     
     return result;
   } catch (error) {
@@ -381,17 +404,29 @@ async function register(username, email, password) {
   }
 }
 
-function logout() {
+async function logout() {
   if (confirm('確定要登出嗎？')) {
+    // 先讓伺服器撤銷目前的 token；失敗（例如已過期或離線）仍照常登出
+    if (authToken) {
+      try {
+        await apiRequest('/auth/logout', 'POST');
+      } catch (error) {
+        console.warn('⚠️ 伺服器端登出失敗:', error.message);
+      }
+    }
+
     // 清除本地存儲
     localStorage.removeItem('calendarToken');
     localStorage.removeItem('calendarUser');
     localStorage.removeItem('weeklyCalendarTasks'); // 清除可能殘留的本地任務
     
+    disconnectTaskStream();
+
     // 重置全局變數
     authToken = null;
     currentUser = null;
     tasks = []; // 清空任務數組
+    responseCache.clear(); // 清除上一位用戶的快取回應
 
     // 新增：切換全局按鈕
     document.getElementById('globalLoginBtn').classList.remove('hidden');
@@ -402,42 +437,169 @@ function logout() {
 }
 
 // ==================== 任務管理函數 ====================
-async function loadTasks() {
-  try {
-    console.log('🔄 載入任務中...');
-    const result = await apiRequest('/tasks');
-    
-    if (result.success) {
-      console.log('✅ 收到任務數據:', result.tasks);
-      
-      // 確保任務日期正確顯示
-      tasks = result.tasks.map(task => ({
-        id: task.id || task._id, // 支援兩種ID格式
-        title: task.title,
-        date: task.date, // 後端已經返回正確日期
-        startTime: task.startTime || task.start_time,
-        endTime: task.endTime || task.end_time,
-        desc: task.desc || '',
-        userId: task.userId || task.user_id // 確保有用戶ID
-      }));
-      
-      console.log(`✅ 已載入用戶 ${currentUser.username} 的 ${tasks.length} 個任務`);
-      
-      // 更新視圖和統計
-      updateView();
-      updateStats();
-      
-      // 清除本地存儲的預設任務（如果有）
-      localStorage.removeItem('weeklyCalendarTasks');
-      
-    } else {
+// 計算目前視圖可見的日期範圍（月視圖為 6x7 格，周視圖為 7 天）
+function getVisibleRange() {
+  if (currentView === 'month') {
+    const year = currentDate.getFullYear();
+    const month = currentDate.getMonth();
+    const firstDayOfWeek = new Date(year, month, 1).getDay();
+    const start = new Date(year, month, 1 - firstDayOfWeek);
+    const end = new Date(year, month, 1 - firstDayOfWeek + 41);
+    return { from: formatDateForAPI(start), to: formatDateForAPI(end) };
+  }
+
+  const weekStart = getWeekStartDate(new Date(currentDate));
+  const weekEnd = new Date(weekStart);
+  weekEnd.setDate(weekStart.getDate() + 6);
+  return { from: formatDateForAPI(weekStart), to: formatDateForAPI(weekEnd) };
+}
+
+// 依 next_cursor 逐頁取回指定範圍內的任務
+// 月曆/周曆格子只需標題、日期與時間，以 fields=summary 省略描述等欄位
+async function fetchTasksInRange(from, to) {
+  const collected = [];
+  let cursor = null;
+
+  do {
+    const params = new URLSearchParams({ from, to, fields: 'summary' });
+    if (cursor) params.set('cursor', cursor);
+
+    const result = await apiRequest(`/tasks?${params.toString()}`);
+    if (!result.success) {
       throw new Error(result.message || '載入任務失敗');
     }
+
+    collected.push(...result.tasks);
+    cursor = result.next_cursor;
+  } while (cursor);
+
+  return collected;
+}
+
+// 取得可見範圍的每日任務數與工作時數（伺服器端彙總，不需逐一計算任務）
+async function loadStats() {
+  const range = getVisibleRange();
+  const params = new URLSearchParams({ from: range.from, to: range.to });
+
+  try {
+    const result = await apiRequest(`/tasks/stats?${params.toString()}`);
+    if (!result.success) {
+      throw new Error(result.message || '載入統計失敗');
+    }
+    dailyStats = {};
+    result.days.forEach(day => {
+      dailyStats[day.date] = { count: day.count, hours: day.hours };
+    });
+  } catch (error) {
+    // 統計端點失敗時改由已載入的任務計算
+    console.error('❌ 載入統計失敗，改用前端計算:', error);
+    dailyStats = {};
+    tasks.forEach(task => {
+      const day = dailyStats[task.date] || (dailyStats[task.date] = { count: 0, hours: 0 });
+      day.count += 1;
+      day.hours += calculateDuration(task.startTime, task.endTime);
+    });
+  }
+}
+
+function getDayStats(dateString) {
+  return dailyStats[dateString] || { count: 0, hours: 0 };
+}
+
+async function refreshStats() {
+  await loadStats();
+  updateView();
+}
+
+// 後端任務 -> 前端使用的欄位名稱
+function toClientTask(task) {
+  return {
+    id: task.id || task._id, // 支援兩種ID格式
+    title: task.title,
+    date: task.date, // 後端已經返回正確日期
+    startTime: task.startTime || task.start_time,
+    endTime: task.endTime || task.end_time,
+    desc: task.desc || '',
+    userId: task.userId || task.user_id, // 確保有用戶ID
+    seriesId: task.series_id || null // 重複任務的發生（ID 為 '<系列ID>:<日期>'）
+  };
+}
+
+// ==================== 即時更新（Server-Sent Events）====================
+// 其他分頁或裝置新增、修改、刪除任務時，由伺服器推送變更，不需重新載入整個列表
+function connectTaskStream() {
+  if (taskStream || !authToken || typeof EventSource === 'undefined') return;
+
+  // EventSource 無法設定 Authorization 標頭，token 以查詢參數傳遞
+  taskStream = new EventSource(`${API_BASE_URL}/tasks/stream?jwt=${encodeURIComponent(authToken)}`);
+  let connected = false;
+
+  taskStream.addEventListener('ready', () => {
+    // 斷線後自動重連時，斷線期間的變更可能遺漏，重新載入一次
+    if (connected) loadTasks();
+    connected = true;
+  });
+  taskStream.addEventListener('task', event => applyTaskEvent(JSON.parse(event.data)));
+  // 伺服器端佇列溢出或監看中斷，需重新載入
+  taskStream.addEventListener('reset', () => loadTasks());
+}
+
+function disconnectTaskStream() {
+  if (taskStream) {
+    taskStream.close();
+    taskStream = null;
+  }
+}
+
+function applyTaskEvent(change) {
+  // 重複系列的發生由伺服器依範圍展開，系列變更時重新載入目前範圍
+  if (change.op === 'series') {
+    loadTasks();
+    return;
+  }
+  if (change.op === 'delete') {
+    tasks = tasks.filter(task => task.id !== change.id);
+  } else {
+    const task = toClientTask(change.task);
+    const range = getVisibleRange();
+    tasks = tasks.filter(existing => existing.id !== task.id);
+    if (task.date >= range.from && task.date <= range.to) {
+      tasks.push(task);
+    }
+  }
+  updateView();
+
+  // 連續多筆變更時只重新取一次統計
+  clearTimeout(statsRefreshTimer);
+  statsRefreshTimer = setTimeout(refreshStats, 300);
+}
+
+async function loadTasks() {
+  try {
+    const range = getVisibleRange();
+    console.log(`🔄 載入任務中... (${range.from} ~ ${range.to})`);
+    const rawTasks = await fetchTasksInRange(range.from, range.to);
+
+    console.log('✅ 收到任務數據:', rawTasks);
+
+    // 確保任務日期正確顯示
+    tasks = rawTasks.map(toClientTask);
+
+    console.log(`✅ 已載入用戶 ${currentUser.username} 的 ${tasks.length} 個任務`);
+
+    await loadStats();
+
+    // 更新視圖和統計
+    updateView();
+
+    // 清除本地存儲的預設任務（如果有）
+    localStorage.removeItem('weeklyCalendarTasks');
   } catch (error) {
     console.error('❌ 載入任務失敗:', error);
     
     // 如果 API 失敗，使用空陣列（不載入任何預設任務）
     tasks = [];
+    dailyStats = {};
     console.log(`⚠️ API 載入失敗，使用空任務列表`);
     updateView();
   }
@@ -551,9 +713,8 @@ async function addTask() {
       const todayFormatted = formatDateForAPI(today);
       document.getElementById('taskDate').value = todayFormatted;
       
-      // 更新視圖
-      updateView();
-      updateStats();
+      // 更新視圖與統計
+      await refreshStats();
       
       // 顯示成功訊息
       setTimeout(() => {
@@ -582,7 +743,12 @@ async function deleteTask(taskId) {
   console.log('🗑️ 刪除任務 ID:', taskId);
   
   try {
-    const result = await apiRequest(`/tasks/${taskId}`, 'DELETE');
+    // 重複任務只刪除這一天，其他日期保留
+    const target = tasks.find(task => task.id === taskId);
+    const endpoint = target && target.seriesId
+      ? `/tasks/series/${target.seriesId}/occurrences/${target.date}`
+      : `/tasks/${taskId}`;
+    const result = await apiRequest(endpoint, 'DELETE');
     
     if (result.success) {
       // 從前端陣列中移除任務
@@ -592,9 +758,8 @@ async function deleteTask(taskId) {
       
       console.log(`✅ 從前端陣列中移除了 ${removedCount} 個任務`);
       
-      // 更新視圖
-      updateView();
-      updateStats();
+      // 更新視圖與統計
+      await refreshStats();
       
       alert('✅ 任務已成功刪除！');
     } else {
@@ -633,7 +798,7 @@ function initViewControls() {
   // 今天按鈕
   document.getElementById('todayBtn').addEventListener('click', function() {
     currentDate = new Date();
-    updateView();
+    loadTasks();
   });
 }
 
@@ -668,7 +833,7 @@ function switchView(view) {
     document.getElementById('busyChart').closest('.chart-container').classList.remove('hidden');
   }
   
-  updateView();
+  loadTasks();
 }
 
 function navigateDate(direction) {
@@ -677,7 +842,8 @@ function navigateDate(direction) {
   } else {
     currentDate.setDate(currentDate.getDate() + (direction * 7));
   }
-  updateView();
+  // 可見範圍已改變，只載入新範圍內的任務
+  loadTasks();
 }
 
 function updateView() {
@@ -885,8 +1051,7 @@ function updateWeekCardStyles() {
     const date = new Date(weekStart);
     date.setDate(weekStart.getDate() + i);
     const dateString = formatDateForAPI(date);
-    const dayTasks = tasks.filter(task => task.date === dateString);
-    dayCounts.push(dayTasks.length);
+    dayCounts.push(getDayStats(dateString).count);
   }
   
   const maxTasks = Math.max(...dayCounts);
@@ -931,8 +1096,7 @@ function updateChart() {
   for (let day = 1; day <= daysInMonth; day++) {
     const date = new Date(year, month, day);
     const dateString = formatDateForAPI(date);
-    const dayTasks = tasks.filter(task => task.date === dateString);
-    dayCounts.push(dayTasks.length);
+    dayCounts.push(getDayStats(dateString).count);
     dayLabels.push(`${day}日`);
   }
   
@@ -1014,12 +1178,7 @@ function updateTimeTrendChart() {
     const weekdayNames = ['週日', '週一', '週二', '週三', '週四', '週五', '週六'];
     dayLabels.push(`${weekdayNames[weekday]}\n${date.getDate()}日`);
     
-    const dayTasks = tasks.filter(task => task.date === dateString);
-    let totalHours = 0;
-    
-    dayTasks.forEach(task => {
-      totalHours += calculateDuration(task.startTime, task.endTime);
-    });
+    const totalHours = getDayStats(dateString).hours;
     
     dayHours.push(parseFloat(totalHours.toFixed(1)));
     
@@ -1086,8 +1245,8 @@ function updateTimeTrendChart() {
 
 // ==================== 統計函數 ====================
 function updateStats() {
-  // 計算總任務數
-  const totalTasks = tasks.length;
+  // 計算總任務數（可見範圍內）
+  const totalTasks = Object.values(dailyStats).reduce((sum, day) => sum + day.count, 0);
   
   // 計算最忙碌和最空閒的日子
   let maxTasks = 0;
@@ -1103,10 +1262,10 @@ function updateStats() {
       if (date.getMonth() !== month) break;
       
       const dateString = formatDateForAPI(date);
-      const dayTasks = tasks.filter(task => task.date === dateString);
+      const count = getDayStats(dateString).count;
       
-      if (dayTasks.length > maxTasks) maxTasks = dayTasks.length;
-      if (dayTasks.length < minTasks) minTasks = dayTasks.length;
+      if (count > maxTasks) maxTasks = count;
+      if (count < minTasks) minTasks = count;
     }
   } else {
     // 周視圖：計算當周
@@ -1116,10 +1275,10 @@ function updateStats() {
       const date = new Date(weekStart);
       date.setDate(weekStart.getDate() + i);
       const dateString = formatDateForAPI(date);
-      const dayTasks = tasks.filter(task => task.date === dateString);
+      const count = getDayStats(dateString).count;
       
-      if (dayTasks.length > maxTasks) maxTasks = dayTasks.length;
-      if (dayTasks.length < minTasks) minTasks = dayTasks.length;
+      if (count > maxTasks) maxTasks = count;
+      if (count < minTasks) minTasks = count;
     }
   }
   
@@ -1131,12 +1290,7 @@ function updateStats() {
     for (let i = 0; i < 7; i++) {
       const date = new Date(weekStart);
       date.setDate(weekStart.getDate() + i);
-      const dateString = formatDateForAPI(date);
-      const dayTasks = tasks.filter(task => task.date === dateString);
-      
-      dayTasks.forEach(task => {
-        totalHours += calculateDuration(task.startTime, task.endTime);
-      });
+      totalHours += getDayStats(formatDateForAPI(date)).hours;
     }
   }
   